@@ -0,0 +1,57 @@
+import sys
+import collections
+import tracemalloc
+
+# Python allocations per frame (see Scene.AddInstrument). tracemalloc is
+# started on the first frame if it is not running already; each frame reports
+# the peak of traced memory above the frame start and the memory and number
+# of blocks still allocated at its end, which should be ~0 in steady state
+# (State reuses its matrices and uniform pointers from frame to frame):
+#   {"frame", "peak_kb", "net_kb", "net_blocks"}
+# Tracing slows everything down: keep it off for timing.
+class AllocationTracker:
+  def __init__ (self, history=300):
+    self.reports = collections.deque(maxlen=history)
+    self.started = False     # tracemalloc started here (stopped by Stop)
+    self.start = None        # (bytes, blocks) at frame start
+    self.count = 0
+
+  def GetName (self):
+    return "allocations"
+
+  def BeginFrame (self):
+    if not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self.started = True
+    tracemalloc.reset_peak()
+    self.start = (tracemalloc.get_traced_memory()[0],sys.getallocatedblocks())
+
+  def EndFrame (self):
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks()
+    size, count = self.start
+    self.reports.append({
+      "frame": self.count,
+      "peak_kb": (peak-size)/1024,
+      "net_kb": (current-size)/1024,
+      "net_blocks": blocks-count,
+    })
+    self.count += 1
+
+  def Begin (self, name):
+    pass
+
+  def End (self):
+    pass
+
+  def Stop (self):
+    if self.started:
+      tracemalloc.stop()
+      self.started = False
+
+  # report of the last rendered frame
+  def GetReport (self):
+    return self.reports[-1] if self.reports else None
+
+  def GetReports (self):
+    return list(self.reports)
@@ -1,3 +1,7 @@
 class Appearance:
   def Unload (self, st):
-    pass
\ No newline at end of file
+    pass
+
+  # drawn in the transparent pass (see TransparencyLayer)
+  def IsTranslucent (self):
+    return False
@@ -0,0 +1,195 @@
+import time
+import collections
+import glfw
+import numpy as np
+from OpenGL.GL import *
+
+# Application loop: the scene is updated at a fixed timestep, decoupled from
+# rendering; frames are rendered with poses interpolated between the last two
+# simulation steps and paced to a target frame rate (sleep based) and/or vsync.
+# With on_demand, while no engine is animating the loop blocks waiting for
+# events and renders only when the scene version (see changes) or the
+# framebuffer size changed, or the window needs a refresh.
+class AppLoop:
+  def __init__ (self, win, scene, camera, step=1.0/60.0, fps=None, vsync=True, on_demand=False):
+    self.win = win
+    self.scene = scene
+    self.camera = camera
+    self.step = step          # simulation timestep (s)
+    self.max_steps = 5        # updates per frame before dropping simulated time
+    self.fps = fps            # target frame rate (None: not limited)
+    self.spin = 0.002         # final part of the wait done busy-waiting (s)
+    self.callbacks = []
+    self.stats = FrameStats()
+    self.on_demand = on_demand
+    self.timeout = 0.5        # longest wait for events when idle (s)
+    self.damaged = True       # window contents lost (refresh callback)
+    self.layer = None         # StaticLayer or TransparencyLayer drawing the scene
+    self.scene.SetInterpolation(True)
+    self.SetVSync(vsync)
+
+  # True: sync to display refresh; False: off; "adaptive": late frames tear
+  # instead of waiting a whole refresh (falls back to vsync if unsupported)
+  def SetVSync (self, mode):
+    if mode == "adaptive":
+      if glfw.extension_supported("WGL_EXT_swap_control_tear") or glfw.extension_supported("GLX_EXT_swap_control_tear"):
+        glfw.swap_interval(-1)
+      else:
+        glfw.swap_interval(1)
+    else:
+      glfw.swap_interval(1 if mode else 0)
+
+  def SetTargetFPS (self, fps):
+    self.fps = fps
+
+  # render through a StaticLayer: only dynamic nodes are drawn while the
+  # camera holds still
+  def SetStaticLayer (self, layer):
+    self.UseLayer(layer)
+
+  # render through a TransparencyLayer: translucent nodes blended without sorting
+  def SetTransparencyLayer (self, layer):
+    self.UseLayer(layer)
+
+  # each layer draws the whole scene: a StaticLayer and a TransparencyLayer
+  # are mutually exclusive (None removes the layer)
+  def UseLayer (self, layer):
+    if layer and self.layer and type(layer) is not type(self.layer):
+      raise RuntimeError("AppLoop: static and transparency layers are mutually exclusive")
+    self.layer = layer
+
+  def SetOnDemand (self, flag, timeout=0.5):
+    self.on_demand = flag
+    self.timeout = timeout
+
+  def GetStats (self):
+    return self.stats
+
+  # function called after rendering each frame, before the buffers are swapped
+  def AddFrameCallback (self, func):
+    self.callbacks.append(func)
+
+  def Render (self, alpha):
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    if self.layer:
+      self.layer.Render(self.camera,alpha)
+    else:
+      self.scene.Render(self.camera,alpha)
+
+  def Run (self):
+    if self.on_demand:
+      return self.RunOnDemand()
+    acc = 0.0
+    prev = time.perf_counter()
+    while not glfw.window_should_close(self.win):
+      start = time.perf_counter()
+      acc += min(start-prev,0.25)
+      self.stats.Add(start-prev)
+      prev = start
+      # fixed-step simulation
+      nsteps = 0
+      while acc >= self.step and nsteps < self.max_steps:
+        self.scene.Update(self.step)
+        acc -= self.step
+        nsteps += 1
+      if nsteps == self.max_steps:
+        acc = min(acc,self.step)
+      # render interpolated state
+      self.Render(acc/self.step)
+      for func in self.callbacks:
+        func()
+      glfw.swap_buffers(self.win)
+      glfw.poll_events()
+      if self.fps:
+        Wait(start+1.0/self.fps,self.spin)
+    return self.stats
+
+  def Refresh (self, win):
+    self.damaged = True
+
+  def RunOnDemand (self):
+    glfw.set_window_refresh_callback(self.win,self.Refresh)
+    version = None
+    size = None
+    acc = 0.0
+    prev = time.perf_counter()
+    last = prev               # last rendered frame
+    while not glfw.window_should_close(self.win):
+      start = time.perf_counter()
+      animating = self.scene.IsAnimating()
+      if animating:
+        acc += min(start-prev,0.25)
+        nsteps = 0
+        while acc >= self.step and nsteps < self.max_steps:
+          self.scene.Update(self.step)
+          acc -= self.step
+          nsteps += 1
+        if nsteps == self.max_steps:
+          acc = min(acc,self.step)
+      else:
+        acc = 0.0   # idle time is not simulated
+      prev = start
+      current = glfw.get_framebuffer_size(self.win)
+      if current != size:
+        size = current
+        glViewport(0,0,size[0],size[1])
+        self.damaged = True
+      if animating or self.damaged or self.scene.GetVersion() != version:
+        version = self.scene.GetVersion()   # changes while rendering trigger another frame
+        self.damaged = False
+        self.Render(acc/self.step if animating else 1.0)
+        for func in self.callbacks:
+          func()
+        glfw.swap_buffers(self.win)
+        self.stats.Add(start-last)
+        last = start
+      if animating:
+        glfw.poll_events()
+        if self.fps:
+          Wait(start+1.0/self.fps,self.spin)
+      else:
+        glfw.wait_events_timeout(self.timeout)
+    return self.stats
+
+# sleep until deadline (perf_counter time), busy-waiting the last 'spin' seconds
+def Wait (deadline, spin):
+  remaining = deadline - time.perf_counter()
+  if remaining > spin:
+    time.sleep(remaining-spin)
+  while time.perf_counter() < deadline:
+    pass
+
+# frame time statistics over the last 'size' frames
+class FrameStats:
+  def __init__ (self, size=1000):
+    self.times = collections.deque(maxlen=size)
+
+  def Add (self, dt):
+    self.times.append(dt)
+
+  def Clear (self):
+    self.times.clear()
+
+  def GetFrameCount (self):
+    return len(self.times)
+
+  def GetPercentile (self, p):
+    if not self.times:
+      return 0.0
+    return float(np.percentile(np.array(self.times),p))
+
+  # times in milliseconds
+  def GetSummary (self):
+    if not self.times:
+      return {"frames": 0}
+    times = np.array(self.times) * 1000.0
+    p50, p90, p99 = np.percentile(times,[50,90,99])
+    return {
+      "frames": len(times),
+      "mean": float(times.mean()),
+      "p50": float(p50),
+      "p90": float(p90),
+      "p99": float(p99),
+      "max": float(times.max()),
+      "fps": float(1000.0/times.mean()),
+    }
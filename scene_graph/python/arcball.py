@@ -2,6 +2,7 @@ import math
 import glm
 from OpenGL.GL import *
 import glfw
+import changes
 
 class Arcball:
   def __init__ (self, distance):
@@ -54,6 +55,7 @@ class Arcball:
     m = glm.rotate(m,theta,glm.vec3(ax,ay,az))
     m = glm.translate(m,glm.vec3(0,0,self.distance))
     self.mat = m * self.mat
+    changes.Touch()
 
   def GetMatrix (self):
     return self.mat
@@ -62,6 +64,7 @@ class Arcball:
     m = glm.mat4(1)
     m = glm.translate(m,glm.vec3(dx*self.distance,dy*self.distance,dz*self.distance))
     self.mat = m * self.mat
+    changes.Touch()
 
 # Map function: from screen (x,y) to unit sphere (px,py,pz)
 def Map (width, height, x, y):
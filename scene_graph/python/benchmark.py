@@ -0,0 +1,713 @@
+import sys
+if "--null" in sys.argv:
+  import nullgl   # no driver: must replace OpenGL.GL before anything imports it
+  nullgl.Install()
+import headless   # must come first: selects the PyOpenGL platform
+import os
+import math
+import json
+import time
+import platform as host   # OpenGL.GL exports its own "platform"
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+from OpenGL.GL import *
+
+import glm
+from camera3d import *
+from light import *
+from shader import *
+from material import *
+from transform import *
+from node import *
+from scene import *
+from cube import *
+from sphere import *
+from quad import *
+from mesh import *
+from apploop import FrameStats
+from glcounter import GLCounter
+from alloctracker import AllocationTracker
+from transformarray import TransformArray
+import framebuffer
+from clusteredlights import ClusteredLights
+from deferredrenderer import DeferredRenderer
+from shadowmap import ShadowMap
+from shadinglod import ShadingLOD
+from fog import Fog
+from geometriclod import GeometricLOD
+import simplify
+
+# procedural cylinder and cone live with the application
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"../../src"))
+from cylinder import Cylinder
+from cone import Cone
+
+SHAPES = ["cube","sphere","cylinder","cone","mesh","quad"]
+LAYOUTS = ["shallow","tree","deep"]
+SIZES = [10,100,1000,10000,100000]
+SPACING = 2.5       # distance between neighbouring objects
+BRANCHING = 8       # children per node in the "tree" layout
+ALLOC_FRAMES = 5    # frames rendered under the allocation tracker
+CHAIN = 50          # nodes per chain in the "deep" layout
+
+# (metric, relative, slack) compared by Compare; relative metrics use the
+# threshold, counts regress on any increase; changes within slack (absolute)
+# are noise
+METRICS = [
+  ("cpu_ms.p50",True,0),
+  ("cpu_ms.p90",True,0),
+  ("gpu_ms.p50",True,0),
+  ("frame_ms.p50",True,0),
+  ("build_s",True,0),
+  ("build_alloc_mb",True,0),
+  ("rss_mb",True,0),
+  ("draw_calls",False,0),
+  ("gl_calls",False,0),
+  ("alloc_peak_kb",True,4),
+  ("alloc_net_kb",True,4),
+]
+
+# torus written in the .msh format read by Mesh (V, N and T lines)
+def WriteTorusMesh (filename, nu=48, nv=24, R=0.7, r=0.3):
+  with open(filename,"w") as f:
+    for i in range(nu):
+      u = 2*math.pi*i/nu
+      for j in range(nv):
+        v = 2*math.pi*j/nv
+        n = (math.cos(u)*math.cos(v), math.sin(v), math.sin(u)*math.cos(v))
+        f.write("V %f %f %f\n" % (R*math.cos(u)+r*n[0], r*n[1], R*math.sin(u)+r*n[2]))
+        f.write("N %f %f %f\n" % n)
+    for i in range(nu):
+      for j in range(nv):
+        a = i*nv + j
+        b = ((i+1)%nu)*nv + j
+        c = ((i+1)%nu)*nv + (j+1)%nv
+        d = i*nv + (j+1)%nv
+        f.write("T %d %d %d\n" % (a,c,b))
+        f.write("T %d %d %d\n" % (a,d,c))
+
+# torus mesh file shared by the runs
+def TorusFile ():
+  filename = os.path.join(tempfile.gettempdir(),"scene_graph_benchmark","torus.msh")
+  if not os.path.exists(filename):
+    os.makedirs(os.path.dirname(filename),exist_ok=True)
+    WriteTorusMesh(filename)
+  return filename
+
+def CreateShapes (names):
+  shapes = {}
+  for name in names:
+    if name == "cube":
+      shapes[name] = Cube()
+    elif name == "sphere":
+      shapes[name] = Sphere()
+    elif name == "cylinder":
+      shapes[name] = Cylinder()
+    elif name == "cone":
+      shapes[name] = Cone()
+    elif name == "quad":
+      shapes[name] = Quad()
+    elif name == "mesh":
+      shapes[name] = Mesh(TorusFile())
+    else:
+      raise RuntimeError("Unknown shape: " + name)
+  return shapes
+
+# program of a lit shader directory (ilum_frag, ilum_vert...), by default
+# with a point light at the camera
+def LitShader (dir, light=None):
+  shaders = os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders")
+  shader = Shader(light or Light(0.0,0.0,0.0,1.0,"camera"),"world")
+  shader.AttachVertexShader(os.path.join(shaders,dir,"vertex.glsl"))
+  shader.AttachFragmentShader(os.path.join(shaders,dir,"fragment.glsl"))
+  shader.Link()
+  return shader
+
+# grid position of the i-th of n objects
+def Position (i, n):
+  k = max(1,math.ceil(n ** (1/3) - 1e-9))
+  x, y, z = i % k, (i // k) % k, i // (k*k)
+  offset = (k-1) / 2
+  return glm.vec3(x-offset,y-offset,z-offset) * SPACING
+
+def Parent (i, layout):
+  if layout == "shallow":
+    return None
+  if layout == "tree":
+    return (i-1) // BRANCHING if i > 0 else None
+  if layout == "deep":
+    return i-1 if i % CHAIN else None
+  raise RuntimeError("Unknown layout: " + layout)
+
+# n objects on a grid (shared shapes, 8 shared materials); in hierarchical
+# layouts each transform is relative to the parent's position
+def BuildScene (n, layout, shapes, shader):
+  names = list(shapes)
+  materials = []
+  for i in range(8):
+    h = i / 8
+    materials.append(Material(0.5+0.5*math.cos(2*math.pi*h),0.5+0.5*math.cos(2*math.pi*(h-1/3)),0.5+0.5*math.cos(2*math.pi*(h-2/3))))
+  root = Node(shader,name="root")
+  nodes = []
+  positions = []
+  for i in range(n):
+    pos = Position(i,n)
+    parent = Parent(i,layout)
+    trf = Transform()
+    if parent is None:
+      trf.Translate(pos.x,pos.y,pos.z)
+    else:
+      rel = pos - positions[parent]
+      trf.Translate(rel.x,rel.y,rel.z)
+    node = Node(None,trf,[materials[i % len(materials)]],[shapes[names[i % len(names)]]],name="n%d" % i)
+    (root if parent is None else nodes[parent]).AddNode(node)
+    nodes.append(node)
+    positions.append(pos)
+  return Scene(root)
+
+# scripted orbit around the scene, one full turn over the frames
+def CameraAt (camera, n, frame, frames):
+  k = max(1,math.ceil(n ** (1/3) - 1e-9))
+  radius = 1.5 * k * SPACING + 4.0
+  angle = 2*math.pi*frame/frames
+  camera.SetEye(radius*math.cos(angle),0.4*radius*math.sin(2*angle)+0.3*radius,radius*math.sin(angle))
+  camera.SetZPlanes(0.1,4*radius)
+
+def CurrentRSS ():
+  try:
+    with open("/proc/self/statm") as f:
+      return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+  except (OSError, ValueError, AttributeError):
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # peak (KB on Linux)
+
+# headless context of a subcommand (depth test, back-face culling, default
+# framebuffer bound) and its results, with the given meta data
+def Session (args, clear=(0.0,0.0,0.0), **meta):
+  ctx = headless.Headless(args.width,args.height)
+  glClearColor(*clear,1.0)
+  glEnable(GL_DEPTH_TEST)
+  glEnable(GL_CULL_FACE)
+  ctx.GetFramebuffer().Bind()
+  glViewport(0,0,args.width,args.height)
+  info = {
+    "renderer": glGetString(GL_RENDERER).decode(),
+    "width": args.width,
+    "height": args.height,
+  }
+  info.update(meta)
+  info["frames"] = args.frames
+  return ctx, {"meta": info, "results": []}
+
+def WriteResults (results, filename):
+  if filename:
+    with open(filename,"w") as f:
+      json.dump(results,f,indent=2)
+
+# time frames of a scene after 'warmup' untimed ones (variants, buffers,
+# levels); step(frame) moves the camera (and anything else) before each
+# frame, counters (ShadingLOD, GeometricLOD) are reset after the warm-up,
+# and frames stop early (but not before 3) past 'budget' seconds. cpu_ms
+# is the time to issue a frame, frame_ms waits for the GPU as well and
+# gpu_ms comes from timer queries (software renderers may report none)
+def Measure (scene, camera, frames, step=None, warmup=1, counters=(), gpu=False, budget=None):
+  for frame in range(warmup):
+    if step:
+      step(frame % frames)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    scene.Render(camera)
+  glFinish()
+  for counter in counters:
+    counter.ResetCounts()
+  queries = [int(q) for q in glGenQueries(frames)] if gpu else []
+  cpu = FrameStats(frames)
+  total = FrameStats(frames)
+  start = time.perf_counter()
+  done = 0
+  for frame in range(frames):
+    if step:
+      step(frame)
+    t0 = time.perf_counter()
+    if gpu:
+      glBeginQuery(GL_TIME_ELAPSED,queries[frame])
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    scene.Render(camera)
+    if gpu:
+      glEndQuery(GL_TIME_ELAPSED)
+    t1 = time.perf_counter()
+    glFinish()
+    t2 = time.perf_counter()
+    cpu.Add(t1-t0)
+    total.Add(t2-t0)
+    done += 1
+    if budget is not None and done >= 3 and t2 - start > budget:
+      break
+  stats = {"cpu_ms": cpu.GetSummary(), "frame_ms": total.GetSummary()}
+  if gpu:
+    from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as get_query_ui64
+    times = FrameStats(frames)
+    for q in queries[:done]:
+      value = GLuint64(0)
+      get_query_ui64(q,GL_QUERY_RESULT,value)
+      times.Add(value.value/1e9)
+    glDeleteQueries(len(queries),queries)
+    stats["gpu_ms"] = times.GetSummary()
+  return stats
+
+# render one scenario; frames stop early (but not before 3) past 'budget' seconds
+def RunScenario (ctx, n, layout, shape, frames, budget, shader, shapes, soa=False):
+  if shape != "mixed":
+    shapes = {shape: shapes[shape]}
+  tracemalloc.start()
+  t0 = time.perf_counter()
+  scene = BuildScene(n,layout,shapes,shader)
+  if soa:
+    scene.SetTransformArray(TransformArray(scene.GetRoot()))
+  build = time.perf_counter() - t0
+  alloc = tracemalloc.get_traced_memory()[1] / 2**20
+  tracemalloc.stop()
+
+  camera = Camera3D(0,0,1)
+  fb = ctx.GetFramebuffer()
+  fb.Bind()
+  glViewport(0,0,ctx.GetWidth(),ctx.GetHeight())
+  step = lambda frame: CameraAt(camera,n,frame,frames)
+  stats = Measure(scene,camera,frames,step,gpu=ctx.backend != "null",budget=budget)
+
+  # one more frame counting GL calls and primitives
+  counter = GLCounter()
+  scene.AddInstrument(counter)
+  prims = int(glGenQueries(1)[0])
+  glBeginQuery(GL_PRIMITIVES_GENERATED,prims)
+  report = scene.Render(camera)["glcounter"]
+  glEndQuery(GL_PRIMITIVES_GENERATED)
+  counter.Uninstall()
+  scene.RemoveInstrument(counter)
+  triangles = glGetQueryObjectuiv(prims,GL_QUERY_RESULT)
+  glDeleteQueries(1,[prims])
+
+  # and a few tracking Python allocations (median frame)
+  tracker = AllocationTracker()
+  scene.AddInstrument(tracker)
+  for frame in range(ALLOC_FRAMES):
+    scene.Render(camera)
+  scene.RemoveInstrument(tracker)
+  tracker.Stop()
+  allocs = sorted(tracker.GetReports(),key=lambda r: r["peak_kb"])[ALLOC_FRAMES//2]
+
+  return {
+    "name": "%s-%s-%d" % (layout,shape,n),
+    "nodes": n,
+    "layout": layout,
+    "shape": shape,
+    "build_s": build,
+    "build_alloc_mb": alloc,
+    "rss_mb": CurrentRSS(),
+    "cpu_ms": stats["cpu_ms"],
+    "gpu_ms": stats.get("gpu_ms",{"frames": 0}),
+    "frame_ms": stats["frame_ms"],
+    "draw_calls": report["categories"].get("draw",{}).get("calls",0),
+    "gl_calls": report["calls"],
+    "triangles": int(triangles),
+    "alloc_peak_kb": allocs["peak_kb"],
+    "alloc_net_kb": allocs["net_kb"],
+    "alloc_net_blocks": allocs["net_blocks"],
+  }
+
+def Run (args):
+  ctx = headless.Headless(args.width,args.height)
+  glClearColor(1.0,1.0,1.0,1.0)
+  glEnable(GL_DEPTH_TEST)
+  glEnable(GL_CULL_FACE)
+  shader = LitShader("ilum_vert")
+  shapes = CreateShapes(SHAPES)
+  results = {
+    "meta": {
+      "renderer": glGetString(GL_RENDERER).decode(),
+      "version": glGetString(GL_VERSION).decode(),
+      "python": host.python_version(),
+      "machine": host.machine(),
+      "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+      "width": args.width,
+      "height": args.height,
+      "frames": args.frames,
+      "null": args.null,
+      "soa": args.soa,
+    },
+    "results": [],
+  }
+  for layout in args.layouts:
+    for shape in args.shapes:
+      for n in args.sizes:
+        result = RunScenario(ctx,n,layout,shape,args.frames,args.budget,shader,shapes,args.soa)
+        results["results"].append(result)
+        print("%-24s cpu %8.2f ms  gpu %8.2f ms  draws %6d  gl calls %7d  alloc %8.1f KB  build %6.2f s" %
+              (result["name"],result["cpu_ms"]["p50"],result["gpu_ms"].get("p50",0.0),
+               result["draw_calls"],result["gl_calls"],result["alloc_peak_kb"],result["build_s"]),flush=True)
+        WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# 'layers' full-screen quads, listed back to front, with an expensive fragment
+# shader: the shading cost is proportional to the overdraw unless the depth
+# test discards the hidden fragments before shading
+def BuildOverdraw (layers, iterations):
+  shader = Shader(None,"world")
+  shader.Define("ITERATIONS",iterations)
+  shader.AttachVertexShader(os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders/overdraw/vertex.glsl"))
+  shader.AttachFragmentShader(os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders/overdraw/fragment.glsl"))
+  shader.Link()
+  quad = Quad()
+  root = Node(shader,name="root")
+  for i in range(layers):
+    h = i / layers
+    trf = Transform()
+    trf.Translate(-2,-2,-0.1*(layers-i))
+    trf.Scale(4,4,1)
+    material = Material(0.5+0.5*math.cos(2*math.pi*h),0.5+0.5*math.cos(2*math.pi*(h-1/3)),0.5+0.5*math.cos(2*math.pi*(h-2/3)))
+    root.AddNode(Node(None,trf,[material],[quad],name="layer%d" % i))
+  return Scene(root)
+
+# time per frame (ms) of each mode: plain back-to-front order, sorted front
+# to back, and depth pre-pass (frame_ms waits for the GPU: software
+# renderers may report no GPU time)
+def RunOverdraw (args):
+  ctx, results = Session(args,(1.0,1.0,1.0),layers=args.layers,iterations=args.iterations)
+  scene = BuildOverdraw(args.layers,args.iterations)
+  camera = Camera3D(0,0,3)
+  for mode in ["plain","sorted","prepass"]:
+    scene.SetSortFrontToBack(mode == "sorted")
+    scene.SetDepthPrepass(mode == "prepass")
+    result = {"name": mode, **Measure(scene,camera,args.frames,gpu=True)}
+    results["results"].append(result)
+    print("%-8s cpu %8.2f ms  gpu %8.2f ms  frame %8.2f ms" %
+          (mode,result["cpu_ms"]["p50"],result["gpu_ms"]["p50"],result["frame_ms"]["p50"]),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# grid scene lit per fragment by 'count' point lights scattered over it
+# (forward with clustered shading, or a DeferredRenderer drawing it)
+def BuildLights (n, count, grid, deferred=False):
+  scene = BuildScene(n,"shallow",CreateShapes(["cube","sphere"]),LitShader("ilum_frag"))
+  lights = ClusteredLights(*grid)
+  extent = Position(n-1,n)
+  rng = np.random.default_rng(1)
+  for i in range(count):
+    x, y, z = rng.uniform(-1.0,1.0,3) * np.array(extent)
+    r, g, b = rng.uniform(0.2,1.0,3)
+    lights.AddLight(x,y,z,1.5*SPACING,r,g,b)
+  if deferred:
+    return DeferredRenderer(scene,lights)
+  scene.GetRoot().AddAppearance(lights)
+  return scene
+
+# frame time against the number of point lights: clustered, with every light
+# in a single cluster (each fragment evaluates all lights) and deferred
+def RunLights (args):
+  ctx, results = Session(args,nodes=args.nodes)
+  framebuffer.SetDefault(ctx.GetFramebuffer())   # restored by the G-buffer's Unbind
+  camera = Camera3D(0,0,1)
+  step = lambda frame: CameraAt(camera,args.nodes,frame,args.frames)
+  for count in args.lights:
+    for mode, grid in [("clustered",(16,9,24)),("all",(1,1,1)),("deferred",None)]:
+      scene = BuildLights(args.nodes,count,grid or (1,1,1),mode == "deferred")
+      result = {"name": "%s-%d" % (mode,count), "lights": count, "mode": mode,
+                **Measure(scene,camera,args.frames,step)}
+      results["results"].append(result)
+      print("%-16s cpu %8.2f ms  frame %8.2f ms" % (result["name"],result["cpu_ms"]["p50"],result["frame_ms"]["p50"]),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# point light amid n nodes with an omnidirectional shadow map; every
+# 'dynamic'-th node (0: none) is marked dynamic
+def BuildShadows (n, size, dynamic=0):
+  light = Light(0.5*SPACING,0.5*SPACING,0.5*SPACING,1.0,"world")
+  scene = BuildScene(n,"shallow",CreateShapes(["cube","sphere"]),LitShader("ilum_frag",light))
+  nodes = scene.GetRoot().nodes
+  if dynamic:
+    for node in nodes[::dynamic]:
+      node.SetDynamic(True)
+  far = 2.0 * glm.length(Position(n-1,n)) + SPACING
+  shadow = ShadowMap(scene,light,size,far=far)
+  return scene, shadow
+
+# frame time of shadowed scenes: without shadows, re-rendering every caster
+# each frame, with the cached static map (only the camera moves), and with
+# a tenth of the nodes dynamic and moving every frame
+def RunShadows (args):
+  ctx, results = Session(args,nodes=args.nodes,size=args.size)
+  camera = Camera3D(0,0,1)
+  for mode in ["none","uncached","cached","dynamic"]:
+    scene, shadow = BuildShadows(args.nodes,args.size,10 if mode == "dynamic" else 0)
+    if mode != "none":
+      scene.GetRoot().AddAppearance(shadow)
+    moving = [node for node in scene.GetRoot().nodes if node.IsDynamic()]
+    def Step (frame):
+      CameraAt(camera,args.nodes,frame,args.frames)
+      if mode == "uncached":
+        shadow.Invalidate()
+      for node in moving:
+        node.trf.Rotate(5.0,0.0,1.0,0.0)
+    ctx.GetFramebuffer().Bind()   # unbound by the shadow map framebuffers
+    glViewport(0,0,args.width,args.height)
+    result = {"name": "shadows-%s" % mode, "mode": mode, **Measure(scene,camera,args.frames,Step)}
+    results["results"].append(result)
+    print("%-16s cpu %8.2f ms  frame %8.2f ms" % (result["name"],result["cpu_ms"]["p50"],result["frame_ms"]["p50"]),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# grid scene lit per fragment, with the per-vertex program as the cheap
+# tier of a ShadingLOD (thresholds in pixels)
+def BuildShadingLOD (n, low, high):
+  light = Light(0.0,0.0,0.0,1.0,"camera")
+  scene = BuildScene(n,"shallow",CreateShapes(["cube","sphere"]),LitShader("ilum_frag",light))
+  return scene, ShadingLOD(LitShader("ilum_vert",light),low,high)
+
+# frame time with every node shaded per fragment, with the shading LOD
+# (per-vertex lighting below the thresholds) and with every node per vertex
+def RunShadingLOD (args):
+  ctx, results = Session(args,nodes=args.nodes,thresholds=[args.low,args.high])
+  camera = Camera3D(0,0,1)
+  step = lambda frame: CameraAt(camera,args.nodes,frame,args.frames)
+  big = float(max(args.width,args.height)) * 1e3   # every node below it
+  for mode, low, high in [("full",None,None),("lod",args.low,args.high),("cheap",big,big)]:
+    scene, lod = BuildShadingLOD(args.nodes,low or 0.0,high or 0.0)
+    if mode != "full":
+      scene.GetRoot().AddAppearance(lod)
+    stats = Measure(scene,camera,args.frames,step,counters=[lod])
+    tiers = {"full": args.nodes, "cheap": 0} if mode == "full" else \
+            {tier: count / args.frames for tier, count in lod.GetCounts().items()}
+    result = {"name": "shadinglod-%s" % mode, "mode": mode, **stats, "tiers": tiers}
+    results["results"].append(result)
+    print("%-18s cpu %8.2f ms  frame %8.2f ms  full %7.1f  cheap %7.1f nodes/frame" %
+          (result["name"],result["cpu_ms"]["p50"],result["frame_ms"]["p50"],result["tiers"]["full"],result["tiers"]["cheap"]),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# n objects scattered at random (uniform positions, orientations and
+# sizes) in a cube of the given side, lit per fragment
+def BuildScattered (n, side):
+  shader = LitShader("ilum_frag",Light(0.0,1.0,0.0,0.0,"camera"))
+  shapes = CreateShapes(["cube","sphere"])
+  names = list(shapes)
+  material = Material(0.8,0.8,0.8)
+  root = Node(shader,apps=[material],name="root")
+  rng = np.random.default_rng(1)
+  for i in range(n):
+    x, y, z = rng.uniform(-0.5,0.5,3) * side
+    trf = Transform()
+    trf.Translate(x,y,z)
+    trf.Rotate(rng.uniform(0.0,360.0),*rng.uniform(-1.0,1.0,3))
+    trf.Scale(*[rng.uniform(0.5,2.0)]*3)
+    root.AddNode(Node(None,trf,None,[shapes[names[i % len(names)]]],name="n%d" % i))
+  return Scene(root)
+
+# frame time of a large scattered scene seen from its middle: without fog,
+# with fog shading every object, and with the objects beyond the saturated
+# fog culled and the far plane fitted to it
+def RunFog (args):
+  ctx, results = Session(args,(0.5,0.5,0.5),nodes=args.nodes,side=args.side,density=args.density)   # cleared to the fog color
+  for mode in ["none","fog","culled"]:
+    scene = BuildScattered(args.nodes,args.side)
+    camera = Camera3D(0,0,1)
+    camera.SetZPlanes(0.1,2.0*args.side)
+    fog = Fog(args.density,0.5,0.5,0.5)
+    if mode != "none":
+      scene.GetRoot().AddAppearance(fog)
+    fog.SetCulling(mode == "culled")
+    camera.SetFog(fog)
+    def Orbit (frame):   # looking around from the middle of the scene
+      angle = 2*math.pi*frame/args.frames
+      camera.SetEye(0.0,0.0,0.0)
+      camera.SetCenter(math.cos(angle),0.2*math.sin(2*angle),math.sin(angle))
+    stats = Measure(scene,camera,args.frames,Orbit)
+    counter = GLCounter()
+    scene.AddInstrument(counter)
+    report = scene.Render(camera)["glcounter"]
+    counter.Uninstall()
+    scene.RemoveInstrument(counter)
+    result = {"name": "fog-%s" % mode, "mode": mode, **stats,
+              "draw_calls": report["categories"].get("draw",{}).get("calls",0),
+              "far": camera.GetFar() if mode == "culled" else 2.0*args.side}
+    results["results"].append(result)
+    print("%-12s cpu %8.2f ms  frame %8.2f ms  draws %6d  far %7.1f" %
+          (result["name"],result["cpu_ms"]["p50"],result["frame_ms"]["p50"],result["draw_calls"],result["far"]),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+# frame time and triangles drawn with the finest tessellation of every
+# procedural shape and simplified mesh, and with levels selected within a
+# pixel-error budget
+def RunGeometricLOD (args):
+  ctx, results = Session(args,nodes=args.nodes,error=args.error)
+  shader = LitShader("ilum_frag")
+  camera = Camera3D(0,0,1)
+  step = lambda frame: CameraAt(camera,args.nodes,frame,args.frames)
+  for mode, error in [("full",0.0),("lod",args.error)]:
+    shapes = CreateShapes(["sphere","cylinder","cone"])
+    shapes["mesh"] = Mesh(TorusFile(),simplify.RATIOS)   # simplified levels
+    scene = BuildScene(args.nodes,"shallow",shapes,shader)
+    detail = GeometricLOD(error)   # no error allowed: the finest levels
+    scene.GetRoot().AddAppearance(detail)
+    # warm-up along the whole orbit: levels are built on first use
+    stats = Measure(scene,camera,args.frames,step,args.frames,[detail])
+    levels = detail.GetLevelCounts()
+    result = {"name": "geomlod-%s" % mode, "mode": mode, **stats,
+              "triangles": detail.GetTriangleCount() / args.frames,
+              "levels": {str(k): levels[k] / args.frames for k in sorted(levels)}}
+    results["results"].append(result)
+    print("%-14s cpu %8.2f ms  frame %8.2f ms  triangles %10.0f  levels %s" %
+          (result["name"],result["cpu_ms"]["p50"],result["frame_ms"]["p50"],result["triangles"],
+           " ".join("%s:%.0f" % item for item in result["levels"].items())),flush=True)
+  WriteResults(results,args.output)
+  ctx.Terminate()
+  return results
+
+def Metric (result, path):
+  value = result
+  for key in path.split("."):
+    if not isinstance(value,dict) or key not in value:
+      return None
+    value = value[key]
+  return value
+
+# list the metrics of 'new' that regressed with respect to 'base' (relative
+# increase above threshold for times and memory; any increase for counts)
+def Compare (base, new, threshold=0.1):
+  regressions = []
+  previous = {r["name"]: r for r in base["results"]}
+  for result in new["results"]:
+    old = previous.get(result["name"])
+    if old is None:
+      continue
+    for path, relative, slack in METRICS:
+      a, b = Metric(old,path), Metric(result,path)
+      if a is None or b is None or b - a <= slack:
+        continue
+      if (relative and b > a * (1+threshold)) or (not relative and b > a):
+        regressions.append((result["name"],path,a,b))
+  return regressions
+
+def CompareFiles (args):
+  with open(args.base) as f:
+    base = json.load(f)
+  with open(args.new) as f:
+    new = json.load(f)
+  regressions = Compare(base,new,args.threshold)
+  for name, path, a, b in regressions:
+    change = (b/a - 1) * 100 if a else float("inf")
+    print("REGRESSION %-24s %-16s %12.3f -> %12.3f (%+.1f%%)" % (name,path,a,b,change))
+  if not regressions:
+    print("no regressions (threshold %.0f%%)" % (args.threshold*100))
+  return 1 if regressions else 0
+
+def IntList (text):
+  return [int(x) for x in text.split(",")]
+
+def NameList (choices):
+  def parse (text):
+    names = text.split(",")
+    for name in names:
+      if name not in choices:
+        raise argparse.ArgumentTypeError("invalid choice: " + name)
+    return names
+  return parse
+
+# usage:
+#   python benchmark.py run [-o results.json] [--sizes 10,100] [--layouts shallow,deep] ...
+#   python benchmark.py compare base.json new.json [--threshold 0.1]
+#   python benchmark.py overdraw [--layers 16] [--width 1920 --height 1080]
+#   python benchmark.py lights [--lights 0,16,64,256,1024] [--nodes 1000]
+#   python benchmark.py shadows [--nodes 1000] [--size 1024]
+#   python benchmark.py shadinglod [--nodes 1000] [--low 24 --high 32]
+#   python benchmark.py fog [--nodes 10000] [--side 200] [--density 0.1]
+#   python benchmark.py geomlod [--nodes 1000] [--error 0.5]
+def main ():
+  parser = argparse.ArgumentParser(description="Headless scene graph benchmark")
+  commands = parser.add_subparsers(dest="command",required=True)
+  run = commands.add_parser("run",help="render synthetic scenes and write the results as JSON")
+  run.add_argument("-o","--output",default="benchmark.json")
+  run.add_argument("--sizes",type=IntList,default=SIZES,help="number of nodes (comma separated)")
+  run.add_argument("--layouts",type=NameList(LAYOUTS),default=LAYOUTS)
+  run.add_argument("--shapes",type=NameList(SHAPES+["mixed"]),default=["mixed"])
+  run.add_argument("--frames",type=int,default=60)
+  run.add_argument("--budget",type=float,default=20.0,help="seconds per scenario (at least 3 frames)")
+  run.add_argument("--width",type=int,default=640)
+  run.add_argument("--height",type=int,default=480)
+  run.add_argument("--null",action="store_true",help="no GL driver: measure the Python side only (see nullgl)")
+  run.add_argument("--soa",action="store_true",help="back the transforms with a TransformArray")
+  compare = commands.add_parser("compare",help="flag regressions of new results against base results")
+  compare.add_argument("base")
+  compare.add_argument("new")
+  compare.add_argument("--threshold",type=float,default=0.1,help="relative tolerance for times and memory")
+  overdraw = commands.add_parser("overdraw",help="shading cost of stacked full-screen layers with and without depth pre-pass")
+  overdraw.add_argument("-o","--output")
+  overdraw.add_argument("--layers",type=int,default=16)
+  overdraw.add_argument("--iterations",type=int,default=64,help="loop length of the fragment shader")
+  overdraw.add_argument("--frames",type=int,default=10)
+  overdraw.add_argument("--width",type=int,default=1920)
+  overdraw.add_argument("--height",type=int,default=1080)
+  lights = commands.add_parser("lights",help="frame time against the number of clustered point lights")
+  lights.add_argument("-o","--output")
+  lights.add_argument("--lights",type=IntList,default=[0,16,64,256,1024],help="light counts (comma separated)")
+  lights.add_argument("--nodes",type=int,default=1000)
+  lights.add_argument("--frames",type=int,default=20)
+  lights.add_argument("--width",type=int,default=1280)
+  lights.add_argument("--height",type=int,default=720)
+  shadows = commands.add_parser("shadows",help="frame time with cached, uncached and partly dynamic shadow maps")
+  shadows.add_argument("-o","--output")
+  shadows.add_argument("--nodes",type=int,default=1000)
+  shadows.add_argument("--size",type=int,default=1024,help="shadow map resolution")
+  shadows.add_argument("--frames",type=int,default=20)
+  shadows.add_argument("--width",type=int,default=1280)
+  shadows.add_argument("--height",type=int,default=720)
+  shadinglod = commands.add_parser("shadinglod",help="frame time with per-fragment, per-vertex and screen-size selected shading")
+  shadinglod.add_argument("-o","--output")
+  shadinglod.add_argument("--nodes",type=int,default=1000)
+  shadinglod.add_argument("--low",type=float,default=24.0,help="size (pixels) below which nodes switch to per-vertex shading")
+  shadinglod.add_argument("--high",type=float,default=32.0,help="size (pixels) above which they switch back")
+  shadinglod.add_argument("--frames",type=int,default=20)
+  shadinglod.add_argument("--width",type=int,default=1280)
+  shadinglod.add_argument("--height",type=int,default=720)
+  fog = commands.add_parser("fog",help="frame time of a large scattered scene without fog, with fog and with fog culling")
+  fog.add_argument("-o","--output")
+  fog.add_argument("--nodes",type=int,default=10000)
+  fog.add_argument("--side",type=float,default=200.0,help="side of the cube the objects are scattered in")
+  fog.add_argument("--density",type=float,default=0.1,help="fog density (saturated beyond ln(510)/density)")
+  fog.add_argument("--frames",type=int,default=20)
+  fog.add_argument("--width",type=int,default=1280)
+  fog.add_argument("--height",type=int,default=720)
+  geomlod = commands.add_parser("geomlod",help="frame time and triangles with the finest tessellations and with screen-space error selected levels (shapes and simplified meshes)")
+  geomlod.add_argument("-o","--output")
+  geomlod.add_argument("--nodes",type=int,default=1000)
+  geomlod.add_argument("--error",type=float,default=0.5,help="screen-space error budget (pixels)")
+  geomlod.add_argument("--frames",type=int,default=20)
+  geomlod.add_argument("--width",type=int,default=1280)
+  geomlod.add_argument("--height",type=int,default=720)
+  args = parser.parse_args()
+  if args.command == "run":
+    Run(args)
+  elif args.command == "overdraw":
+    RunOverdraw(args)
+  elif args.command == "lights":
+    RunLights(args)
+  elif args.command == "shadows":
+    RunShadows(args)
+  elif args.command == "shadinglod":
+    RunShadingLOD(args)
+  elif args.command == "fog":
+    RunFog(args)
+  elif args.command == "geomlod":
+    RunGeometricLOD(args)
+  else:
+    sys.exit(CompareFiles(args))
+
+if __name__ == "__main__":
+  main()
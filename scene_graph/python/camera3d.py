@@ -2,6 +2,9 @@ import math
 import glm
 from OpenGL.GL import *
 from camera import *
+import changes
+
+ORIGIN = glm.vec4(0,0,0,1)   # camera position in camera space
 
 class Camera3D (Camera):
   def __init__(self, x, y, z):
@@ -14,9 +17,11 @@ class Camera3D (Camera):
     self.up = glm.vec3(0,1,0)
     self.arcball = None
     self.reference = None
+    self.fog = None
 
   def SetAngle (self, fovy):
     self.fovy = fovy
+    changes.Touch()
 
   def GetAngle (self):
     return self.fovy
@@ -24,24 +29,29 @@ class Camera3D (Camera):
   def SetZPlanes (self, znear, zfar):
     self.znear = znear
     self.zfar = zfar
+    changes.Touch()
   
   def SetCenter (self, x, y, z):
     self.center = glm.vec3(x,y,z)
+    changes.Touch()
 
   def GetCenter (self):
     return self.center
 
   def SetEye (self, x, y, z):
     self.eye = glm.vec3(x,y,z)
+    changes.Touch()
 
   def GetEye (self):
     return self.eye
 
   def SetUpDir (self, x, y, z):
     self.up = glm.vec3(x,y,z)
+    changes.Touch()
 
   def SetOrtho (self, flag):
     self.ortho = flag
+    changes.Touch()
 
   def CreateArcball (self):
     from arcball import Arcball
@@ -52,19 +62,37 @@ class Camera3D (Camera):
   def GetArcball (self):
     return self.arcball
 
+  # the far plane is brought in to where the fog saturates (see Fog)
+  def SetFog (self, fog):
+    self.fog = fog
+    changes.Touch()
+
+  def GetFog (self):
+    return self.fog
+
+  # far plane in use: zfar, or the fog's distance when nearer
+  def GetFar (self):
+    if self.fog and self.fog.IsCulling():
+      return max(self.znear*2.0,min(self.zfar,self.fog.GetDistance()))
+    return self.zfar
+
   def SetReference (self, ref):
     self.reference = ref
+    changes.Touch()
 
   def GetProjMatrix (self):
     vp = glGetIntegerv(GL_VIEWPORT)
     ratio = vp[2]/vp[3]
     if not self.ortho:
-      return glm.perspective(glm.radians(self.fovy),ratio,self.znear,self.zfar)
+      return glm.perspective(glm.radians(self.fovy),ratio,self.znear,self.GetFar())
     else:
       dist = glm.distance(self.eye,self.center)
       height = dist * math.tan(glm.radians(self.fovy)/2)
       width = height / vp[3] * vp[2]
-      return glm.ortho(-width,width,-height,height,self.znear,self.zfar)
+      return glm.ortho(-width,width,-height,height,self.znear,self.GetFar())
+
+  def GetViewInverse (self):
+    return glm.inverse(self.GetViewMatrix())
 
   def GetViewMatrix (self):
     view = glm.mat4(1.0)
@@ -77,8 +105,9 @@ class Camera3D (Camera):
 
   def Load (self, st):
     shd = st.GetShader()
-    cpos = glm.vec4(0,0,0,1)
+    if shd.HasBlock("FrameBlock"):   # uploaded once per frame (see State.LoadFrame)
+      return
     if shd.GetLightingSpace() == "world":
-      mat = glm.inverse(self.GetViewMatrix())
-      cpos = mat * cpos
-    shd.SetUniform("cpos",cpos)
+      shd.SetUniform("cpos",st.GetCameraPosition())
+    else:
+      shd.SetUniform("cpos",ORIGIN)
@@ -0,0 +1,116 @@
+import ctypes
+import collections
+import os
+from concurrent.futures import ThreadPoolExecutor
+from OpenGL.GL import *
+from PIL import Image
+import numpy as np
+
+# Asynchronous frame capture: each frame is read into one of a ring of pixel
+# buffer objects guarded by a fence, so the copy of frame N completes while
+# frames N+1..N+k render; mapped pixels are encoded to disk by a thread pool.
+# Capture blocks only when the ring is full (GPU behind) or when more than
+# 'pending' frames wait for encoding (encoders behind).
+class FrameCapture:
+  def __init__ (self, width, height, ring=3, workers=2, pending=8):
+    self.width = width
+    self.height = height
+    self.nbytes = width*height*4
+    self.pbos = [int(id) for id in np.atleast_1d(glGenBuffers(ring))]
+    for pbo in self.pbos:
+      glBindBuffer(GL_PIXEL_PACK_BUFFER,pbo)
+      glBufferData(GL_PIXEL_PACK_BUFFER,self.nbytes,None,GL_STREAM_READ)
+    glBindBuffer(GL_PIXEL_PACK_BUFFER,0)
+    self.slots = [None] * ring     # (fence, filename) of each frame in flight
+    self.head = 0                  # next slot to be written
+    self.tail = 0                  # oldest slot in flight
+    self.pool = ThreadPoolExecutor(workers)
+    self.encoding = collections.deque()
+    self.pending = pending
+    self.captured = 0
+    self.stalls = 0                # captures that had to wait (ring or encoders full)
+
+  # queue a readback of the current read framebuffer, to be saved as filename
+  # (format from the extension; ".raw" writes the bare RGBA rows, bottom row first)
+  def Capture (self, filename):
+    if self.slots[self.head]:
+      self.stalls += 1
+      self.Collect(True)   # ring full: wait for the oldest frame
+    glBindBuffer(GL_PIXEL_PACK_BUFFER,self.pbos[self.head])
+    glPixelStorei(GL_PACK_ALIGNMENT,1)
+    glReadPixels(0,0,self.width,self.height,GL_RGBA,GL_UNSIGNED_BYTE,ctypes.c_void_p(0))
+    glBindBuffer(GL_PIXEL_PACK_BUFFER,0)
+    fence = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE,0)
+    self.slots[self.head] = (fence,filename)
+    self.head = (self.head + 1) % len(self.slots)
+    self.captured += 1
+    self.Poll()
+
+  # hand every completed readback to the encoders (never blocks on the GPU)
+  def Poll (self):
+    while self.slots[self.tail] and self.Collect(False):
+      pass
+
+  # map the oldest readback and submit it for encoding; returns False if not
+  # complete yet (and block is False), raises if the wait failed
+  def Collect (self, block):
+    fence, filename = self.slots[self.tail]
+    timeout = 1000000000 if block else 0   # ns
+    status = glClientWaitSync(fence,GL_SYNC_FLUSH_COMMANDS_BIT,timeout)
+    while block and status == GL_TIMEOUT_EXPIRED:
+      status = glClientWaitSync(fence,GL_SYNC_FLUSH_COMMANDS_BIT,timeout)
+    if status == GL_WAIT_FAILED:   # drop the frame, free its slot
+      glDeleteSync(fence)
+      self.slots[self.tail] = None
+      self.tail = (self.tail + 1) % len(self.slots)
+      raise RuntimeError("FrameCapture: wait failed for " + filename)
+    if status not in (GL_ALREADY_SIGNALED,GL_CONDITION_SATISFIED):
+      return False
+    glDeleteSync(fence)
+    glBindBuffer(GL_PIXEL_PACK_BUFFER,self.pbos[self.tail])
+    ptr = glMapBufferRange(GL_PIXEL_PACK_BUFFER,0,self.nbytes,GL_MAP_READ_BIT)
+    data = np.ctypeslib.as_array(ctypes.cast(ptr,ctypes.POINTER(ctypes.c_ubyte)),(self.nbytes,)).copy()
+    glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+    glBindBuffer(GL_PIXEL_PACK_BUFFER,0)
+    self.slots[self.tail] = None
+    self.tail = (self.tail + 1) % len(self.slots)
+    self.Encode(data,filename)
+    return True
+
+  def Encode (self, data, filename):
+    while self.encoding and self.encoding[0].done():
+      self.encoding.popleft().result()   # propagates encoding errors
+    if len(self.encoding) >= self.pending:
+      self.stalls += 1
+      self.encoding.popleft().result()   # back-pressure: wait for the oldest
+    self.encoding.append(self.pool.submit(WriteImage,data,self.width,self.height,filename))
+
+  def GetCapturedCount (self):
+    return self.captured
+
+  def GetStallCount (self):
+    return self.stalls
+
+  # wait for all frames in flight and their encoding
+  def Flush (self):
+    while self.slots[self.tail]:
+      self.Collect(True)
+    while self.encoding:
+      self.encoding.popleft().result()
+
+  def Close (self):
+    self.Flush()
+    self.pool.shutdown()
+    glDeleteBuffers(len(self.pbos),self.pbos)
+    self.pbos = []
+
+def WriteImage (data, width, height, filename):
+  dirname = os.path.dirname(filename)
+  if dirname:
+    os.makedirs(dirname,exist_ok=True)
+  if filename.endswith(".raw"):
+    with open(filename,"wb") as f:
+      f.write(data.tobytes())
+  else:
+    image = np.flipud(data.reshape(height,width,4))
+    Image.fromarray(image).save(filename)
@@ -0,0 +1,20 @@
+# Change tracking for render-on-demand (see AppLoop's on_demand): whatever
+# alters the rendered image (transforms, cameras, arcball, materials, lights,
+# variables, scene structure) calls Touch, and a loop renders again only when
+# the version moved since its last frame. Changes to what a StaticLayer
+# caches (poses of static nodes, materials, lights, scene structure) pass
+# static=True and also move the static version.
+version = 0
+staticversion = 0
+
+def Touch (static=False):
+  global version, staticversion
+  version += 1
+  if static:
+    staticversion = version
+
+def GetVersion ():
+  return version
+
+def GetStaticVersion ():
+  return staticversion
@@ -0,0 +1,155 @@
+import math
+import glm
+import numpy as np
+from OpenGL.GL import *
+
+from appearance import Appearance
+from texbuffer import TexBuffer
+import changes
+
+FEATURES = {"USE_CLUSTERED": True}
+
+# Clustered forward lighting: hundreds of point lights, each with a radius
+# beyond which it adds nothing. The view frustum is split in a grid of
+# clusters (screen tiles times exponential depth slices) and, whenever the
+# camera, the viewport or the lights change, each light is assigned on the
+# CPU to the clusters its bounding box overlaps. Lights, per-cluster ranges
+# and the light index list go to the shader as texture buffers; fragment
+# shaders compiled with USE_CLUSTERED (see shaders/clustered.glsl) find
+# their cluster from gl_FragCoord and loop over its lights only.
+#
+# As an appearance it applies to the shader of its node (the one lighting
+# the subtree), which is reloaded as its USE_CLUSTERED variant:
+#   lights = ClusteredLights()
+#   lights.AddLight(x,y,z,radius,r,g,b)
+#   root.AddAppearance(lights)
+class ClusteredLights (Appearance):
+  def __init__ (self, nx=16, ny=9, nz=24):
+    self.grid = glm.ivec3(nx,ny,nz)
+    self.data = np.zeros((0,8),dtype=np.float32)   # world position, radius, color, unused
+    self.key = None         # (proj, view, viewport, space, version) of the assignment
+    self.version = 0        # bumped by light edits
+    self.lights = None      # texture buffers, created on first use
+    self.clusters = None
+    self.indices = None
+    self.zparams = glm.vec4(0.0)   # projection terms giving view depth from window depth
+    self.slices = glm.vec2(0.0)    # log(depth) to slice scale and bias
+    self.viewport = glm.vec4(0.0)
+
+  def AddLight (self, x, y, z, radius, r=1.0, g=1.0, b=1.0):
+    self.data = np.vstack([self.data,np.array([[x,y,z,radius,r,g,b,0.0]],dtype=np.float32)])
+    self.Touch()
+    return len(self.data) - 1
+
+  def GetCount (self):
+    return len(self.data)
+
+  def SetPosition (self, i, x, y, z):
+    self.data[i,0:3] = (x,y,z)
+    self.Touch()
+
+  def GetPosition (self, i):
+    return glm.vec3(*self.data[i,0:3])
+
+  def SetRadius (self, i, radius):
+    self.data[i,3] = radius
+    self.Touch()
+
+  def SetColor (self, i, r, g, b):
+    self.data[i,4:7] = (r,g,b)
+    self.Touch()
+
+  def Touch (self):
+    self.version += 1
+    changes.Touch()
+
+  # lights of each cluster, for the given camera matrices and viewport
+  # (x, y, width, height); returns (first, count) per cluster, x fastest,
+  # and the concatenated light indices
+  def Assign (self, proj, view, viewport):
+    nx, ny, nz = self.grid
+    P = np.array(proj,dtype=np.float64)   # row-major (math) layout
+    V = np.array(view,dtype=np.float64)
+    # near and far distances: view depth d = -z from the clip z and w rows
+    A, B, C, D = P[2,2], P[2,3], P[3,2], P[3,3]
+    near = (B + D) / (A + C)    # ndc z = -1
+    far = (B - D) / (A - C)     # ndc z = +1
+    self.zparams = glm.vec4(A,B,C,D)
+    self.slices = glm.vec2(nz/math.log(far/near),-nz*math.log(near)/math.log(far/near))
+    self.viewport = glm.vec4(*[float(v) for v in viewport])
+    pos = self.data[:,0:3] @ V[0:3,0:3].T + V[0:3,3]
+    radius = self.data[:,3]
+    d0 = np.maximum(-pos[:,2]-radius,near)   # fragments lie beyond the near plane
+    d1 = np.minimum(-pos[:,2]+radius,far)
+    visible = d0 < d1
+    # depth slices
+    scale = nz / math.log(far/near)
+    z0 = np.floor(np.log(d0/near)*scale)
+    z1 = np.floor(np.log(np.maximum(d1,near)/near)*scale)
+    # screen tiles: normalized device extremes of the box corners
+    def Tiles (axis, n):
+      lo = pos[:,axis] - radius
+      hi = pos[:,axis] + radius
+      ndc = []
+      for d in (d0,d1):
+        w = C*-d + D
+        for c in (lo,hi):
+          ndc.append((P[axis,axis]*c + P[axis,2]*-d + P[axis,3]) / w)
+      ndc = np.array(ndc)
+      return (np.floor((ndc.min(0)*0.5+0.5)*n),np.floor((ndc.max(0)*0.5+0.5)*n))
+    x0, x1 = Tiles(0,nx)
+    y0, y1 = Tiles(1,ny)
+    visible &= (x1 >= 0) & (x0 < nx) & (y1 >= 0) & (y0 < ny)
+    def Mask (lo, hi, n):
+      cells = np.arange(n)
+      return (cells >= lo[:,None]) & (cells <= hi[:,None]) & visible[:,None]
+    mx, my, mz = Mask(x0,x1,nx), Mask(y0,y1,ny), Mask(z0,z1,nz)
+    cover = mz[:,:,None,None] & my[:,None,:,None] & mx[:,None,None,:]
+    cover = cover.reshape(len(self.data),nx*ny*nz).T    # cluster by light
+    cluster, light = np.nonzero(cover)                  # sorted by cluster
+    counts = np.bincount(cluster,minlength=nx*ny*nz)
+    first = np.concatenate([[0],np.cumsum(counts)[:-1]])
+    return np.stack([first,counts],axis=1).astype(np.int32), light.astype(np.int32)
+
+  def Update (self, st, space):
+    vp = glGetIntegerv(GL_VIEWPORT)
+    viewport = (int(vp[0]),int(vp[1]),int(vp[2]),int(vp[3]))
+    key = (st.GetProjMatrix(),st.GetViewMatrix(),viewport,space,self.version)
+    if key == self.key:
+      return
+    clusters, indices = self.Assign(key[0],key[1],viewport)
+    # light positions in the lighting space of the shader
+    data = self.data.copy()
+    if space == "camera":
+      V = np.array(st.GetViewMatrix(),dtype=np.float32)
+      data[:,0:3] = data[:,0:3] @ V[0:3,0:3].T + V[0:3,3]
+    data = data.reshape(-1,4) if len(data) else np.zeros((2,4),dtype=np.float32)
+    if len(indices) == 0:
+      indices = np.zeros(1,dtype=np.int32)
+    if self.lights is None:
+      self.lights = TexBuffer("clights",data)
+      self.clusters = TexBuffer("cclusters",clusters)
+      self.indices = TexBuffer("cindices",indices)
+    else:
+      self.lights.SetData(data)
+      self.clusters.SetData(clusters)
+      self.indices.SetData(indices)
+    self.key = key
+
+  def Load (self, st):
+    st.PushFeatures(FEATURES)
+    shd = st.GetShader()
+    self.Update(st,shd.GetLightingSpace())
+    self.lights.Load(st)
+    self.clusters.Load(st)
+    self.indices.Load(st)
+    shd.SetUniform("cgrid",self.grid)
+    shd.SetUniform("czparams",self.zparams)
+    shd.SetUniform("cslices",self.slices)
+    shd.SetUniform("cviewport",self.viewport)
+
+  def Unload (self, st):
+    self.indices.Unload(st)
+    self.clusters.Unload(st)
+    self.lights.Unload(st)
+    st.PopFeatures()
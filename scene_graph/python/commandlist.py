@@ -0,0 +1,86 @@
+import re
+import ctypes
+import numpy as np
+import OpenGL.GL
+import glintercept
+
+# queries: their results are already baked into the recorded arguments
+QUERIES = re.compile(r"^glGet|^glIs|^glCheckFramebufferStatus$")
+# glUniform*v / glProgramUniform*v: components per element (pointers are copied)
+UNIFORM = re.compile(r"^gl(Program)?Uniform(Matrix)?([1234])(?:x([234]))?(f|i|ui)v$")
+
+recording = None   # command list being recorded
+
+# Flattened GL call sequence of a subtree (see Node.SetFrozen). Record runs a
+# render function with the GL entry points intercepted, storing each call with
+# its resolved arguments (uniform locations, computed matrices) and dropping
+# queries; Replay issues the same calls again from a tight loop. A key stores
+# the context the sequence was recorded in.
+class CommandList:
+  def __init__ (self, key=None):
+    self.key = key
+    self.commands = []
+    self.paused = False   # calls go through unrecorded (see Unrecorded)
+
+  def GetKey (self):
+    return self.key
+
+  def GetCommandCount (self):
+    return len(self.commands)
+
+  def Record (self, render, *args):
+    global recording
+    previous = recording
+    recording = self
+    patched = glintercept.Intercept(self.Wrap,[__name__])
+    try:
+      render(*args)
+    finally:
+      glintercept.Restore(patched)
+      recording = previous
+
+  def Wrap (self, name, func):
+    if QUERIES.match(name):
+      return func
+    match = UNIFORM.match(name)
+    if match:
+      n = int(match.group(3)) * int(match.group(4) or (match.group(3) if match.group(2) else 1))
+      index = 2 if match.group(1) else 1
+      dtype = {"f": np.float32, "i": np.int32, "ui": np.uint32}[match.group(5)]
+    def wrapper (*args):
+      if self.paused:
+        return func(*args)
+      result = func(*args)
+      if match:
+        args = list(args)
+        ptr = args[-1]
+        if isinstance(ptr,ctypes._Pointer):   # glm.value_ptr: may not outlive the value
+          args[-1] = np.array(ptr[:int(args[index])*n],dtype=dtype)
+      args = [np.array(arg) if isinstance(arg,np.ndarray) else arg for arg in args]
+      self.commands.append((func,tuple(args),name))
+      return result
+    return wrapper
+
+  # with instrumented=True, calls go through the current OpenGL.GL bindings
+  # (so that an installed GLCounter sees them)
+  def Replay (self, instrumented=False):
+    if instrumented:
+      for func, args, name in self.commands:
+        getattr(OpenGL.GL,name)(*args)
+    else:
+      for func, args, name in self.commands:
+        func(*args)
+
+def IsRecording ():
+  return recording is not None
+
+# call func with the GL calls it makes left out of the current recording
+# (one-off work such as uploads, done while rendering a frozen subtree)
+def Unrecorded (func, *args):
+  if recording is None or recording.paused:
+    return func(*args)
+  recording.paused = True
+  try:
+    return func(*args)
+  finally:
+    recording.paused = False
@@ -1,19 +1,38 @@
 from OpenGL.GL import *
+import time
 import shaderutl as sutl
 
 class ComputeShader:
   def __init__ (self, filename):
     self.texunit = 0
-    self.pid = None
     self.texbuffers = []
-    self.shader = sutl.create_shader(GL_COMPUTE_SHADER,filename)
+    self.filename = filename
+    # compile and link are submitted here and complete in the background
+    self.shader = sutl.submit_shader(GL_COMPUTE_SHADER,filename)
+    self.pid = sutl.submit_program(self.shader)
+    self.pending = True
+    self.submitted = time.perf_counter()
 
   def AttachTexBuffer (self, texbuffer):
     self.texbuffers.append(texbuffer)
 
-  def Dispatch (self, nx, ny=1, nz=1):
-    if not self.pid:
-      self.pid = sutl.create_program(self.shader)
+  def IsReady (self):
+    if self.pending and sutl.program_ready(self.pid,self.submitted):
+      self.Finish()
+    return not self.pending
+
+  # block until the program is linked (raises on compilation or link errors)
+  def Finish (self):
+    if self.pending:
+      self.pending = False
+      sutl.check_program(self.pid,[self.shader],[self.filename])
+
+  # with wait=False, returns False (and dispatches nothing) while still compiling
+  def Dispatch (self, nx, ny=1, nz=1, wait=True):
+    if not self.IsReady():
+      if not wait:
+        return False
+      self.Finish()
 
     glUseProgram(self.pid)
     for i,tb in enumerate(self.texbuffers):
@@ -27,4 +46,5 @@ class ComputeShader:
     glDispatchCompute(nx, ny, nz)
     glMemoryBarrier(GL_SHADER_STORAGE_BARRIER_BIT |
                     GL_TEXTURE_FETCH_BARRIER_BIT |
-                    GL_BUFFER_UPDATE_BARRIER_BIT)
\ No newline at end of file
+                    GL_BUFFER_UPDATE_BARRIER_BIT)
+    return True
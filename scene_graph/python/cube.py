@@ -1,5 +1,5 @@
 from OpenGL.GL import *
-from shape import Shape
+from shape import Shape, Tangents
 import numpy as np
 
 class Cube (Shape):
@@ -100,38 +100,6 @@ class Cube (Shape):
       1.0, 1.0,
       0.0, 1.0,
     ], dtype = 'float32')
-    tangents = np.array([
-      # back face: counter clockwise 
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      # front face: counter clockwise 
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-      # left face: counter clockwise
-      0.0, 1.0, 0.0,
-      0.0, 1.0, 0.0,
-      0.0, 1.0, 0.0,
-      0.0, 1.0, 0.0,
-      # right face: counter clockwise
-      0.0,-1.0, 0.0,
-      0.0,-1.0, 0.0,
-      0.0,-1.0, 0.0,
-      0.0,-1.0, 0.0,
-      # botton face: counter clockwise 
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      -1.0, 0.0, 0.0,
-      # top face: counter clockwise
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-      1.0, 0.0, 0.0,
-    ], dtype = 'float32')
     index = np.array([
       0,1,2,0,2,3,
       4,5,6,4,6,7,
@@ -140,6 +108,9 @@ class Cube (Shape):
       16,17,18,16,18,19,
       20,21,22,20,22,23
     ], dtype = 'uint32')
+    tangents = Tangents(coords,normals,texcoords,index)
+    self.SetBounds(coords)
+    self.nind = 36
     # create VAO
     self.vao = glGenVertexArrays(1)
     glBindVertexArray(self.vao)
@@ -157,7 +128,7 @@ class Cube (Shape):
     # create tangent buffer
     glBindBuffer(GL_ARRAY_BUFFER,ids[2])
     glBufferData(GL_ARRAY_BUFFER,tangents.nbytes,tangents,GL_STATIC_DRAW)
-    glVertexAttribPointer(2,3,GL_FLOAT,GL_FALSE,0,None)
+    glVertexAttribPointer(2,4,GL_FLOAT,GL_FALSE,0,None)
     glEnableVertexAttribArray(2)
     # create tex coord buffer
     glBindBuffer(GL_ARRAY_BUFFER,ids[3])
@@ -0,0 +1,193 @@
+import os
+import math
+import ctypes
+import glm
+import numpy as np
+from OpenGL.GL import *
+
+from shader import Shader
+from framebuffer import Framebuffer
+from texcolor import TexColor
+from texdepth import TexDepth
+
+SHADERS = os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders")
+
+# triangles of a sphere enclosing the unit one (outward, counterclockwise)
+def VolumeMesh (stacks=8, slices=12):
+  scale = 1.0 / (math.cos(math.pi/(2*stacks)) * math.cos(math.pi/slices))
+  coords = []
+  for i in range(stacks+1):
+    theta = math.pi * i / stacks
+    for j in range(slices):
+      phi = 2 * math.pi * j / slices
+      coords.append((math.sin(theta)*math.cos(phi),math.cos(theta),math.sin(theta)*math.sin(phi)))
+  coords = np.array(coords,dtype=np.float32) * scale
+  tris = []
+  for i in range(stacks):
+    for j in range(slices):
+      a = i*slices + j
+      b = i*slices + (j+1) % slices
+      c = a + slices
+      d = b + slices
+      tris += [(a,b,d),(a,d,c)]
+  tris = np.array(tris,dtype=np.uint32)
+  v = coords[tris]
+  normal = np.cross(v[:,1]-v[:,0],v[:,2]-v[:,0])
+  flip = np.einsum("ij,ij->i",normal,v.sum(1)) < 0
+  tris[flip] = tris[flip][:,::-1]
+  area = np.linalg.norm(normal,axis=1) > 1e-6   # drop degenerate ones at the poles
+  return coords, tris[area].reshape(-1)
+
+# Deferred shading: nodes write diffuse and specular material colors and
+# octahedral normals to a compact G-buffer (RGBA8, RG16F, RGBA8 and depth),
+# then lighting runs per pixel on it: a full-screen pass for the ambient
+# term and the scene's Light (copying the depth to the target), and one
+# instanced draw of light volumes for the point lights of a ClusteredLights
+# set, added only where a sphere's back faces lie behind the scene
+# (GL_GEQUAL, front faces culled) and inside its radius. Lights outside the
+# view frustum are culled on the CPU. Forward nodes (Node.SetForward) and
+# translucent ones are drawn afterwards with their own shaders, e.g. for
+# textures or transparency, which the G-buffer does not keep:
+#   renderer = DeferredRenderer(scene,lights)
+#   renderer.Render(camera)       # instead of scene.Render(camera)
+class DeferredRenderer:
+  def __init__ (self, scene, lights=None, light=None):
+    self.scene = scene
+    self.lights = lights   # ClusteredLights (point lights), not attached to the scene
+    self.light = light or scene.GetRoot().GetShader().GetLight()
+    self.gbuffer = None
+    self.width = 0
+    self.height = 0
+    self.ambient = self.CreateShader("composite/vertex.glsl","deferred/ambient.glsl")
+    self.volume = self.CreateShader("deferred/volume_vertex.glsl","deferred/volume_fragment.glsl")
+    self.quad = glGenVertexArrays(1)   # attributeless draw
+    coords, indices = VolumeMesh()
+    self.nind = len(indices)
+    self.vao = glGenVertexArrays(1)
+    glBindVertexArray(self.vao)
+    ids = glGenBuffers(3)
+    glBindBuffer(GL_ARRAY_BUFFER,ids[0])
+    glBufferData(GL_ARRAY_BUFFER,coords.nbytes,coords,GL_STATIC_DRAW)
+    glVertexAttribPointer(0,3,GL_FLOAT,GL_FALSE,0,None)
+    glEnableVertexAttribArray(0)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER,ids[1])
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER,indices.nbytes,indices,GL_STATIC_DRAW)
+    self.instances = ids[2]   # per light: position and radius, color
+    glBindBuffer(GL_ARRAY_BUFFER,self.instances)
+    glVertexAttribPointer(1,4,GL_FLOAT,GL_FALSE,32,ctypes.c_void_p(0))
+    glVertexAttribDivisor(1,1)
+    glEnableVertexAttribArray(1)
+    glVertexAttribPointer(2,4,GL_FLOAT,GL_FALSE,32,ctypes.c_void_p(16))
+    glVertexAttribDivisor(2,1)
+    glEnableVertexAttribArray(2)
+    glBindVertexArray(0)
+
+  def CreateShader (self, vertex, fragment):
+    shader = Shader()
+    shader.AttachVertexShader(os.path.join(SHADERS,vertex))
+    shader.AttachFragmentShader(os.path.join(SHADERS,fragment))
+    shader.Link()
+    return shader
+
+  def Resize (self, width, height):
+    self.width = width
+    self.height = height
+    if self.gbuffer:
+      self.gbuffer.Delete()
+    self.gbuffer = Framebuffer(TexDepth("depth",width,height),
+                               [TexColor("albedo",width,height),
+                                TexColor("normal",width,height,GL_RG16F,GL_RG,GL_FLOAT),
+                                TexColor("specular",width,height)])
+
+  def Render (self, camera, alpha=1.0):
+    vp = glGetIntegerv(GL_VIEWPORT)
+    if vp[2] != self.width or vp[3] != self.height:
+      self.Resize(int(vp[2]),int(vp[3]))
+    self.gbuffer.Bind()
+    glViewport(0,0,self.width,self.height)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    report = self.scene.Render(camera,alpha,path="deferred")
+    self.gbuffer.Unbind()
+    glViewport(int(vp[0]),int(vp[1]),self.width,self.height)
+    viewport = glm.vec4(*[float(v) for v in vp])
+    self.Shade(camera,viewport)
+    self.scene.Render(camera,alpha,path="forward")
+    return report
+
+  def BindGBuffer (self, shader, viewport, proj):
+    shader.UseProgram()
+    textures = self.gbuffer.GetColorTextures() + [self.gbuffer.GetDepthTexture()]
+    for unit, tex in enumerate(textures):
+      shader.SetUniform(tex.varname,unit)
+      glActiveTexture(GL_TEXTURE0+unit)
+      glBindTexture(GL_TEXTURE_2D,tex.GetTexId())
+    shader.SetUniform("Pinv",glm.inverse(proj))
+    shader.SetUniform("viewport",viewport)
+    return len(textures)
+
+  def Shade (self, camera, viewport):
+    proj = camera.GetProjMatrix()
+    view = camera.GetViewMatrix()
+    func = glGetIntegerv(GL_DEPTH_FUNC)
+    test = glIsEnabled(GL_DEPTH_TEST)
+    cull = glIsEnabled(GL_CULL_FACE)
+    glEnable(GL_DEPTH_TEST)   # depth is only written with the test enabled
+    # ambient and scene light, G-buffer depth to the target
+    glDepthFunc(GL_ALWAYS)
+    units = self.BindGBuffer(self.ambient,viewport,proj)
+    light = self.light
+    self.ambient.SetUniform("lpos",view * light.GetWorldPosition(camera))
+    self.ambient.SetUniform("lamb",light.amb)
+    self.ambient.SetUniform("ldif",light.dif)
+    self.ambient.SetUniform("lspe",light.spe)
+    glBindVertexArray(self.quad)
+    glDrawArrays(GL_TRIANGLES,0,3)
+    # point lights: back faces of their volumes behind the scene, added
+    count = self.UpdateInstances(proj,view)
+    if count:
+      self.BindGBuffer(self.volume,viewport,proj)
+      self.volume.SetUniform("P",proj)
+      glDepthFunc(GL_GEQUAL)
+      glDepthMask(GL_FALSE)
+      glEnable(GL_BLEND)
+      glBlendFunc(GL_ONE,GL_ONE)
+      glEnable(GL_CULL_FACE)
+      glCullFace(GL_FRONT)
+      glEnable(GL_DEPTH_CLAMP)   # volumes beyond the far plane still count
+      glBindVertexArray(self.vao)
+      glDrawElementsInstanced(GL_TRIANGLES,self.nind,GL_UNSIGNED_INT,None,count)
+      glDisable(GL_DEPTH_CLAMP)
+      glCullFace(GL_BACK)
+      glDisable(GL_BLEND)
+      glDepthMask(GL_TRUE)
+    if not cull:
+      glDisable(GL_CULL_FACE)
+    glBindVertexArray(0)
+    for unit in reversed(range(units)):
+      glActiveTexture(GL_TEXTURE0+unit)
+      glBindTexture(GL_TEXTURE_2D,0)
+    glDepthFunc(func)
+    if not test:
+      glDisable(GL_DEPTH_TEST)
+    glUseProgram(0)
+
+  # camera space point lights intersecting the view frustum; returns their count
+  def UpdateInstances (self, proj, view):
+    if not self.lights or not self.lights.GetCount():
+      return 0
+    data = self.lights.data
+    V = np.array(view,dtype=np.float32)   # row-major (math) layout
+    pos = data[:,0:3] @ V[0:3,0:3].T + V[0:3,3]
+    # frustum planes (camera space) from the rows of the projection
+    P = np.array(proj,dtype=np.float32)
+    planes = np.array([P[3]+P[0],P[3]-P[0],P[3]+P[1],P[3]-P[1],P[3]+P[2],P[3]-P[2]])
+    planes /= np.linalg.norm(planes[:,0:3],axis=1)[:,None]
+    dist = pos @ planes[:,0:3].T + planes[:,3]
+    visible = (dist > -data[:,3:4]).all(axis=1)
+    instances = np.empty((int(visible.sum()),8),dtype=np.float32)
+    instances[:,0:3] = pos[visible]
+    instances[:,3:8] = data[visible,3:8]
+    glBindBuffer(GL_ARRAY_BUFFER,self.instances)
+    glBufferData(GL_ARRAY_BUFFER,instances.nbytes,instances if len(instances) else None,GL_STREAM_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER,0)
+    return len(instances)
@@ -1,3 +1,8 @@
 class Engine:
   def Update (self, dt):
-    pass
\ No newline at end of file
+    pass
+
+  # False while idle: with no engine animating, an on-demand AppLoop stops
+  # stepping the simulation and waits for events
+  def IsAnimating (self):
+    return True
@@ -1,5 +1,6 @@
 from light import Light
 import glm
+import changes
 
 class EyeLight(Light):
     def __init__ (self, x, y, z, w=1):
@@ -11,6 +12,7 @@ class EyeLight(Light):
       self.pos[1] = y
       self.pos[2] = z
       self.pos[3] = w
+      changes.Touch()
 
     def Load (self, st):
       Light.Load(self,st)
@@ -18,5 +20,5 @@ class EyeLight(Light):
       shd = st.GetShader()
       pos = self.pos
       if shd.GetLightingSpace() == "world":
-        pos = glm.inverse(st.GetCamera().GetViewMatrix())*pos
+        pos = st.GetViewInverse()*pos
       shd.SetUniform("lpos",pos)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import math
+import glm
+
+from appearance import Appearance
+import changes
+
+FEATURES = {"USE_FOG": True}
+
+# Exponential fog, visibility exp(-density*distance) from the camera, for
+# the USE_FOG variants (see shaders/fog.glsl); color and density go to the
+# shaders in the frame block. The CPU knows the distance at which the fog
+# saturates (visibility below 'threshold': within half an 8 bit step of the
+# fog color), so shapes whose bounding spheres lie entirely beyond it are
+# not drawn, and a camera given the fog (Camera3D.SetFog) brings its far
+# plane in to it. This assumes the background shows the fog color (e.g.
+# glClearColor) where culled shapes would have been.
+#
+# As an appearance it applies to the shaders of its node:
+#   fog = Fog(0.3,0.2,0.2,0.2)
+#   root.AddAppearance(fog)
+#   camera.SetFog(fog)
+class Fog (Appearance):
+  def __init__ (self, density=0.3, r=0.0, g=0.0, b=0.0, threshold=0.5/255):
+    self.color = glm.vec3(r,g,b)
+    self.density = density
+    self.threshold = threshold
+    self.culling = True
+    self.previous = []   # culling distances and fogs of enclosing fogs
+
+  def SetDensity (self, density):
+    self.density = density
+    changes.Touch()
+
+  def GetDensity (self):
+    return self.density
+
+  def SetColor (self, r, g, b):
+    self.color = glm.vec3(r,g,b)
+    changes.Touch()
+
+  def GetColor (self):
+    return self.color
+
+  def SetThreshold (self, threshold):
+    self.threshold = threshold
+    changes.Touch()
+
+  # cull the shapes beyond the fog (and fit the far plane of cameras)
+  def SetCulling (self, flag):
+    self.culling = flag
+    changes.Touch()
+
+  def IsCulling (self):
+    return self.culling
+
+  # distance from the camera beyond which everything has the fog color
+  def GetDistance (self):
+    if self.density <= 0.0:
+      return math.inf
+    return -math.log(self.threshold) / self.density
+
+  def Load (self, st):
+    st.PushFeatures(FEATURES)
+    self.previous.append((st.range,st.fog))
+    # not from a light's camera (shadow maps) nor into a G-buffer (no fog
+    # applied); the depth pre-pass culls as the shading pass does
+    if self.culling and not st.lightcamera and (st.override is None or st.prepass == "depth"):
+      st.range = self.GetDistance()
+    st.SetFog(glm.vec4(self.color,self.density))
+
+  def Unload (self, st):
+    st.range, fog = self.previous.pop()
+    st.SetFog(fog)
+    st.PopFeatures()
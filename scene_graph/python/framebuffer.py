@@ -1,16 +1,30 @@
 from OpenGL.GL import *
 import numpy as np
 
+# framebuffer restored by Unbind (None: the window's framebuffer)
+default = None
+
+def SetDefault (fb):
+  global default
+  default = fb
+
+def GetDefault ():
+  return default
+
+# face: attach that face (0 to 5: +x, -x, +y, -y, +z, -z) of a cube map depth texture
 class Framebuffer:
-  def __init__ (self, depth=None, colors=None):
+  def __init__ (self, depth=None, colors=None, face=None):
     self.depth = depth         # depth texture buffer
     self.colors = colors or [] # color texture buffers
     self.fbo = glGenFramebuffers(1)
     glBindFramebuffer(GL_FRAMEBUFFER,self.fbo)
-    if self.depth:
+    if self.depth and face is not None:
+      glFramebufferTexture2D(GL_FRAMEBUFFER,GL_DEPTH_ATTACHMENT,GL_TEXTURE_CUBE_MAP_POSITIVE_X+face,self.depth.GetTexId(),0)
+    elif self.depth:
       glFramebufferTexture(GL_FRAMEBUFFER,GL_DEPTH_ATTACHMENT,self.depth.GetTexId(),0)
     for i,tex in enumerate(self.colors):
       glFramebufferTexture(GL_FRAMEBUFFER,GL_COLOR_ATTACHMENT0+i,tex.GetTexId(),0)
+    self.buffers = np.array([GL_COLOR_ATTACHMENT0+i for i in range(len(self.colors))],dtype="uint32")
     if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
       raise RuntimeError("Framebuffer not complete")
     glBindFramebuffer(GL_FRAMEBUFFER,0)
@@ -26,11 +40,22 @@ class Framebuffer:
     if not self.colors:
       glDrawBuffer(GL_NONE)
     else:
-      buffers = []
-      for i in range(0,len(self.colors)):
-        buffers.append(GL_COLOR_ATTACHMENT0+i)
-      glDrawBuffers(self.colors.size(),np.array(buffers,dtype="uint8"))
+      glDrawBuffers(len(self.buffers),self.buffers)
+
+  def GetId (self):
+    return self.fbo
+
+  # free the framebuffer and the textures attached to it
+  def Delete (self):
+    glDeleteFramebuffers(1,[self.fbo])
+    self.fbo = 0
+    for tex in [self.depth] + self.colors:
+      if tex:
+        tex.Delete()
 
   def Unbind (self):
-    glBindFramebuffer(GL_FRAMEBUFFER,0)
-    glDrawBuffer(GL_BACK)
+    if default and default is not self:
+      default.Bind()
+    else:
+      glBindFramebuffer(GL_FRAMEBUFFER,0)
+      glDrawBuffer(GL_BACK)
@@ -0,0 +1,91 @@
+import glm
+
+from appearance import Appearance
+import commandlist
+
+# Geometric level of detail: each shape with tessellation levels (see
+# Shape.SetLevels) is drawn with its coarsest level whose error, projected
+# at the nearest point of the shape's bounding sphere, stays within the
+# budget (in pixels). Levels are built on first use; a frozen subtree being
+# recorded only picks among the levels already built, so that no buffer
+# upload ends up in its recording. Shadow maps are cast by the levels
+# selected from the light, so shadow lookups on a coarser level are pushed
+# out along the normal by its extra error (see shaders/shadow.glsl).
+#
+# As an appearance it applies to the shapes of its subtree:
+#   detail = GeometricLOD(0.5)
+#   root.AddAppearance(detail)
+# GetTriangleCount and GetLevelCounts tell how many triangles and shapes of
+# each level were drawn since the last ResetCounts (call it once per frame).
+class GeometricLOD (Appearance):
+  def __init__ (self, error=1.0):
+    self.error = error
+    self.previous = None    # enclosing GeometricLOD
+    self.scale = 1.0        # pixels per unit at unit depth
+    self.ortho = False
+    self.triangles = 0
+    self.counts = {}        # shapes drawn at each level
+
+  # largest screen-space error (pixels) of the selected levels
+  def SetError (self, error):
+    self.error = error
+
+  def GetError (self):
+    return self.error
+
+  def GetTriangleCount (self):
+    return self.triangles
+
+  def GetLevelCounts (self):
+    return dict(self.counts)
+
+  def ResetCounts (self):
+    self.triangles = 0
+    self.counts = {}
+
+  # pixels covered by a model unit of shp at its nearest point, scaled by
+  # scale under the current matrix; None when the camera is inside its bounds
+  def PixelsPerUnit (self, shp, scale, st):
+    if self.ortho:
+      return scale * self.scale
+    center, radius = shp.GetBounds()
+    depth = -(st.GetViewMatrix() * (st.GetCurrentMatrix() * center)).z - radius * scale
+    if depth <= 0.0:
+      return None
+    return scale * self.scale / depth
+
+  # level of shp to draw and its shadow offset (None when the shader takes
+  # none), applied by Node right before drawing the shape
+  def Select (self, shp, st):
+    k = 0
+    n = shp.GetLevelCount()
+    if n > 1 and shp.GetBounds() is not None:
+      model = st.GetCurrentMatrix()
+      scale = max(glm.length(glm.vec3(model[0])),glm.length(glm.vec3(model[1])),
+                  glm.length(glm.vec3(model[2])))
+      pixels = self.PixelsPerUnit(shp,scale,st)
+      if pixels is not None:
+        while k+1 < n and shp.GetLevelError(k+1) * pixels <= self.error:
+          k += 1
+        if commandlist.IsRecording():
+          while k > 0 and shp.GetLevel(k,False) is None:
+            k -= 1
+    offset = None
+    if not st.lightcamera and st.GetShader().GetUniformLocation("shadowOffset") >= 0:   # see ShadowMap
+      offset = (shp.GetLevelError(k) - shp.GetLevelError(0)) * scale if k else 0.0
+    level = shp.GetLevel(k)
+    self.triangles += level.GetTriangleCount()
+    self.counts[k] = self.counts.get(k,0) + 1
+    return level, offset
+
+  def Load (self, st):
+    self.previous = st.detail
+    st.detail = self
+    self.ortho = st.IsOrtho()
+    self.scale = st.GetPixelScale()
+
+  def Unload (self, st):
+    st.detail = self.previous
+    shd = st.GetShader()
+    if shd.GetUniformLocation("shadowOffset") >= 0:
+      shd.SetUniform("shadowOffset",0.0)
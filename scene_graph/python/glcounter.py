@@ -0,0 +1,131 @@
+import re
+import time
+import collections
+import glintercept
+
+# call categories, by function name (first match)
+CATEGORIES = [
+  ("draw", r"^gl(Multi)?Draw(Arrays|Elements|RangeElements)|^glDispatchCompute"),
+  ("program", r"^glUseProgram$"),
+  ("uniform", r"^glUniform|^glProgramUniform"),
+  ("texture", r"^glBindTexture|^glActiveTexture$|^glBindImageTexture|^glBindSampler"),
+  ("upload", r"^gl(Named)?Buffer(Sub)?Data|^glTex(ture)?(Sub)?Image|^glMapBuffer|^glCopyBufferSubData"),
+  ("query", r"^glGet|^glIs|^glReadPixels|^glFinish$|^glClientWaitSync$|^glCheckFramebufferStatus$"),
+  ("state", r"^glEnable|^glDisable|^glBind|^glBlend|^glDepth|^glCull|^glPolygon|^glViewport$|^glClear|^glDrawBuffer|^glColorMask|^glStencil"),
+]
+
+def Category (name):
+  for category, pattern in CATEGORIES:
+    if re.search(pattern,name):
+      return category
+  return "other"
+
+class Counts:
+  def __init__ (self):
+    self.calls = collections.Counter()
+    self.time = collections.Counter()   # ns
+
+  def Add (self, key, ns):
+    self.calls[key] += 1
+    self.time[key] += ns
+
+  def ToDict (self):
+    return {key: {"calls": self.calls[key], "time_ms": self.time[key]/1e6} for key in self.calls}
+
+# GL call interception (see Scene.AddInstrument). On creation, every OpenGL.GL
+# entry point bound in a loaded module (scene graph and application modules
+# import them with 'from OpenGL.GL import *'), as well as in OpenGL.GL itself
+# for modules imported later, is replaced by a wrapper that counts and times
+# the call; Uninstall restores the original functions, so nothing is paid
+# when the counter is not in use. Calls are attributed to the frame and to the
+# innermost scope (node) open at the time. Scene.Render returns the report of
+# each instrument; GetReport gives the last frame:
+#   {"frame", "calls", "time_ms", "categories", "functions", "scopes"}
+class GLCounter:
+  def __init__ (self, history=300):
+    self.reports = collections.deque(maxlen=history)
+    self.patched = []        # (module, name, original)
+    self.stack = []
+    self.frame = None
+    self.count = 0
+    self.depth = 0           # > 0 inside a wrapped call (GL calls made by wrappers are not counted)
+    self.Install()
+
+  def GetName (self):
+    return "glcounter"
+
+  def Install (self):
+    if not self.patched:
+      self.patched = glintercept.Intercept(self.Wrap,[__name__])
+
+  def Uninstall (self):
+    glintercept.Restore(self.patched)
+    self.patched = []
+
+  def Wrap (self, name, func):
+    category = Category(name)
+    clock = time.perf_counter_ns
+    def wrapper (*args, **kwargs):
+      if self.depth:
+        return func(*args,**kwargs)
+      self.depth += 1
+      t0 = clock()
+      try:
+        return func(*args,**kwargs)
+      finally:
+        self.Count(name,category,clock()-t0)
+        self.depth -= 1
+    wrapper.__name__ = name
+    wrapper.__wrapped__ = func
+    return wrapper
+
+  def Count (self, name, category, ns):
+    frame = self.frame
+    if frame is None:
+      return
+    frame["functions"].Add(name,ns)
+    frame["categories"].Add(category,ns)
+    path = "/".join(self.stack) if self.stack else "(frame)"
+    scope = frame["scopes"].get(path)
+    if scope is None:
+      scope = frame["scopes"][path] = Counts()
+    scope.Add(category,ns)
+
+  def BeginFrame (self):
+    self.frame = {"functions": Counts(), "categories": Counts(), "scopes": {}}
+
+  def EndFrame (self):
+    frame = self.frame
+    self.frame = None
+    functions = frame["functions"]
+    report = {
+      "frame": self.count,
+      "calls": sum(functions.calls.values()),
+      "time_ms": sum(functions.time.values())/1e6,
+      "categories": frame["categories"].ToDict(),
+      "functions": functions.ToDict(),
+      "scopes": {path: counts.ToDict() for path, counts in frame["scopes"].items()},
+    }
+    self.reports.append(report)
+    self.count += 1
+
+  def Begin (self, name):
+    self.stack.append(name)
+
+  def End (self):
+    self.stack.pop()
+
+  # report of the last rendered frame
+  def GetReport (self):
+    return self.reports[-1] if self.reports else None
+
+  def GetReports (self):
+    return list(self.reports)
+
+  # number of calls of a category (or function name) in the last frame
+  def GetCount (self, key):
+    report = self.GetReport()
+    if report is None:
+      return 0
+    entry = report["categories"].get(key) or report["functions"].get(key)
+    return entry["calls"] if entry else 0
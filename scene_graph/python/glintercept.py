@@ -0,0 +1,36 @@
+import sys
+import OpenGL.GL
+
+# Replace every OpenGL.GL function bound in a loaded module (modules import
+# them with 'from OpenGL.GL import *'), and in OpenGL.GL itself for modules
+# imported later, by wrap(name, func). Raw entry points a module imports
+# directly from OpenGL.raw.GL (possibly under another name) are found by
+# identity and wrapped under their GL name. Returns what Restore needs to
+# undo it.
+def Intercept (wrap, exclude=()):
+  functions = {}   # id -> (GL name, function)
+  sources = [OpenGL.GL] + [m for n, m in list(sys.modules.items())
+                           if m is not None and n.startswith("OpenGL.raw.GL")]
+  for source in sources:
+    for name, func in list(vars(source).items()):
+      if name.startswith("gl") and callable(func) and id(func) not in functions:
+        functions[id(func)] = (name,func)
+  wrappers = {}
+  patched = []
+  modules = [OpenGL.GL] + [m for n, m in list(sys.modules.items())
+                           if m is not None and not n.startswith("OpenGL") and n not in exclude]
+  for module in modules:
+    space = vars(module)
+    for name, value in list(space.items()):
+      entry = functions.get(id(value))
+      if entry and entry[1] is value:
+        key = id(value)
+        if key not in wrappers:
+          wrappers[key] = wrap(entry[0],value)
+        patched.append((module,name,value))
+        space[name] = wrappers[key]
+  return patched
+
+def Restore (patched):
+  for module, name, func in reversed(patched):
+    vars(module)[name] = func
@@ -0,0 +1,169 @@
+import os
+import sys
+
+# PyOpenGL binds its platform (GLX, EGL or OSMesa) when OpenGL.GL is first
+# imported, so this module must be imported before any other scene graph module.
+# Without a display, EGL is selected (Mesa's llvmpipe renders without a GPU);
+# PYOPENGL_PLATFORM may also be set to "egl" or "osmesa" explicitly. With the
+# null backend (see nullgl.Install) no context is created at all.
+if "OpenGL.GL" not in sys.modules and "PYOPENGL_PLATFORM" not in os.environ:
+  if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+    os.environ["PYOPENGL_PLATFORM"] = "egl"
+if os.environ.get("PYOPENGL_PLATFORM") == "egl" and not os.environ.get("DISPLAY"):
+  os.environ.setdefault("EGL_PLATFORM","surfaceless")
+
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from PIL import Image
+
+import framebuffer
+from framebuffer import Framebuffer
+from texcolor import TexColor
+from texdepth import TexDepth
+
+# Offscreen rendering: creates a context without a visible window and renders
+# scenes into a Framebuffer of any resolution, returning the image as an array
+class Headless:
+  def __init__ (self, width, height, backend=None):
+    self.backend = backend or os.environ.get("PYOPENGL_PLATFORM")
+    if "nullgl" in sys.modules and sys.modules["nullgl"].GetBackend():
+      self.backend = "null"
+    if self.backend not in ("egl","osmesa","null"):
+      self.backend = "glfw"
+    self.image = None
+    if self.backend == "egl":
+      self.CreateEGLContext()
+    elif self.backend == "osmesa":
+      self.CreateOSMesaContext()
+    elif self.backend == "glfw":
+      self.CreateGLFWContext()
+    self.fb = None
+    self.Resize(width,height)
+
+  # invisible GLFW window (needs a display server)
+  def CreateGLFWContext (self):
+    import glfw
+    if not glfw.init():
+      raise RuntimeError("could not initialize GLFW")
+    glfw.window_hint(glfw.VISIBLE,glfw.FALSE)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR,4)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR,1)
+    glfw.window_hint(glfw.OPENGL_PROFILE,glfw.OPENGL_CORE_PROFILE)
+    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT,GL_TRUE)
+    self.win = glfw.create_window(1,1,"headless",None,None)
+    if not self.win:
+      glfw.terminate()
+      raise RuntimeError("could not create GLFW window")
+    glfw.make_context_current(self.win)
+
+  # EGL pbuffer context (surfaceless platform when there is no display)
+  def CreateEGLContext (self):
+    from OpenGL import EGL
+    self.egl = EGL
+    self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(self.display,ctypes.pointer(major),ctypes.pointer(minor)):
+      raise RuntimeError("could not initialize EGL")
+    attribs = [
+      EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+      EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+      EGL.EGL_DEPTH_SIZE, 24,
+      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+      EGL.EGL_NONE
+    ]
+    config = EGL.EGLConfig()
+    nconfig = EGL.EGLint()
+    EGL.eglChooseConfig(self.display,(EGL.EGLint*len(attribs))(*attribs),ctypes.pointer(config),1,ctypes.pointer(nconfig))
+    if nconfig.value < 1:
+      raise RuntimeError("no suitable EGL configuration")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    attribs = [
+      EGL.EGL_CONTEXT_MAJOR_VERSION, 4,
+      EGL.EGL_CONTEXT_MINOR_VERSION, 1,
+      EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+      EGL.EGL_NONE
+    ]
+    self.context = EGL.eglCreateContext(self.display,config,EGL.EGL_NO_CONTEXT,(EGL.EGLint*len(attribs))(*attribs))
+    if not self.context:
+      raise RuntimeError("could not create EGL context")
+    attribs = [EGL.EGL_WIDTH, 1, EGL.EGL_HEIGHT, 1, EGL.EGL_NONE]
+    self.surface = EGL.eglCreatePbufferSurface(self.display,config,(EGL.EGLint*len(attribs))(*attribs))
+    if not EGL.eglMakeCurrent(self.display,self.surface,self.surface,self.context):
+      raise RuntimeError("could not make EGL context current")
+
+  # Mesa's OSMesa software renderer (renders into client memory)
+  def CreateOSMesaContext (self):
+    from OpenGL import osmesa, arrays
+    self.osmesa = osmesa
+    attribs = [
+      osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+      osmesa.OSMESA_DEPTH_BITS, 24,
+      osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+      osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 4,
+      osmesa.OSMESA_CONTEXT_MINOR_VERSION, 1,
+      0
+    ]
+    self.context = osmesa.OSMesaCreateContextAttribs(attribs,None)
+    if not self.context:
+      raise RuntimeError("could not create OSMesa context")
+    self.buffer = arrays.GLubyteArray.zeros((1,1,4))
+    if not osmesa.OSMesaMakeCurrent(self.context,self.buffer,GL_UNSIGNED_BYTE,1,1):
+      raise RuntimeError("could not make OSMesa context current")
+
+  # (re)create the offscreen color and depth targets
+  def Resize (self, width, height):
+    self.width = width
+    self.height = height
+    self.fb = Framebuffer(TexDepth("depth",width,height),[TexColor("color",width,height)])
+
+  def GetWidth (self):
+    return self.width
+
+  def GetHeight (self):
+    return self.height
+
+  def GetFramebuffer (self):
+    return self.fb
+
+  # render the scene offscreen and return its image (height x width x 4, top row first)
+  def Render (self, scene, camera):
+    framebuffer.SetDefault(self.fb)
+    self.fb.Bind()
+    glViewport(0,0,self.width,self.height)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    scene.Render(camera)
+    self.image = self.ReadImage()
+    return self.image
+
+  def ReadImage (self):
+    self.fb.Bind()
+    glReadBuffer(GL_COLOR_ATTACHMENT0)
+    glPixelStorei(GL_PACK_ALIGNMENT,1)
+    data = glReadPixels(0,0,self.width,self.height,GL_RGBA,GL_UNSIGNED_BYTE)
+    image = np.frombuffer(data,dtype=np.uint8).reshape(self.height,self.width,4)
+    return np.flipud(image).copy()
+
+  def GetImage (self):
+    return self.image
+
+  # write the last rendered image (format given by the file extension)
+  def Save (self, filename):
+    if self.image is None:
+      raise RuntimeError("Nothing rendered to save")
+    Image.fromarray(self.image).save(filename)
+
+  def Terminate (self):
+    framebuffer.SetDefault(None)
+    if self.backend == "egl":
+      EGL = self.egl
+      EGL.eglMakeCurrent(self.display,EGL.EGL_NO_SURFACE,EGL.EGL_NO_SURFACE,EGL.EGL_NO_CONTEXT)
+      EGL.eglDestroySurface(self.display,self.surface)
+      EGL.eglDestroyContext(self.display,self.context)
+      EGL.eglTerminate(self.display)
+    elif self.backend == "osmesa":
+      self.osmesa.OSMesaDestroyContext(self.context)
+    elif self.backend == "glfw":
+      import glfw
+      glfw.destroy_window(self.win)
+      glfw.terminate()
@@ -1,5 +1,8 @@
 import glm
+import numpy as np
 from OpenGL.GL import *
+import changes
+import uniformbuffer
 
 class Light:
     def __init__ (self, x, y, z, w=1, space="world"): 
@@ -9,46 +12,96 @@ class Light:
       self.pos = glm.vec4(x,y,z,w)
       self.space = space
       self.reference = None
+      self.shadow = None
+      self.block = None       # light block, created on first use (see LoadBlock)
+      self.data = np.zeros(uniformbuffer.LIGHT_SIZE//4,dtype=np.float32)
+      self.world = None       # world space position in the block
+      self.dirty = True       # edited since the last upload
 
     def SetAmbient (self, r, g, b):
       self.amb[0] = r
       self.amb[1] = g
       self.amb[2] = b
+      self.dirty = True
+      changes.Touch(static=True)
 
     def SetDiffuse (self, r, g, b):
       self.dif[0] = r
       self.dif[1] = g
       self.dif[2] = b
+      self.dirty = True
+      changes.Touch(static=True)
 
     def SetSpecular (self, r, g, b):
       self.spe[0] = r
       self.spe[1] = g
       self.spe[2] = b
+      self.dirty = True
+      changes.Touch(static=True)
 
     def SetPosition (self, x, y, z, w):
       self.pos[0] = x
       self.pos[1] = y
       self.pos[2] = z
       self.pos[3] = w
+      self.dirty = True
+      changes.Touch(static=True)
 
     def SetReference (self, reference):
       self.reference = reference
+      self.dirty = True
+      changes.Touch(static=True)
 
     def GetReference (self):
       return self.reference
 
+    # shadow map of the light (see ShadowMap)
+    def SetShadow (self, shadow):
+      self.shadow = shadow
+      changes.Touch()
+
+    def GetShadow (self):
+      return self.shadow
+
+    # world space position (or direction); st (a State or a camera) gives
+    # the view of lights in camera space
+    def GetWorldPosition (self, st):
+      pos = self.pos
+      if self.GetReference():
+        pos = self.GetReference().GetModelMatrix() * pos
+      if self.space == "camera":
+        pos = st.GetViewInverse() * pos
+      return pos
+
+    # upload the light block when the light changed and bind it (see shaders/blocks.glsl)
+    def LoadBlock (self, st):
+      pos = self.GetWorldPosition(st)
+      if self.dirty or pos != self.world:
+        if self.block is None:
+          self.block = uniformbuffer.UniformBuffer(uniformbuffer.LIGHT_SIZE)
+        self.world = glm.vec4(pos)
+        self.block.SetData(uniformbuffer.Pack(self.data,(self.amb,self.dif,self.spe,self.world)))
+        self.dirty = False
+      self.block.Bind(uniformbuffer.LIGHT)
+
     def Load (self, st):
       shd = st.GetShader()
+      if shd.HasBlock("LightBlock"):
+        self.LoadBlock(st)
+        if self.shadow:
+          self.shadow.LoadUniforms(shd)
+        return
       shd.SetUniform("lamb",self.amb)
       shd.SetUniform("ldif",self.dif)
       shd.SetUniform("lspe",self.spe)
       # Set position in lighting space
-      mat = glm.mat4(1.0)
+      pos = self.pos
+      if self.GetReference():
+        pos = self.GetReference().GetModelMatrix() * pos
       if self.space == "world" and shd.GetLightingSpace() == "camera":
-        mat = st.GetCamera().GetViewMatrix()
+        pos = st.GetViewMatrix() * pos
       elif self.space == "camera" and shd.GetLightingSpace() == "world":
-        mat = glm.inverse(st.GetCamera().GetViewMatrix())
-      if self.GetReference():
-        mat = mat * self.GetReference().GetModelMatrix()
-      pos = mat * self.pos  # to lighting space
+        pos = st.GetViewInverse() * pos
       shd.SetUniform("lpos",pos)
+      if self.shadow:
+        self.shadow.LoadUniforms(shd)
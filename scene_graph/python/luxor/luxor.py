@@ -1,20 +1,22 @@
 from node import *
 from mesh import *
+from simplify import RATIOS
+from geometriclod import GeometricLOD
 from material import *
 from transform import *
 from luxor.luxorengine import *
 
 class Luxor:
   def __init__ (self):
-    base_a = Mesh("../../luxor/base_a.msh")
-    base_b = Mesh("../../luxor/base_b.msh")
-    haste1 = Mesh("../../luxor/haste1.msh")
-    haste2 = Mesh("../../luxor/haste2.msh")
-    haste3_a = Mesh("../../luxor/haste3_a.msh")
-    haste3_b = Mesh("../../luxor/haste3_b.msh")
-    cupula_a = Mesh("../../luxor/cupula_a.msh")
-    cupula_b = Mesh("../../luxor/cupula_b.msh")
-    lampada = Mesh("../../luxor/lampada.msh")
+    base_a = Mesh("../../luxor/base_a.msh",RATIOS)
+    base_b = Mesh("../../luxor/base_b.msh",RATIOS)
+    haste1 = Mesh("../../luxor/haste1.msh",RATIOS)
+    haste2 = Mesh("../../luxor/haste2.msh",RATIOS)
+    haste3_a = Mesh("../../luxor/haste3_a.msh",RATIOS)
+    haste3_b = Mesh("../../luxor/haste3_b.msh",RATIOS)
+    cupula_a = Mesh("../../luxor/cupula_a.msh",RATIOS)
+    cupula_b = Mesh("../../luxor/cupula_b.msh",RATIOS)
+    lampada = Mesh("../../luxor/lampada.msh",RATIOS)
     red = Material(1.0,0.0,0.0)
     white = Material(1.0,1.0,1.0)
     white.SetAmbient(1.0,1.0,1.0)
@@ -31,7 +33,7 @@ class Luxor:
     trf_cupula.Translate(0.0,18.12,0.0)
     trf_lampada.Translate(0.0,8.4,9.0)
     self.light_node = Node(None,trf_lampada,[white],[lampada])
-    self.node = Node(None,trf_all,[red],
+    self.node = Node(None,trf_all,[red,GeometricLOD(1.0)],   # simplified parts when far
                      nodes = [
                                Node(None,trf_base,shps=[base_a,base_b],nodes=[
                                  Node(None,trf_haste1,shps=[haste1],nodes=[
@@ -46,6 +48,7 @@ class Luxor:
                                ])
                              ]
                     )
+    self.node.SetDynamic(True)   # animated (see StaticLayer)
     self.engine = LuxorEngine(trf_all,trf_base,trf_haste1,trf_haste2,trf_haste3,trf_cupula,trf_lampada)
 
   def GetNode (self):
@@ -11,6 +11,7 @@ from node import *
 from shader import *
 from scene import *
 from engine import *
+from apploop import *
 
 class MovePointer(Engine):
   def __init__ (self, trf):
@@ -49,13 +50,6 @@ def initialize ():
   scene = Scene(root)
   scene.AddEngine(MovePointer(trf2))
 
-def update (dt):
-  scene.Update(dt)
-
-def display ():
-  glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT) 
-  scene.Render(camera)
-
 def keyboard (win, key, scancode, action, mods):
    if key == glfw.KEY_Q and action == glfw.PRESS:
       glfw.set_window_should_close(win,glfw.TRUE)
@@ -81,19 +75,10 @@ def main():
 
     initialize()
 
-    # Loop until the user closes the window
-    t0 = glfw.get_time()
-    while not glfw.window_should_close(win):
-        t = glfw.get_time()
-        update(t-t0)
-        t0 = t
-        display()
-
-        # Swap front and back buffers
-        glfw.swap_buffers(win)
-
-        # Poll for and process events
-        glfw.poll_events()
+    # Loop until the user closes the window: engines run at a fixed timestep
+    loop = AppLoop(win,scene,camera,on_demand=True)
+    loop.Run()
+    print("Frame times (ms): ",loop.GetStats().GetSummary())
 
     glfw.terminate()
 
@@ -16,6 +16,7 @@ from sphere import *
 from texture import * 
 from polyoffset import * 
 from quad import *
+from apploop import *
 
 def main():
     # Initialize the library
@@ -38,16 +39,11 @@ def main():
 
     initialize(win)
 
-    # Loop until the user closes the window
-    while not glfw.window_should_close(win):
-        # Render here, e.g. using pyOpenGL
-        display(win)
-
-        # Swap front and back buffers
-        glfw.swap_buffers(win)
-
-        # Poll for and process events
-        glfw.poll_events()
+    # Loop until the user closes the window: redraws only on changes
+    loop = AppLoop(win,scene,camera,fps=60,on_demand=True)
+    loop.Run()
+    print("Frame times (ms): ",loop.GetStats().GetSummary())
+    glfw.terminate()
 
 viewer_pos = glm.vec3(2.0, 3.5, 4.0)
 
@@ -110,12 +106,6 @@ def initialize (win):
   global scene 
   scene = Scene(root)
 
-def display (win):
-  global scene
-  global camera
-  glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT) 
-  scene.Render(camera)
-
 def keyboard (win, key, scancode, action, mods):
    if key == glfw.KEY_Q and action == glfw.PRESS:
       glfw.set_window_should_close(win,glfw.TRUE)
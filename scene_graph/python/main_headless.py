@@ -0,0 +1,59 @@
+import headless   # must come first: selects the PyOpenGL platform
+import sys
+from OpenGL.GL import *
+
+import glm
+from camera3d import *
+from light import *
+from shader import *
+from material import *
+from transform import *
+from node import *
+from scene import *
+from cube import *
+from sphere import *
+
+def initialize ():
+  glClearColor(1.0,1.0,1.0,1.0)
+  glEnable(GL_DEPTH_TEST)
+  glEnable(GL_CULL_FACE)
+
+  global camera
+  camera = Camera3D(2.0,3.5,4.0)
+  light = Light(0.0,0.0,0.0,1.0,"camera")
+
+  red = Material(1.0,0.5,0.5)
+  white = Material(1.0,1.0,1.0)
+  trf1 = Transform()
+  trf1.Scale(3.0,0.3,3.0)
+  trf1.Translate(0.0,-1.0,0.0)
+  trf2 = Transform()
+  trf2.Scale(0.5,0.5,0.5)
+  trf2.Translate(0.0,1.0,0.0)
+
+  shader = Shader(light,"world")
+  shader.AttachVertexShader("../shaders/ilum_vert/vertex.glsl")
+  shader.AttachFragmentShader("../shaders/ilum_vert/fragment.glsl")
+  shader.Link()
+  root = Node(shader,
+              nodes = [
+                        Node(None,trf1,[red],[Cube()]),
+                        Node(None,trf2,[white],[Sphere()])
+                      ]
+              )
+  global scene
+  scene = Scene(root)
+
+# usage: python main_headless.py [output.png] [width height]
+def main ():
+  filename = sys.argv[1] if len(sys.argv) > 1 else "headless.png"
+  width, height = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (640, 480)
+  ctx = headless.Headless(width,height)
+  print("OpenGL version: ",glGetString(GL_VERSION))
+  initialize()
+  ctx.Render(scene,camera)
+  ctx.Save(filename)
+  ctx.Terminate()
+
+if __name__ == "__main__":
+    main()
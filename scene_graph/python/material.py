@@ -1,5 +1,11 @@
 import glm
+import numpy as np
 from appearance import Appearance
+import changes
+import commandlist
+import uniformbuffer
+
+pool = None   # material blocks of all materials (created on first use)
 
 class Material(Appearance):
     def __init__ (self, r, g, b, opacity=1.0):
@@ -9,33 +15,70 @@ class Material(Appearance):
       self.spe = glm.vec4(1,1,1,1)
       self.shi = 32.0
       self.opacity = opacity
+      self.block = None   # (buffer, record) of the material block
+      self.data = np.zeros(uniformbuffer.MATERIAL_SIZE//4,dtype=np.float32)
+      self.dirty = True   # edited since the last upload
 
     def SetAmbient (self, r, g, b, a=1):
       self.amb[0] = r
       self.amb[1] = g
       self.amb[2] = b
       self.amb[3] = a
+      self.dirty = True
+      changes.Touch(static=True)
     
     def SetDiffuse (self, r, g, b, a=1):
       self.dif[0] = r
       self.dif[1] = g
       self.dif[2] = b
       self.dif[3] = a
+      self.dirty = True
+      changes.Touch(static=True)
     
     def SetSpecular (self, r, g, b, a=1):
       self.spe[0] = r
       self.spe[1] = g
       self.spe[2] = b
-      self.spe[3] = a 
+      self.spe[3] = a
+      self.dirty = True
+      changes.Touch(static=True)
     
     def SetShininess (self, shi):
       self.shi = shi
+      self.dirty = True
+      changes.Touch(static=True)
 
     def SetOpacity (self, opacity):
       self.opacity = opacity
+      self.dirty = True
+      changes.Touch(static=True)
+
+    def GetOpacity (self):
+      return self.opacity
+
+    def IsTranslucent (self):
+      return self.opacity < 1.0
     
+    # material block (see shaders/blocks.glsl): uploaded on the first load
+    # after the material changed (never recorded by a frozen subtree), so
+    # that loading it is a single range bind
+    def Upload (self):
+      global pool
+      if self.block is None:
+        if pool is None:
+          pool = uniformbuffer.UniformPool(uniformbuffer.MATERIAL_SIZE)
+        self.block = pool.Allocate()
+      uniformbuffer.Pack(self.data,(self.amb,self.dif,self.spe,float(self.shi),float(self.opacity)))
+      self.block[0].SetData(self.data,self.block[1])
+      self.dirty = False
+
     def Load (self, st):
       shd = st.GetShader()
+      if shd.HasBlock("MaterialBlock"):
+        if self.dirty:
+          commandlist.Unrecorded(self.Upload)
+        self.block[0].Bind(uniformbuffer.MATERIAL,self.block[1])
+        return
       shd.SetUniform("mamb",self.amb)
       shd.SetUniform("mdif",self.dif)
       shd.SetUniform("mspe",self.spe)
@@ -1,48 +1,106 @@
+import os
 from OpenGL.GL import *
-from shape import Shape
+from shape import Shape, Tangents
 import numpy as np
+import simplify
 
+CACHE = ".lod.npz"   # suffix of the simplified levels stored next to a .msh file
+chains = {}          # simplified levels already loaded, by file and ratios
+
+# coordinates, normals and indices of a .msh file (V, N and T lines)
+def ReadMesh (filename):
+  coords = []
+  normals = []
+  indices = []
+  with open(filename) as f:
+    for line in f:
+      elems = line.split()
+      if elems[0] == "V":
+        coords.append(float(elems[1]))
+        coords.append(float(elems[2]))
+        coords.append(float(elems[3]))
+      elif elems[0] == "N":
+        normals.append(float(elems[1]))
+        normals.append(float(elems[2]))
+        normals.append(float(elems[3]))
+      elif elems[0] == "T":
+        indices.append(int(elems[1]))
+        indices.append(int(elems[2]))
+        indices.append(int(elems[3]))
+  return (np.array(coords,dtype='float32'),np.array(normals,dtype='float32'),
+          np.array(indices,dtype='uint32'))
+
+# simplified levels of a .msh file, (error, coords, normals, indices) per
+# ratio (see simplify.Simplify); computed once and cached on disk next to
+# the file, again when the file or the ratios change
+def LoadLevels (filename, ratios, mesh=None):
+  ratios = tuple(ratios)
+  key = (os.path.abspath(filename),ratios)
+  levels = chains.get(key)
+  if levels is not None:
+    return levels
+  stat = os.stat(filename)
+  stamp = np.array([stat.st_size,stat.st_mtime_ns],dtype=np.int64)
+  cache = os.path.splitext(filename)[0] + CACHE
+  try:
+    with np.load(cache) as data:
+      if np.array_equal(data["stamp"],stamp) and np.array_equal(data["ratios"],ratios):
+        levels = [(float(data["errors"][k]),data["coords%d" % k],data["normals%d" % k],data["indices%d" % k])
+                  for k in range(len(ratios))]
+  except (OSError,KeyError,ValueError):
+    pass   # missing or outdated cache
+  if levels is None:
+    levels = simplify.Simplify(*(mesh or ReadMesh(filename)),ratios)
+    arrays = {"stamp": stamp, "ratios": np.array(ratios), "errors": np.array([level[0] for level in levels])}
+    for k, (error, coords, normals, indices) in enumerate(levels):
+      arrays["coords%d" % k] = coords
+      arrays["normals%d" % k] = normals
+      arrays["indices%d" % k] = indices
+    try:
+      with open(cache,"wb") as f:
+        np.savez(f,**arrays)
+    except OSError:
+      pass   # read-only location: simplified again next time
+  chains[key] = levels
+  return levels
+
+# Triangle mesh of a .msh file. With ratios (e.g. simplify.RATIOS), simplified
+# levels keeping those shares of the triangles are drawn in its place when
+# small on screen (see GeometricLOD); level selects one of them.
 class Mesh (Shape):
-  def __init__ (self, filename):
-    coords = []
-    normals = []
-    indices = []
-    with open(filename) as f:
-      for line in f:
-        elems = line.split()
-        if elems[0] == "V":
-          coords.append(float(elems[1]))
-          coords.append(float(elems[2]))
-          coords.append(float(elems[3]))
-        elif elems[0] == "N":
-          normals.append(float(elems[1]))
-          normals.append(float(elems[2]))
-          normals.append(float(elems[3]))
-        elif elems[0] == "T":
-          indices.append(int(elems[1]))
-          indices.append(int(elems[2]))
-          indices.append(int(elems[3]))
-    vcoords = np.array(coords,dtype='float32')
-    vnormals = np.array(normals,dtype='float32')
-    vindices = np.array(indices,dtype='uint32')
+  def __init__ (self, filename, ratios=None, level=0):
+    if level:
+      vcoords, vnormals, vindices = LoadLevels(filename,ratios)[level-1][1:]
+    else:
+      vcoords, vnormals, vindices = ReadMesh(filename)
+      if ratios:
+        levels = LoadLevels(filename,ratios,(vcoords,vnormals,vindices))
+        self.SetLevels([(0.0,None)] + [(error,(filename,tuple(ratios),k+1)) for k, (error, *_) in enumerate(levels)])
+    # no texcoords in the file: tangents only give a frame around the normal
+    vtangents = Tangents(vcoords,vnormals,None,vindices)
+    self.SetBounds(vcoords)
     # create VAO
     self.vao = glGenVertexArrays(1)
     glBindVertexArray(self.vao)
-    ids = glGenBuffers(3)
-    # create coord and normal buffers
+    ids = glGenBuffers(4)
+    # create coord, normal and tangent buffers
     glBindBuffer(GL_ARRAY_BUFFER,ids[0])
     glBufferData(GL_ARRAY_BUFFER,vcoords.nbytes,vcoords,GL_STATIC_DRAW)
     glVertexAttribPointer(0,3,GL_FLOAT,GL_FALSE,0,None)
-    glEnableVertexAttribArray(0) 
+    glEnableVertexAttribArray(0)
     glBindBuffer(GL_ARRAY_BUFFER,ids[1])
     glBufferData(GL_ARRAY_BUFFER,vnormals.nbytes,vnormals,GL_STATIC_DRAW)
     glVertexAttribPointer(1,3,GL_FLOAT,GL_FALSE,0,None)
-    glEnableVertexAttribArray(1) 
+    glEnableVertexAttribArray(1)
+    glBindBuffer(GL_ARRAY_BUFFER,ids[2])
+    glBufferData(GL_ARRAY_BUFFER,vtangents.nbytes,vtangents,GL_STATIC_DRAW)
+    glVertexAttribPointer(2,4,GL_FLOAT,GL_FALSE,0,None)
+    glEnableVertexAttribArray(2)
     # create index buffer
-    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER,ids[2])
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER,ids[3])
     glBufferData(GL_ELEMENT_ARRAY_BUFFER,vindices.nbytes,vindices,GL_STATIC_DRAW)
-    self.nind = len(indices)
+    self.nind = len(vindices)
 
   def Draw (self, st):
     glBindVertexArray(self.vao)
-    glDrawElements(GL_TRIANGLES,self.nind,GL_UNSIGNED_INT,None)
\ No newline at end of file
+    glDrawElements(GL_TRIANGLES,self.nind,GL_UNSIGNED_INT,None)
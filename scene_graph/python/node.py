@@ -1,9 +1,20 @@
 import glm
+import changes
+import commandlist
+from commandlist import CommandList
 
 class Node:
-  def __init__ (self, shader=None, trf=None, apps=None, shps=None, nodes=None):
+  def __init__ (self, shader=None, trf=None, apps=None, shps=None, nodes=None, features=None, name=None):
     self.parent = None
+    self.name = name
+    self.frozen = False
+    self.commands = {}       # recorded calls of a frozen subtree, by pass
+    self.context = {}        # context key seen in the last frame, by pass
+    self.forward = False     # drawn forward by a DeferredRenderer
+    self.dynamic = False     # moving subtree (see StaticLayer)
+    self.hasdynamic = None   # some dynamic node in the subtree (cached)
     self.shader = shader
+    self.features = features
     self.trf = trf
     self.apps = apps or []
     self.shps = shps or []
@@ -12,24 +23,47 @@ class Node:
       for n in nodes:
         self.AddNode(n)
 
+  # name used by instruments (profiler scopes)
+  def SetName (self, name):
+    self.name = name
+
+  def GetName (self):
+    return self.name or "Node"
+
   def SetShader (self, shader):
     self.shader = shader
+    self.Invalidate()
 
   def GetShader (self):
     return self.shader
   
+  # shader features (preprocessor defines) requested for this subtree
+  def SetFeatures (self, features):
+    self.features = features
+    self.Invalidate()
+
+  def GetFeatures (self):
+    return self.features
+
   def SetTransform (self, trf):
     self.trf = trf
+    if trf:
+      trf.dynamic = self.IsMoving()
+    self.Invalidate()
   
   def AddAppearance (self, app):
     self.apps.append(app)
+    self.Invalidate()
   
   def AddShape (self, shp):
     self.shps.append(shp)
+    self.Invalidate()
   
   def AddNode (self, node):
     self.nodes.append(node)
     node.SetParent(self)
+    node.MarkMoving(self.IsMoving())
+    self.Invalidate()
   
   def SetParent (self, parent):
     self.parent = parent
@@ -44,6 +78,8 @@ class Node:
       return glm.mat4(1.0)
   
   def GetModelMatrix (self):
+    if self.trf and self.trf.array:   # see TransformArray
+      return self.trf.array.GetWorld(self.trf.index)
     mat = self.GetMatrix()
     node = self.GetParent()
     while node:
@@ -51,25 +87,179 @@ class Node:
       node = node.GetParent()
     return mat
   
+  # A frozen subtree is rendered once with its GL calls recorded (resolved
+  # uniform locations, computed matrices, binds and draws), then replayed.
+  # The recording is redone when the camera, the accumulated matrix or the
+  # shader above the node change (once they hold still for a frame), or after
+  # Invalidate; structural edits through Node invalidate automatically, other
+  # edits (transforms, materials) must call Invalidate. Each pass of a frame
+  # (depth pre-pass, layers, opaque and transparent...) keeps its recording.
+  def SetFrozen (self, flag):
+    self.frozen = flag
+    self.commands = {}
+
+  def IsFrozen (self):
+    return self.frozen
+
+  def Invalidate (self):
+    changes.Touch(static=True)
+    node = self
+    while node:
+      node.commands = {}
+      node.hasdynamic = None
+      node = node.parent
+
+  # a dynamic subtree is left out of the cached static layer and drawn on
+  # top of it every frame (see StaticLayer); moves of its transforms leave
+  # the static version alone (a transform shared with static nodes must not
+  # move)
+  def SetDynamic (self, flag):
+    self.dynamic = flag
+    self.MarkMoving(self.parent is not None and self.parent.IsMoving())
+    self.Invalidate()
+
+  def IsDynamic (self):
+    return self.dynamic
+
+  # in a dynamic subtree (the node or an ancestor is dynamic)
+  def IsMoving (self):
+    node = self
+    while node:
+      if node.dynamic:
+        return True
+      node = node.parent
+    return False
+
+  # flag the transforms of the subtree that move dynamic nodes only
+  def MarkMoving (self, moving):
+    moving = moving or self.dynamic
+    if self.trf:
+      self.trf.dynamic = moving
+    for node in self.nodes:
+      node.MarkMoving(moving)
+
+  def HasDynamic (self):
+    if self.hasdynamic is None:
+      self.hasdynamic = self.dynamic or any(node.HasDynamic() for node in self.nodes)
+    return self.hasdynamic
+
+  # a forward node and its subtree are left out of the G-buffer and drawn
+  # with their own shaders after the lighting (see DeferredRenderer)
+  def SetForward (self, flag):
+    self.forward = flag
+    self.Invalidate()
+
+  def IsForward (self):
+    return self.forward
+
+  # some appearance of the node is translucent: the subtree is drawn in the
+  # transparent pass (see TransparencyLayer)
+  def IsTranslucent (self):
+    for app in self.apps:
+      if app.IsTranslucent():
+        return True
+    return False
+
+  # save the transforms' poses for interpolation (before a simulation step)
+  def SavePose (self):
+    if self.trf:
+      self.trf.SavePose()
+    for node in self.nodes:
+      node.SavePose()
+
   def Render (self, st):
+    if st.instruments:
+      for ins in st.instruments:
+        ins.Begin(self.GetName())
+      if self.frozen:
+        self.RenderFrozen(st)
+      else:
+        self.RenderNode(st)
+      for ins in reversed(st.instruments):
+        ins.End()
+    elif self.frozen:
+      self.RenderFrozen(st)
+    else:
+      self.RenderNode(st)
+
+  def RenderFrozen (self, st):
+    if commandlist.IsRecording():   # part of an enclosing recording
+      self.RenderNode(st)
+      return
+    key = st.GetContextKey()
+    rpass = key[-1]
+    commands = self.commands.get(rpass)
+    if commands and commands.GetKey() == key:
+      commands.Replay(bool(st.instruments))
+    elif key == self.context.get(rpass):
+      commands = self.commands[rpass] = CommandList(key)
+      commands.Record(self.RenderNode,st)
+    else:
+      self.commands.pop(rpass,None)
+      self.RenderNode(st)
+    self.context[rpass] = key
+
+  def RenderNode (self, st):
+    layer = st.layer
+    if layer:
+      if self.dynamic:
+        if layer == "static":
+          return
+        st.layer = None   # the whole subtree is drawn
+        self.RenderNode(st)
+        st.layer = layer
+        return
+      if layer == "dynamic" and not self.HasDynamic():
+        return
+    blend = st.blend
+    if blend and self.IsTranslucent():
+      if blend == "opaque":
+        return
+      st.blend = None   # the whole subtree is drawn
+      self.RenderNode(st)
+      st.blend = blend
+      return
+    path = st.path
+    if path and (self.forward or self.IsTranslucent()):
+      if path == "deferred":
+        return
+      st.path = None   # the whole subtree is drawn
+      self.RenderNode(st)
+      st.path = path
+      return
     # load
     if self.shader:
       self.shader.Load(st)
+    if self.features:
+      st.PushFeatures(self.features)
     if self.trf:
       self.trf.Load(st)
+    lod = st.lod is not None and len(self.shps) > 0 and st.lod.Select(self,st)   # see ShadingLOD
     for app in self.apps:
       app.Load(st)
     # draw
-    if len(self.shps) > 0:
-      st.LoadMatrices()
-      for shp in self.shps:
-        shp.Draw(st)
-    for node in self.nodes:
+    if len(self.shps) > 0 and layer != "dynamic" and blend != "transparent" and path != "forward":
+      shps = self.shps
+      if st.planes is not None or st.range is not None:   # culled shapes (see ShadowMap, Fog)
+        shps = [shp for shp in shps if st.IsVisible(shp)]
+      if shps:
+        st.LoadMatrices()
+        for shp in shps:
+          if st.detail is not None:   # tessellation levels (see GeometricLOD)
+            shp, offset = st.detail.Select(shp,st)
+            if offset is not None:
+              st.GetShader().SetUniform("shadowOffset",offset)
+          shp.Draw(st)
+    for node in (st.SortFrontToBack(self.nodes) if st.sort else self.nodes):
       node.Render(st)
     # unload in reverse order
     for app in self.apps:
       app.Unload(st)
+    if lod:
+      st.PopShader()
     if self.trf:
       self.trf.Unload(st)
+    if self.features:
+      st.PopFeatures()
     if self.shader:
       self.shader.Unload(st)
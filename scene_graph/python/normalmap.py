@@ -0,0 +1,35 @@
+from PIL import Image
+import numpy as np
+from texture import Texture
+
+# tangent space normals (x, y, z rows of the image) of a height field:
+# central differences with wrap around (the textures repeat), scale being
+# the height difference, in texels, of a texel step at full intensity
+def HeightToNormals (height, scale):
+  h = np.asarray(height,dtype=np.float32)
+  dx = (np.roll(h,-1,axis=1) - np.roll(h,1,axis=1)) * (0.5*scale)
+  dy = (np.roll(h,-1,axis=0) - np.roll(h,1,axis=0)) * (0.5*scale)
+  n = np.stack([-dx,-dy,np.ones_like(h)],axis=-1)
+  n /= np.linalg.norm(n,axis=-1,keepdims=True)
+  return n
+
+# normals in [-1,1] to RGB texels
+def EncodeNormals (n):
+  return np.rint((n*0.5 + 0.5)*255.0).astype(np.uint8)
+
+# Tangent space normal map, computed once when the image is a height map
+# (any mode; the first channel is the height) and loaded as is when it
+# already holds normals (scale None, e.g. earth-normal.png):
+#   bump = NormalMap("normalTex","noise.png",8.0)
+# Shaders perturb the normal with one fetch and the vertex tangent frame
+# (see Tangents in shape.py).
+class NormalMap (Texture):
+  def __init__ (self, varname, filename, scale=None):
+    if scale is None:
+      Texture.__init__(self,varname,filename)
+      return
+    img = Image.open(filename).transpose(Image.FLIP_TOP_BOTTOM)
+    data = np.asarray(img,dtype=np.float32) / 255.0
+    if data.ndim == 3:
+      data = data[:,:,0]
+    Texture.__init__(self,varname,None,EncodeNormals(HeightToNormals(data,scale)))
@@ -0,0 +1,617 @@
+import re
+import sys
+import json
+import types
+import ctypes
+import difflib
+import zlib
+import importlib.abc
+import importlib.util
+import numpy as np
+
+# Null OpenGL backend: a stand-in for the OpenGL.GL module that needs no driver,
+# display or GPU. Every function accepts its arguments and does nothing, except
+# that object names (buffers, textures, programs, ...) and uniform locations
+# come out sequential and deterministic, status queries succeed and a little
+# state (viewport, enabled caps, buffer sizes) is kept so that queries the
+# scene graph depends on answer plausibly. Optionally each call is recorded,
+# so command streams of two versions can be saved and compared.
+#
+# Install() must run before any module imports OpenGL.GL:
+#   import nullgl
+#   nullgl.Install(record=True)
+#   import headless   # and the rest of the scene graph
+#   ...
+#   nullgl.GetBackend().SaveCommands("frame.txt")
+
+CONSTANTS = {
+  "GL_ACTIVE_UNIFORMS": 0x8B86,
+  "GL_ALL_BARRIER_BITS": 0xFFFFFFFF,
+  "GL_ALREADY_SIGNALED": 0x911A,
+  "GL_ALWAYS": 0x207,
+  "GL_ANY_SAMPLES_PASSED": 0x8C2F,
+  "GL_ARRAY_BUFFER": 0x8892,
+  "GL_BACK": 0x405,
+  "GL_BLEND": 0xBE2,
+  "GL_BUFFER_UPDATE_BARRIER_BIT": 0x200,
+  "GL_BYTE": 0x1400,
+  "GL_CCW": 0x901,
+  "GL_CLAMP_TO_BORDER": 0x812D,
+  "GL_CLAMP_TO_EDGE": 0x812F,
+  "GL_CLIP_DISTANCE0": 0x3000,
+  "GL_COLOR": 0x1800,
+  "GL_COLOR_ATTACHMENT0": 0x8CE0,
+  "GL_COLOR_ATTACHMENT1": 0x8CE1,
+  "GL_COLOR_ATTACHMENT2": 0x8CE2,
+  "GL_COLOR_ATTACHMENT3": 0x8CE3,
+  "GL_COLOR_BUFFER_BIT": 0x4000,
+  "GL_COMMAND_BARRIER_BIT": 0x40,
+  "GL_COMPARE_REF_TO_TEXTURE": 0x884E,
+  "GL_COMPILE_STATUS": 0x8B81,
+  "GL_COMPUTE_SHADER": 0x91B9,
+  "GL_CONDITION_SATISFIED": 0x911C,
+  "GL_COPY_READ_BUFFER": 0x8F36,
+  "GL_COPY_WRITE_BUFFER": 0x8F37,
+  "GL_CULL_FACE": 0xB44,
+  "GL_CW": 0x900,
+  "GL_DEPTH": 0x1801,
+  "GL_DEPTH24_STENCIL8": 0x88F0,
+  "GL_DEPTH_ATTACHMENT": 0x8D00,
+  "GL_DEPTH_BUFFER_BIT": 0x100,
+  "GL_DEPTH_COMPONENT": 0x1902,
+  "GL_DEPTH_COMPONENT24": 0x81A6,
+  "GL_DEPTH_COMPONENT32F": 0x8CAC,
+  "GL_DEPTH_STENCIL": 0x84F9,
+  "GL_DEPTH_STENCIL_ATTACHMENT": 0x821A,
+  "GL_DEPTH_TEST": 0xB71,
+  "GL_DOUBLE": 0x140A,
+  "GL_DRAW_FRAMEBUFFER": 0x8CA9,
+  "GL_DRAW_INDIRECT_BUFFER": 0x8F3F,
+  "GL_DST_COLOR": 0x306,
+  "GL_DYNAMIC_DRAW": 0x88E8,
+  "GL_DYNAMIC_STORAGE_BIT": 0x100,
+  "GL_ELEMENT_ARRAY_BUFFER": 0x8893,
+  "GL_EQUAL": 0x202,
+  "GL_FALSE": 0x0,
+  "GL_FILL": 0x1B02,
+  "GL_FLOAT": 0x1406,
+  "GL_FRAGMENT_SHADER": 0x8B30,
+  "GL_FRAMEBUFFER": 0x8D40,
+  "GL_FRAMEBUFFER_BARRIER_BIT": 0x400,
+  "GL_FRAMEBUFFER_COMPLETE": 0x8CD5,
+  "GL_FRAMEBUFFER_SRGB": 0x8DB9,
+  "GL_FRONT": 0x404,
+  "GL_FRONT_AND_BACK": 0x408,
+  "GL_FUNC_ADD": 0x8006,
+  "GL_GEOMETRY_SHADER": 0x8DD9,
+  "GL_GEQUAL": 0x206,
+  "GL_GREATER": 0x204,
+  "GL_HALF_FLOAT": 0x140B,
+  "GL_INFO_LOG_LENGTH": 0x8B84,
+  "GL_INT": 0x1404,
+  "GL_INVALID_INDEX": 0xFFFFFFFF,
+  "GL_LEQUAL": 0x203,
+  "GL_LESS": 0x201,
+  "GL_LINE": 0x1B01,
+  "GL_LINEAR": 0x2601,
+  "GL_LINEAR_MIPMAP_LINEAR": 0x2703,
+  "GL_LINES": 0x1,
+  "GL_LINE_LOOP": 0x2,
+  "GL_LINE_STRIP": 0x3,
+  "GL_LINK_STATUS": 0x8B82,
+  "GL_MAP_COHERENT_BIT": 0x80,
+  "GL_MAP_INVALIDATE_BUFFER_BIT": 0x8,
+  "GL_MAP_PERSISTENT_BIT": 0x40,
+  "GL_MAP_READ_BIT": 0x1,
+  "GL_MAP_UNSYNCHRONIZED_BIT": 0x20,
+  "GL_MAP_WRITE_BIT": 0x2,
+  "GL_MAX": 0x8008,
+  "GL_MAX_COLOR_ATTACHMENTS": 0x8CDF,
+  "GL_MAX_DRAW_BUFFERS": 0x8824,
+  "GL_MAX_TEXTURE_SIZE": 0xD33,
+  "GL_MAX_UNIFORM_BLOCK_SIZE": 0x8A30,
+  "GL_MIN": 0x8007,
+  "GL_NEAREST": 0x2600,
+  "GL_NEVER": 0x200,
+  "GL_NONE": 0x0,
+  "GL_NOTEQUAL": 0x205,
+  "GL_NO_ERROR": 0x0,
+  "GL_ONE": 0x1,
+  "GL_ONE_MINUS_SRC_ALPHA": 0x303,
+  "GL_ONE_MINUS_SRC_COLOR": 0x301,
+  "GL_PACK_ALIGNMENT": 0xD05,
+  "GL_PATCHES": 0xE,
+  "GL_PIXEL_PACK_BUFFER": 0x88EB,
+  "GL_PIXEL_UNPACK_BUFFER": 0x88EC,
+  "GL_POINTS": 0x0,
+  "GL_POLYGON_OFFSET_FILL": 0x8037,
+  "GL_POLYGON_OFFSET_LINE": 0x2A02,
+  "GL_PRIMITIVES_GENERATED": 0x8C87,
+  "GL_PROGRAM_POINT_SIZE": 0x8642,
+  "GL_QUERY_NO_WAIT": 0x8E14,
+  "GL_QUERY_RESULT": 0x8866,
+  "GL_QUERY_RESULT_AVAILABLE": 0x8867,
+  "GL_QUERY_WAIT": 0x8E13,
+  "GL_R": 0x2002,
+  "GL_R11F_G11F_B10F": 0x8C3A,
+  "GL_R16F": 0x822D,
+  "GL_R32F": 0x822E,
+  "GL_R32I": 0x8235,
+  "GL_R32UI": 0x8236,
+  "GL_R8": 0x8229,
+  "GL_READ_FRAMEBUFFER": 0x8CA8,
+  "GL_READ_ONLY": 0x88B8,
+  "GL_READ_WRITE": 0x88BA,
+  "GL_RED": 0x1903,
+  "GL_RENDERBUFFER": 0x8D41,
+  "GL_RENDERER": 0x1F01,
+  "GL_REPEAT": 0x2901,
+  "GL_RG": 0x8227,
+  "GL_RG16F": 0x822F,
+  "GL_RG32F": 0x8230,
+  "GL_RG32I": 0x823B,
+  "GL_RG8": 0x822B,
+  "GL_RGB": 0x1907,
+  "GL_RGB10_A2": 0x8059,
+  "GL_RGB16F": 0x881B,
+  "GL_RGB32F": 0x8815,
+  "GL_RGB32I": 0x8D83,
+  "GL_RGB32UI": 0x8D71,
+  "GL_RGB8": 0x8051,
+  "GL_RGBA": 0x1908,
+  "GL_RGBA16": 0x805B,
+  "GL_RGBA16F": 0x881A,
+  "GL_RGBA32F": 0x8814,
+  "GL_RGBA32I": 0x8D82,
+  "GL_RGBA32UI": 0x8D70,
+  "GL_RGBA8": 0x8058,
+  "GL_SAMPLES_PASSED": 0x8914,
+  "GL_SCISSOR_TEST": 0xC11,
+  "GL_SHADER_IMAGE_ACCESS_BARRIER_BIT": 0x20,
+  "GL_SHADER_STORAGE_BARRIER_BIT": 0x2000,
+  "GL_SHADER_STORAGE_BUFFER": 0x90D2,
+  "GL_SHADING_LANGUAGE_VERSION": 0x8B8C,
+  "GL_SHORT": 0x1402,
+  "GL_SRC_ALPHA": 0x302,
+  "GL_SRC_COLOR": 0x300,
+  "GL_STATIC_DRAW": 0x88E4,
+  "GL_STENCIL": 0x1802,
+  "GL_STENCIL_BUFFER_BIT": 0x400,
+  "GL_STENCIL_TEST": 0xB90,
+  "GL_STREAM_DRAW": 0x88E0,
+  "GL_STREAM_READ": 0x88E1,
+  "GL_SYNC_FLUSH_COMMANDS_BIT": 0x1,
+  "GL_SYNC_GPU_COMMANDS_COMPLETE": 0x9117,
+  "GL_TESS_CONTROL_SHADER": 0x8E88,
+  "GL_TESS_EVALUATION_SHADER": 0x8E87,
+  "GL_TEXTURE0": 0x84C0,
+  "GL_TEXTURE_1D": 0xDE0,
+  "GL_TEXTURE_2D": 0xDE1,
+  "GL_TEXTURE_2D_ARRAY": 0x8C1A,
+  "GL_TEXTURE_3D": 0x806F,
+  "GL_TEXTURE_BORDER_COLOR": 0x1004,
+  "GL_TEXTURE_BUFFER": 0x8C2A,
+  "GL_TEXTURE_COMPARE_FUNC": 0x884D,
+  "GL_TEXTURE_COMPARE_MODE": 0x884C,
+  "GL_TEXTURE_CUBE_MAP": 0x8513,
+  "GL_TEXTURE_CUBE_MAP_ARRAY": 0x9009,
+  "GL_TEXTURE_CUBE_MAP_NEGATIVE_X": 0x8516,
+  "GL_TEXTURE_CUBE_MAP_NEGATIVE_Y": 0x8518,
+  "GL_TEXTURE_CUBE_MAP_NEGATIVE_Z": 0x851A,
+  "GL_TEXTURE_CUBE_MAP_POSITIVE_X": 0x8515,
+  "GL_TEXTURE_CUBE_MAP_POSITIVE_Y": 0x8517,
+  "GL_TEXTURE_CUBE_MAP_POSITIVE_Z": 0x8519,
+  "GL_TEXTURE_FETCH_BARRIER_BIT": 0x8,
+  "GL_TEXTURE_MAG_FILTER": 0x2800,
+  "GL_TEXTURE_MIN_FILTER": 0x2801,
+  "GL_TEXTURE_WRAP_R": 0x8072,
+  "GL_TEXTURE_WRAP_S": 0x2802,
+  "GL_TEXTURE_WRAP_T": 0x2803,
+  "GL_TIMEOUT_EXPIRED": 0x911B,
+  "GL_TIMEOUT_IGNORED": 0xFFFFFFFFFFFFFFFF,
+  "GL_TIMESTAMP": 0x8E28,
+  "GL_TIME_ELAPSED": 0x88BF,
+  "GL_TRIANGLES": 0x4,
+  "GL_TRIANGLE_FAN": 0x6,
+  "GL_TRIANGLE_STRIP": 0x5,
+  "GL_TRUE": 0x1,
+  "GL_UNIFORM_BARRIER_BIT": 0x4,
+  "GL_UNIFORM_BUFFER": 0x8A11,
+  "GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT": 0x8A34,
+  "GL_UNPACK_ALIGNMENT": 0xCF5,
+  "GL_UNSIGNED_BYTE": 0x1401,
+  "GL_UNSIGNED_INT": 0x1405,
+  "GL_UNSIGNED_SHORT": 0x1403,
+  "GL_VENDOR": 0x1F00,
+  "GL_VERSION": 0x1F02,
+  "GL_VERTEX_SHADER": 0x8B31,
+  "GL_VIEWPORT": 0xBA2,
+  "GL_WAIT_FAILED": 0x911D,
+  "GL_WRITE_ONLY": 0x88B9,
+  "GL_ZERO": 0x0,
+}
+
+TYPES = {
+  "GLboolean": ctypes.c_ubyte,
+  "GLbyte": ctypes.c_byte,
+  "GLubyte": ctypes.c_ubyte,
+  "GLshort": ctypes.c_short,
+  "GLushort": ctypes.c_ushort,
+  "GLint": ctypes.c_int,
+  "GLuint": ctypes.c_uint,
+  "GLsizei": ctypes.c_int,
+  "GLenum": ctypes.c_uint,
+  "GLbitfield": ctypes.c_uint,
+  "GLfloat": ctypes.c_float,
+  "GLdouble": ctypes.c_double,
+  "GLint64": ctypes.c_int64,
+  "GLuint64": ctypes.c_uint64,
+  "GLsizeiptr": ctypes.c_ssize_t,
+  "GLintptr": ctypes.c_ssize_t,
+}
+
+# functions exported by 'from OpenGL.GL import *' (any other gl* name is
+# still available by attribute access)
+FUNCTIONS = """
+glActiveTexture glAttachShader glBeginQuery glBindBuffer glBindBufferBase
+glBindBufferRange glBindFramebuffer glBindImageTexture glBindRenderbuffer
+glBindSampler glBindTexture glBindVertexArray glBlendEquation glBlendFunc
+glBlendFunci glBufferData glBufferSubData glCheckFramebufferStatus glClear
+glClearBufferfv glClearColor glClearDepth glClientWaitSync glColorMask
+glCompileShader glCopyBufferSubData glCreateProgram glCreateShader glCullFace
+glDeleteBuffers glDeleteFramebuffers glDeleteProgram glDeleteQueries
+glDeleteShader glDeleteSync glDeleteTextures glDeleteVertexArrays glDepthFunc
+glDepthMask glDetachShader glDisable glDisableVertexAttribArray
+glDispatchCompute glDrawArrays glDrawArraysInstanced glDrawBuffer
+glDrawBuffers glDrawElements glDrawElementsInstanced glEnable
+glEnableVertexAttribArray glEndQuery glFenceSync glFinish glFlush
+glFramebufferTexture glFramebufferTexture2D glFramebufferTextureLayer
+glGenBuffers glGenFramebuffers glGenQueries glGenRenderbuffers glGenSamplers
+glGenTextures glGenVertexArrays glGenerateMipmap glGetAttribLocation
+glGetBufferSubData glGetError glGetFloatv glGetInteger64v glGetIntegerv
+glGetProgramInfoLog glGetProgramiv glGetQueryObjectiv glGetQueryObjectui64v
+glGetQueryObjectuiv glGetShaderInfoLog glGetShaderiv glGetString
+glGetUniformBlockIndex glGetUniformLocation glIsEnabled glLinkProgram
+glMapBuffer glMapBufferRange glMemoryBarrier glMultiDrawElementsIndirect
+glPixelStorei glPolygonMode glPolygonOffset glQueryCounter glReadBuffer
+glReadPixels glRenderbufferStorage glSamplerParameteri glScissor
+glShaderSource glTexBuffer glTexImage1D glTexImage2D glTexImage3D
+glTexParameterf glTexParameterfv glTexParameteri glTexStorage2D
+glTexSubImage2D glUniform1f glUniform1fv glUniform1i glUniform1iv
+glUniform2f glUniform2fv glUniform3f glUniform3fv glUniform4f glUniform4fv
+glUniformBlockBinding glUniformMatrix3fv glUniformMatrix4fv glUnmapBuffer
+glUseProgram glVertexAttrib3f glVertexAttribDivisor glVertexAttribPointer
+glViewport
+""".split()
+
+# name kinds sharing a namespace (shaders and programs share one in GL)
+GENERATORS = {
+  "glGenBuffers": "buffer",
+  "glGenTextures": "texture",
+  "glGenVertexArrays": "vertexarray",
+  "glGenFramebuffers": "framebuffer",
+  "glGenRenderbuffers": "renderbuffer",
+  "glGenQueries": "query",
+  "glGenSamplers": "sampler",
+}
+
+# implementation limits answered by glGetIntegerv
+LIMITS = {
+  "GL_MAX_TEXTURE_SIZE": 16384,
+  "GL_MAX_UNIFORM_BLOCK_SIZE": 65536,
+  "GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT": 256,
+  "GL_MAX_COLOR_ATTACHMENTS": 8,
+  "GL_MAX_DRAW_BUFFERS": 8,
+}
+
+# glUniform*v / glProgramUniform*v: components per element and position of the count
+UNIFORM = re.compile(r"^gl(Program)?Uniform(Matrix)?([1234])(?:x([234]))?(?:f|i|ui|d)v$")
+
+class NullGL:
+  def __init__ (self, width=640, height=480, record=False):
+    self.names = {}          # last name given per kind
+    self.locations = {}      # program -> {uniform name: location}
+    self.enabled = set()
+    self.viewport = [0,0,width,height]
+    self.bound = {}          # buffer target -> buffer
+    self.sizes = {}          # buffer -> size in bytes
+    self.mapped = {}         # buffer target -> mapped memory (kept alive while mapped)
+    self.functions = {}
+    self.recording = record
+    self.commands = []
+    self.calls = 0
+
+  # the callable installed for a GL function name
+  def Function (self, name):
+    func = self.functions.get(name)
+    if func is None:
+      handler = getattr(self,name,None)
+      def func (*args):
+        self.calls += 1
+        if self.recording:
+          self.commands.append((name,Normalize(name,args)))
+        return handler(*args) if handler else None
+      func.__name__ = name
+      self.functions[name] = func
+    return func
+
+  def NewName (self, kind):
+    self.names[kind] = self.names.get(kind,0) + 1
+    return self.names[kind]
+
+  # same return types as PyOpenGL: a scalar for one name (except queries)
+  def Generate (self, kind, n):
+    ids = np.array([self.NewName(kind) for i in range(n)],dtype=np.uint32)
+    return ids[0] if n == 1 and kind != "query" else ids
+
+  def __getattr__ (self, name):
+    if name in GENERATORS:
+      return lambda n, *args: self.Generate(GENERATORS[name],n)
+    raise AttributeError(name)
+
+  # recording
+  def SetRecording (self, flag):
+    self.recording = flag
+
+  def GetCommands (self):
+    return self.commands
+
+  def ClearCommands (self):
+    self.commands = []
+
+  def GetCallCount (self):
+    return self.calls
+
+  def SaveCommands (self, filename):
+    with open(filename,"w") as f:
+      for command in self.commands:
+        f.write(Format(command) + "\n")
+
+  # objects and status
+  def glCreateShader (self, type):
+    return self.NewName("shader")
+
+  def glCreateProgram (self):
+    return self.NewName("shader")
+
+  def glFenceSync (self, condition, flags):
+    return self.NewName("sync")
+
+  def glGetUniformLocation (self, program, name):
+    if isinstance(name,bytes):
+      name = name.decode()
+    locations = self.locations.setdefault(int(program),{})
+    if name not in locations:
+      locations[name] = len(locations)
+    return locations[name]
+
+  glGetAttribLocation = glGetUniformLocation
+  glGetUniformBlockIndex = glGetUniformLocation
+
+  def glGetShaderiv (self, shader, pname, *args):
+    return 0 if pname == CONSTANTS["GL_INFO_LOG_LENGTH"] else 1
+
+  glGetProgramiv = glGetShaderiv
+
+  def glGetShaderInfoLog (self, shader):
+    return b""
+
+  glGetProgramInfoLog = glGetShaderInfoLog
+
+  def glGetString (self, name):
+    strings = {
+      CONSTANTS["GL_VENDOR"]: b"scene graph",
+      CONSTANTS["GL_RENDERER"]: b"null",
+      CONSTANTS["GL_VERSION"]: b"4.6 (null)",
+      CONSTANTS["GL_SHADING_LANGUAGE_VERSION"]: b"4.60",
+    }
+    return strings.get(name,b"")
+
+  def glGetError (self):
+    return 0
+
+  def glCheckFramebufferStatus (self, target):
+    return CONSTANTS["GL_FRAMEBUFFER_COMPLETE"]
+
+  def glClientWaitSync (self, sync, flags, timeout):
+    return CONSTANTS["GL_ALREADY_SIGNALED"]
+
+  def glGetQueryObjectiv (self, query, pname, *args):
+    return 1    # available
+
+  def glGetQueryObjectuiv (self, query, pname, *args):
+    return 0
+
+  def glGetQueryObjectui64v (self, query, pname, *args):
+    return 0
+
+  # state
+  def glEnable (self, cap):
+    self.enabled.add(cap)
+
+  def glDisable (self, cap):
+    self.enabled.discard(cap)
+
+  def glIsEnabled (self, cap):
+    return cap in self.enabled
+
+  def glViewport (self, x, y, width, height):
+    self.viewport = [x,y,width,height]
+
+  def glGetIntegerv (self, pname, *args):
+    if pname == CONSTANTS["GL_VIEWPORT"]:
+      return np.array(self.viewport,dtype=np.int32)
+    for name, value in LIMITS.items():
+      if pname == CONSTANTS[name]:
+        return value
+    return 0
+
+  def glGetInteger64v (self, pname, *args):
+    return 0
+
+  def glGetFloatv (self, pname, *args):
+    return 0.0
+
+  # buffers and pixels
+  def glBindBuffer (self, target, buffer):
+    self.bound[target] = int(buffer)
+
+  def glBufferData (self, target, size, data, usage):
+    if not isinstance(size,int):   # PyOpenGL also accepts (data, usage)
+      size = np.asarray(size).nbytes
+    self.sizes[self.bound.get(target,0)] = size
+
+  def glMapBufferRange (self, target, offset, length, access):
+    memory = (ctypes.c_ubyte * length)()
+    self.mapped[target] = memory
+    return ctypes.addressof(memory)
+
+  def glMapBuffer (self, target, access):
+    return self.glMapBufferRange(target,0,self.sizes.get(self.bound.get(target,0),0),access)
+
+  def glUnmapBuffer (self, target):
+    self.mapped.pop(target,None)
+    return True
+
+  def glGetBufferSubData (self, target, offset, size, *args):
+    return bytes(size)
+
+  def glReadPixels (self, x, y, width, height, format, type, data=None):
+    if data is not None:
+      return None
+    components = {CONSTANTS["GL_RGBA"]: 4, CONSTANTS["GL_RGB"]: 3}.get(format,1)
+    size = {CONSTANTS["GL_FLOAT"]: 4, CONSTANTS["GL_UNSIGNED_INT"]: 4}.get(type,1)
+    return bytes(width*height*components*size)
+
+# comparable form of the arguments of a call
+def Normalize (name, args):
+  count = None
+  match = UNIFORM.match(name)
+  if match:
+    n = int(match.group(3)) * int(match.group(4) or (match.group(3) if match.group(2) else 1))
+    index = 2 if match.group(1) else 1
+    if len(args) > index:
+      count = int(args[index]) * n
+  return [NormalizeValue(arg,count) for arg in args]
+
+def NormalizeValue (value, count=None):
+  if value is None or isinstance(value,(bool,int,str)):
+    return value
+  if isinstance(value,float):
+    return round(value,6)
+  if isinstance(value,np.generic):
+    return NormalizeValue(value.item())
+  if isinstance(value,bytes):
+    return "bytes[%d]:%08x" % (len(value),zlib.crc32(value))
+  if isinstance(value,(list,tuple)):
+    return [NormalizeValue(v) for v in value]
+  if isinstance(value,ctypes._Pointer):
+    if count is None:
+      return "pointer"
+    return [round(float(value[i]),6) for i in range(count)]
+  if isinstance(value,ctypes._SimpleCData):
+    return "out" if value.value in (0,None) else NormalizeValue(value.value)
+  try:
+    array = np.asarray(value)
+  except Exception:
+    return type(value).__name__
+  if array.dtype == object:
+    return type(value).__name__
+  if array.size <= 64:
+    return [NormalizeValue(v) for v in array.ravel().tolist()]
+  return "array[%s%s]:%08x" % (array.dtype,list(array.shape),zlib.crc32(np.ascontiguousarray(array).tobytes()))
+
+def Format (command):
+  name, args = command
+  return name + "(" + ", ".join(json.dumps(arg) for arg in args) + ")"
+
+def LoadCommands (filename):
+  with open(filename) as f:
+    return [line.rstrip("\n") for line in f]
+
+# unified diff of two command streams (lists of commands or formatted lines);
+# empty when they match
+def CompareCommands (a, b, context=3):
+  a = [c if isinstance(c,str) else Format(c) for c in a]
+  b = [c if isinstance(c,str) else Format(c) for c in b]
+  return list(difflib.unified_diff(a,b,"a","b",n=context,lineterm=""))
+
+backend = None
+previous = None   # OpenGL.GL module replaced by Install
+
+# register the null module as OpenGL.GL (before any module imports it)
+# Serves OpenGL.raw and its submodules (raw entry points imported directly,
+# e.g. 'from OpenGL.raw.GL.VERSION.GL_2_0 import glUniform1i') with the same
+# null functions as OpenGL.GL.
+class RawFinder (importlib.abc.MetaPathFinder, importlib.abc.Loader):
+  def find_spec (self, fullname, path, target=None):
+    if fullname == "OpenGL.raw" or fullname.startswith("OpenGL.raw."):
+      return importlib.util.spec_from_loader(fullname,self,is_package=True)
+    return None
+
+  def create_module (self, spec):
+    module = types.ModuleType(spec.name)
+    module.__path__ = []
+    module.__dict__.update(CONSTANTS)
+    module.__dict__.update(TYPES)
+    def getattr_ (name):
+      if name.startswith("gl") and name[2:3].isupper():
+        return backend.Function(name)
+      raise AttributeError("module '" + spec.name + "' has no attribute '" + name + "'")
+    module.__getattr__ = getattr_
+    return module
+
+  def exec_module (self, module):
+    pass
+
+finder = None
+
+def Install (width=640, height=480, record=False):
+  global backend, previous, finder
+  if backend:
+    return backend
+  if "OpenGL.GL" in sys.modules or "OpenGL.raw" in sys.modules:
+    raise RuntimeError("nullgl.Install must be called before OpenGL.GL is imported")
+  backend = NullGL(width,height,record)
+  module = types.ModuleType("OpenGL.GL")
+  module.__dict__.update(CONSTANTS)
+  module.__dict__.update(TYPES)
+  for name in FUNCTIONS:
+    setattr(module,name,backend.Function(name))
+  def getattr_ (name):
+    if name.startswith("gl") and name[2:3].isupper():
+      func = backend.Function(name)
+      setattr(module,name,func)
+      return func
+    raise AttributeError("module 'OpenGL.GL' has no attribute '" + name + "'")
+  module.__getattr__ = getattr_
+  module.__all__ = list(CONSTANTS) + list(TYPES) + FUNCTIONS
+  try:
+    import OpenGL
+  except ImportError:
+    OpenGL = types.ModuleType("OpenGL")
+    OpenGL.__path__ = []
+    sys.modules["OpenGL"] = OpenGL
+  previous = getattr(OpenGL,"GL",None)
+  OpenGL.GL = module
+  sys.modules["OpenGL.GL"] = module
+  finder = RawFinder()
+  sys.meta_path.insert(0,finder)
+  return backend
+
+def Uninstall ():
+  global backend, finder
+  sys.meta_path.remove(finder)
+  finder = None
+  for name in [n for n in sys.modules if n == "OpenGL.raw" or n.startswith("OpenGL.raw.")]:
+    del sys.modules[name]
+  del sys.modules["OpenGL.GL"]
+  import OpenGL
+  if previous is not None:
+    OpenGL.GL = previous
+  else:
+    del OpenGL.GL
+  backend = None
+
+def GetBackend ():
+  return backend
@@ -0,0 +1,200 @@
+import time
+import json
+import collections
+from OpenGL.GL import *
+# raw entry points: the wrapped 64-bit getters have no output size for these enums
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as get_query_ui64
+from OpenGL.raw.GL.VERSION.GL_3_2 import glGetInteger64v as get_integer64
+
+# pipeline statistics (GL_ARB_pipeline_statistics_query, core in 4.6)
+STATISTICS = [
+  ("vertices_submitted",0x82EE),
+  ("primitives_submitted",0x82EF),
+  ("vertex_shader_invocations",0x82F0),
+  ("clipping_input_primitives",0x82F6),
+  ("clipping_output_primitives",0x82F7),
+  ("fragment_shader_invocations",0x82F4),
+]
+
+# timed region of a frame
+class Scope:
+  def __init__ (self, name):
+    self.name = name
+    self.children = []
+    self.t0 = self.t1 = 0        # CPU times (ns)
+    self.q0 = self.q1 = None     # GPU timestamp queries
+
+class Frame:
+  def __init__ (self, number):
+    self.number = number
+    self.root = Scope("Frame")
+    self.root.t0 = time.perf_counter_ns()
+    self.elapsed = None          # GL_TIME_ELAPSED query of the render
+    self.stats = []              # (target, query) pipeline statistics
+
+# Opt-in CPU/GPU frame profiler (see Scene.AddInstrument). Scene.Render, each
+# Node.Render subtree, Scene.Update and each engine become scopes timed with
+# perf_counter on the CPU and GL_TIMESTAMP queries on the GPU; the whole render
+# is also measured with GL_TIME_ELAPSED and pipeline statistics queries. Query
+# results are read 'latency' frames later and only if available, so profiling
+# never stalls the pipeline. Resolved frames are kept as trees of dicts
+# (GetFrames) and can be exported as Chrome/Perfetto trace JSON.
+class Profiler:
+  def __init__ (self, gpu=True, gpu_depth=None, stats=True, latency=3, history=300):
+    self.gpu = gpu
+    self.gpu_depth = gpu_depth   # deepest scope level timed on the GPU (None: all)
+    self.stats = stats
+    self.latency = latency
+    self.frames = collections.deque(maxlen=history)
+    self.inflight = collections.deque()
+    self.queries = {}            # free query objects per target (ids keep their target)
+    self.frame = None
+    self.stack = []
+    self.count = 0
+    self.origin = time.perf_counter_ns()
+    self.offset = None           # CPU clock - GPU clock (ns)
+    self.targets = None          # supported statistics
+
+  def GetName (self):
+    return "profiler"
+
+  def NewQuery (self, target):
+    free = self.queries.setdefault(target,[])
+    if not free:
+      free.extend(int(q) for q in glGenQueries(64))
+    return free.pop()
+
+  def Timestamp (self):
+    q = self.NewQuery(GL_TIMESTAMP)
+    glQueryCounter(q,GL_TIMESTAMP)
+    return q
+
+  def Begin (self, name):
+    if self.frame is None:
+      self.frame = Frame(self.count)
+    scope = Scope(name)
+    parent = self.stack[-1] if self.stack else self.frame.root
+    parent.children.append(scope)
+    self.stack.append(scope)
+    if self.gpu and (self.gpu_depth is None or len(self.stack) <= self.gpu_depth):
+      scope.q0 = self.Timestamp()
+    scope.t0 = time.perf_counter_ns()
+
+  def End (self):
+    scope = self.stack.pop()
+    scope.t1 = time.perf_counter_ns()
+    if scope.q0 is not None:
+      scope.q1 = self.Timestamp()
+
+  def BeginFrame (self):
+    if self.frame is None:
+      self.frame = Frame(self.count)
+    if self.gpu:
+      if self.offset is None:
+        gpu_now = GLint64(0)
+        get_integer64(GL_TIMESTAMP,gpu_now)
+        self.offset = time.perf_counter_ns() - gpu_now.value
+      self.frame.elapsed = self.NewQuery(GL_TIME_ELAPSED)
+      glBeginQuery(GL_TIME_ELAPSED,self.frame.elapsed)
+    if self.stats:
+      if self.targets is None:
+        from OpenGL.GL.ARB.pipeline_statistics_query import glInitPipelineStatisticsQueryARB
+        self.targets = STATISTICS if glInitPipelineStatisticsQueryARB() else []
+      for name, target in self.targets:
+        q = self.NewQuery(target)
+        glBeginQuery(target,q)
+        self.frame.stats.append((target,q))
+
+  def EndFrame (self):
+    frame = self.frame
+    if self.stats:
+      for name, target in self.targets:
+        glEndQuery(target)
+    if frame.elapsed is not None:
+      glEndQuery(GL_TIME_ELAPSED)
+    frame.root.t1 = time.perf_counter_ns()
+    self.inflight.append(frame)
+    self.frame = None
+    self.count += 1
+    self.Resolve(False)
+
+  # read back frames whose queries are complete; block=True waits for all
+  def Resolve (self, block=True):
+    while self.inflight:
+      frame = self.inflight[0]
+      if not block:
+        if self.count - frame.number <= self.latency:
+          break
+        last = frame.elapsed if frame.elapsed is not None else frame.stats[-1][1] if frame.stats else None
+        if last is not None and not glGetQueryObjectiv(last,GL_QUERY_RESULT_AVAILABLE):
+          break
+      self.inflight.popleft()
+      self.frames.append(self.ToDict(frame))
+
+  def Result (self, target, q):
+    value = GLuint64(0)
+    get_query_ui64(q,GL_QUERY_RESULT,value)
+    self.queries[target].append(q)
+    return value.value
+
+  def ToDict (self, frame):
+    info = self.ScopeToDict(frame.root)
+    info["frame"] = frame.number
+    if frame.elapsed is not None:
+      info["gpu_ms"] = self.Result(GL_TIME_ELAPSED,frame.elapsed) / 1e6
+    if frame.stats:
+      names = dict((target,name) for name, target in STATISTICS)
+      info["stats"] = {names[target]: self.Result(target,q) for target, q in frame.stats}
+    return info
+
+  def ScopeToDict (self, scope):
+    info = {
+      "name": scope.name,
+      "cpu_start": (scope.t0 - self.origin) / 1e6,
+      "cpu_ms": (scope.t1 - scope.t0) / 1e6,
+    }
+    if scope.q0 is not None:
+      t0 = self.Result(GL_TIMESTAMP,scope.q0)
+      t1 = self.Result(GL_TIMESTAMP,scope.q1)
+      info["gpu_start"] = (t0 + self.offset - self.origin) / 1e6
+      info["gpu_ms"] = (t1 - t0) / 1e6
+    info["children"] = [self.ScopeToDict(child) for child in scope.children]
+    return info
+
+  # resolved frames (oldest first), each a tree of scopes; times in ms
+  def GetFrames (self):
+    return list(self.frames)
+
+  def GetLastFrame (self):
+    return self.frames[-1] if self.frames else None
+
+  # last resolved frame (a few frames behind the one just rendered)
+  def GetReport (self):
+    return self.GetLastFrame()
+
+  def Clear (self):
+    self.frames.clear()
+
+  # Chrome / Perfetto trace (chrome://tracing, ui.perfetto.dev)
+  def ExportChromeTrace (self, filename):
+    self.Resolve(True)
+    events = [
+      {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "CPU"}},
+      {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "GPU"}},
+    ]
+    for frame in self.frames:
+      self.AddEvents(events,frame)
+      if "stats" in frame:
+        events.append({"name": "pipeline statistics", "ph": "C", "pid": 1, "tid": 2,
+                       "ts": frame["cpu_start"]*1000, "args": frame["stats"]})
+    with open(filename,"w") as f:
+      json.dump({"traceEvents": events, "displayTimeUnit": "ms"},f)
+
+  def AddEvents (self, events, scope):
+    events.append({"name": scope["name"], "ph": "X", "pid": 1, "tid": 1,
+                   "ts": scope["cpu_start"]*1000, "dur": scope["cpu_ms"]*1000})
+    if "gpu_start" in scope:
+      events.append({"name": scope["name"], "ph": "X", "pid": 1, "tid": 2,
+                     "ts": scope["gpu_start"]*1000, "dur": scope["gpu_ms"]*1000})
+    for child in scope["children"]:
+      self.AddEvents(events,child)
@@ -1,8 +1,26 @@
+import os
+from OpenGL.GL import *
+import changes
+import uniformbuffer
+from state import State
+from shader import Shader
+
+SHADERS = os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders")
+OIT = {"USE_OIT": True}   # shader variants of the transparent pass (see shaders/oit.glsl)
 
 class Scene:
   def __init__ (self, root):
     self.root = root
+    self.state = None   # reused from frame to frame
     self.engines = []
+    self.interpolate = False
+    self.instruments = []
+    self.transforms = None
+    self.prepass = None   # depth-only program, when the pre-pass is on
+    self.depth = None     # depth-only program (created on first use)
+    self.depthstate = None   # state of depth renders from lights (see RenderDepth)
+    self.sort = False
+    self.gbuffer = None   # G-buffer program (see DeferredRenderer)
 
   def GetRoot (self):
     return self.root
@@ -10,11 +28,182 @@ class Scene:
   def AddEngine (self, engine):
     self.engines.append(engine)
 
+  # some engine still changing the scene (see Engine.IsAnimating)
+  def IsAnimating (self):
+    for e in self.engines:
+      if e.IsAnimating():
+        return True
+    return False
+
+  # changes.GetVersion: moves whenever the rendered image may change
+  def GetVersion (self):
+    return changes.GetVersion()
+
+  # instruments (e.g. Profiler) get Begin(name)/End() around the update, each
+  # engine and each node rendered, and BeginFrame()/EndFrame() around a render;
+  # Render then returns the instruments' reports (GetReport) by name
+  def AddInstrument (self, instrument):
+    self.instruments.append(instrument)
+
+  def RemoveInstrument (self, instrument):
+    self.instruments.remove(instrument)
+
+  def GetInstruments (self):
+    return self.instruments
+
+  # structure-of-arrays backing for the transforms (see TransformArray); its
+  # matrices are computed in one batch per frame
+  def SetTransformArray (self, transforms):
+    self.transforms = transforms
+
+  def GetTransformArray (self):
+    return self.transforms
+
+  # depth pre-pass: the scene is first drawn with a position-only program
+  # and color writes off, then shaded with GL_LEQUAL against the finished
+  # depth buffer, so each pixel runs the (expensive) fragment shaders once.
+  # Pays off at high resolutions with much overdraw; the shading vertex
+  # shaders should declare "invariant gl_Position" as the depth one does.
+  # The depth pass is drawn front to back (see SetSortFrontToBack).
+  def SetDepthPrepass (self, flag):
+    self.prepass = self.GetDepthShader() if flag else None
+    changes.Touch()
+
+  def GetDepthShader (self):
+    if not self.depth:
+      self.depth = Shader(None,"world")
+      self.depth.AttachVertexShader(os.path.join(SHADERS,"depth/vertex.glsl"))
+      self.depth.AttachFragmentShader(os.path.join(SHADERS,"depth/fragment.glsl"))
+      self.depth.Link()
+    return self.depth
+
+  def HasDepthPrepass (self):
+    return self.prepass is not None
+
+  # draw the children of each node in front-to-back order of their origins
+  # (a per-frame sort), so that early depth testing skips hidden fragments
+  def SetSortFrontToBack (self, flag):
+    self.sort = flag
+    changes.Touch()
+
+  def IsSortFrontToBack (self):
+    return self.sort
+
+  # keep the previous pose of each transform so that frames can be rendered
+  # between two fixed simulation steps (see Render's alpha)
+  def SetInterpolation (self, flag):
+    self.interpolate = flag
+
   def Update (self, dt):
+    if self.instruments:
+      return self.UpdateInstrumented(dt)
+    if self.interpolate:
+      self.root.SavePose()
+    for e in self.engines:
+      e.Update(dt)
+
+  def UpdateInstrumented (self, dt):
+    for ins in self.instruments:
+      ins.Begin("Update")
+    if self.interpolate:
+      self.root.SavePose()
     for e in self.engines:
+      for ins in self.instruments:
+        ins.Begin(type(e).__name__)
       e.Update(dt)
+      for ins in self.instruments:
+        ins.End()
+    for ins in self.instruments:
+      ins.End()
 
-  def Render (self, camera):
-    from state import State
-    st = State(camera)
+  # layer: None for the whole scene, "static" or "dynamic" for the nodes
+  # outside or inside dynamic subtrees (see StaticLayer); blend: None for
+  # all nodes, "opaque" or "transparent" for the nodes outside or inside
+  # translucent subtrees (see TransparencyLayer); path: None for all nodes,
+  # "deferred" for the nodes written to the G-buffer, "forward" for the
+  # forward and translucent ones (see DeferredRenderer)
+  def Render (self, camera, alpha=1.0, layer=None, blend=None, path=None):
+    st = self.state
+    transforms = self.transforms
+    if st is None or st.shader:   # first frame, or rendered from within a render
+      if st is not None:
+        transforms = None   # the outer render is using its matrices
+      st = State(camera)
+      if self.state is None:
+        self.state = st
+    st.Reset(camera,alpha,transforms)
+    st.layer = layer
+    st.blend = blend
+    if blend == "transparent":
+      st.features[0] = OIT
+    st.path = path
+    if path == "deferred":
+      st.override = self.GetGBufferShader()
+    st.instruments = self.instruments
+    for ins in self.instruments:
+      ins.BeginFrame()
+      ins.Begin("Render")
+    previous = st.LoadFrame()
+    if st.transforms:
+      st.transforms.Update(st.GetViewProjMatrix(),st.GetViewMatrix())
+    if self.prepass and blend != "transparent":
+      self.RenderPrepass(st)
+    else:
+      st.sort = self.sort
+      self.root.Render(st)
+    if previous is not None and previous is not st.frame:   # nested render
+      uniformbuffer.BindFrame(previous)
+    if not self.instruments:
+      return None
+    for ins in reversed(self.instruments):
+      ins.End()
+      ins.EndFrame()
+    return {ins.GetName(): ins.GetReport() for ins in self.instruments}
+
+  # depth only, from a light's camera, for shadow maps (see ShadowMap):
+  # layer as in Render; planes: world space planes culling the shapes
+  # (inside where positive). May be called from within a render.
+  def RenderDepth (self, camera, alpha=1.0, layer=None, planes=None):
+    st = self.depthstate
+    if st is None or st.shader:
+      st = State(camera)
+      if self.depthstate is None:
+        self.depthstate = st
+    st.Reset(camera,alpha)   # no TransformArray: its matrices are the camera's
+    st.layer = layer
+    st.planes = planes
+    st.lightcamera = True
+    st.prepass = "depth"
+    st.override = self.GetDepthShader()
+    st.sort = True
+    self.root.Render(st)
+
+  # material properties in camera space to a G-buffer (see DeferredRenderer)
+  def GetGBufferShader (self):
+    if not self.gbuffer:
+      self.gbuffer = Shader(None,"camera")
+      self.gbuffer.AttachVertexShader(os.path.join(SHADERS,"ilum_frag/vertex.glsl"))
+      self.gbuffer.AttachFragmentShader(os.path.join(SHADERS,"deferred/gbuffer.glsl"))
+      self.gbuffer.Link()
+    return self.gbuffer
+
+  def RenderPrepass (self, st):
+    func = glGetIntegerv(GL_DEPTH_FUNC)
+    for ins in self.instruments:
+      ins.Begin("DepthPrepass")
+    layer, blend, path, override = st.layer, st.blend, st.path, st.override
+    st.prepass = "depth"
+    st.override = self.prepass
+    st.sort = True
+    glColorMask(GL_FALSE,GL_FALSE,GL_FALSE,GL_FALSE)
+    self.root.Render(st)
+    glColorMask(GL_TRUE,GL_TRUE,GL_TRUE,GL_TRUE)
+    for ins in reversed(self.instruments):
+      ins.End()
+    st.Reset(st.camera,st.alpha,st.transforms)
+    st.layer, st.blend, st.path, st.override = layer, blend, path, override
+    st.prepass = "shading"
+    st.sort = self.sort
+    glDepthFunc(GL_LEQUAL)
     self.root.Render(st)
+    glDepthFunc(func)
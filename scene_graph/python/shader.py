@@ -1,33 +1,135 @@
 from OpenGL.GL import *
 import numpy as np
 import glm
+import time
 
+import changes
 import shaderutl as sutl
+import uniformbuffer
+# raw entry points for the per-node uniforms: the wrapped ones convert (and
+# keep) their arguments, allocating on every call
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUniform1i as uniform1i
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUniform1f as uniform1f
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUniform3f as uniform3f
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUniform4f as uniform4f
+from OpenGL.raw.GL.VERSION.GL_2_0 import glUniformMatrix4fv as uniform_matrix4fv
 
 # read file to a string
 class Shader:
-  def __init__ (self, light=None, space="camera"):
-    self.shaders = []
-    self.textunit = 0
+  def __init__ (self, light=None, space="camera", defines=None):
+    self.sources = []      # (type, filename) pairs, compiled at link time
+    self.defines = dict(defines or {})
+    self.base = None       # shader this one is a variant of
+    self.variants = {}     # compiled variants, by set of active defines
+    self.texunit = 0
     self.light = light
     self.space = space
     self.pid = None
+    self.locations = {}    # uniform locations, by name
+    self.blocks = set()    # uniform blocks of shaders/blocks.glsl declared by the program
+    self.pending = None    # (shaders, filenames) of a link still in progress
+    self.submitted = 0
+    self.wait = True
+    self.fallback = None   # drawn while a non-blocking link is in progress
 
   def AttachVertexShader (self, filename):
-    self.shaders.append(sutl.create_shader(GL_VERTEX_SHADER,filename))
+    self.sources.append((GL_VERTEX_SHADER,filename))
 
   def AttachFragmentShader (self, filename):
-    self.shaders.append(sutl.create_shader(GL_FRAGMENT_SHADER,filename))
+    self.sources.append((GL_FRAGMENT_SHADER,filename))
 
   def AttachGeometryShader (self, filename):
-    self.shaders.append(sutl.create_shader(GL_GEOMETRY_SHADER,filename))
+    self.sources.append((GL_GEOMETRY_SHADER,filename))
 
   def AttachTesselationShader (self, control_filename, evaluation_filename):
-    self.shaders.append(sutl.create_shader(GL_TESS_CONTROL_SHADER,control_filename))
-    self.shaders.append(sutl.create_shader(GL_TESS_EVALUATION_SHADER,evaluation_filename))
-  
-  def Link (self):
-    self.pid = sutl.create_program(*self.shaders)
+    self.sources.append((GL_TESS_CONTROL_SHADER,control_filename))
+    self.sources.append((GL_TESS_EVALUATION_SHADER,evaluation_filename))
+
+  # define a preprocessor symbol for all stages (must be called before Link)
+  def Define (self, name, value=True):
+    self.defines[name] = value
+
+  def GetDefines (self):
+    return self.defines
+
+  # wait=False submits compilation and link without blocking: the program
+  # becomes active once IsReady() reports completion (fallback is drawn meanwhile)
+  def Link (self, wait=True):
+    defines = dict(self.defines)
+    if self.space == "camera":   # lighting space of shaders/blocks.glsl
+      defines["LIGHTING_CAMERA"] = True
+    shaders = []
+    for type, filename in self.sources:
+      shaders.append(sutl.submit_shader(type,filename,defines))
+    self.pid = sutl.submit_program(*shaders)
+    self.locations = {}
+    self.pending = (shaders,[filename for type, filename in self.sources])
+    self.submitted = time.perf_counter()
+    self.wait = wait
+    base = self.base or self
+    base.variants[VariantKey(self.defines)] = self
+    if wait:
+      self.Finish()
+
+  def IsReady (self):
+    if self.pending and sutl.program_ready(self.pid,self.submitted):
+      self.Finish()
+    return self.pending is None
+
+  # block until the program is linked (raises on compilation or link errors)
+  def Finish (self):
+    if self.pending:
+      shaders, filenames = self.pending
+      self.pending = None
+      sutl.check_program(self.pid,shaders,filenames)
+      self.BindBlocks()
+
+  # connect the program's blocks to their binding points (see uniformbuffer)
+  def BindBlocks (self):
+    self.blocks = set()
+    for name, binding in uniformbuffer.BLOCKS.items():
+      index = glGetUniformBlockIndex(self.pid,name)
+      if index != GL_INVALID_INDEX:
+        glUniformBlockBinding(self.pid,index,binding)
+        self.blocks.add(name)
+
+  # the program reads the named block (camera, light or material data)
+  def HasBlock (self, name):
+    return name in self.blocks
+
+  def SetFallback (self, shader):
+    self.fallback = shader
+
+  def GetFallback (self):
+    return self.fallback
+
+  # shader to be used now: itself when linked, the fallback while it compiles
+  def GetActive (self):
+    if self.pending and not self.IsReady():
+      if self.fallback:
+        changes.Touch()   # render again once linked
+        return self.fallback.GetActive()
+      self.Finish()
+    return self
+
+  # return the program specialized for the given features (e.g. {"USE_BUMP": True});
+  # variants are compiled on first request and cached in the base shader
+  def GetVariant (self, features):
+    base = self.base or self
+    defines = dict(base.defines)
+    defines.update(features)
+    key = VariantKey(defines)
+    shd = base.variants.get(key)
+    if shd is None:
+      shd = Shader(base.light,base.space,defines)
+      shd.base = base
+      shd.sources = base.sources
+      shd.fallback = base.fallback or base
+      shd.Link(base.wait)
+    return shd
+
+  def GetBase (self):
+    return self.base or self
 
   def GetLight (self):
     return self.light
@@ -39,19 +141,31 @@ class Shader:
     type(self.pid)
     glUseProgram(self.pid)
 
+  def GetUniformLocation (self, varname):
+    loc = self.locations.get(varname)
+    if loc is None:
+      loc = self.locations[varname] = glGetUniformLocation(self.pid,varname)
+    return loc
+
   def SetUniform (self, varname, x):
-    loc = glGetUniformLocation(self.pid,varname)
+    loc = self.locations.get(varname)
+    if loc is None:
+      loc = self.GetUniformLocation(varname)
     tp = type(x)
     if tp == int:
-      glUniform1i(loc,x)
+      uniform1i(loc,x)
     elif tp == float:
-      glUniform1f(loc,x)
+      uniform1f(loc,x)
+    elif tp == glm.vec2:
+      glUniform2f(loc,x.x,x.y)
     elif tp == glm.vec3:
-      glUniform3fv(loc,1,glm.value_ptr(x))
+      uniform3f(loc,x.x,x.y,x.z)
+    elif tp == glm.ivec3:
+      glUniform3i(loc,x.x,x.y,x.z)
     elif tp == glm.vec4:
-      glUniform4fv(loc,1,glm.value_ptr(x))
+      uniform4f(loc,x.x,x.y,x.z,x.w)
     elif tp == glm.mat4x4:
-      glUniformMatrix4fv(loc,1,GL_FALSE,glm.value_ptr(x))
+      uniform_matrix4fv(loc,1,GL_FALSE,glm.value_ptr(x))
     elif tp == list:
       tpe = type(x[0])
       if tpe == int:
@@ -68,6 +182,13 @@ class Shader:
         raise SystemError("Type not supported in list in Shader.SetUniform: " + str(tpe))
     else:
       raise SystemError("Type not supported in Shader.SetUniform: " + str(tp))
+
+  # mat4 uniform from a pointer that stays valid (see State.LoadMatrices)
+  def SetUniformMatrix (self, varname, ptr):
+    loc = self.locations.get(varname)
+    if loc is None:
+      loc = self.GetUniformLocation(varname)
+    uniform_matrix4fv(loc,1,GL_FALSE,ptr)
     
   def ActiveTexture (self, varname):
     self.SetUniform(varname,self.texunit)
@@ -88,3 +209,7 @@ class Shader:
   def Unload (self, st):
     st.PopShader()
 
+
+# cache key of a define set: disabled symbols do not change the program
+def VariantKey (defines):
+  return frozenset((k,v) for k,v in defines.items() if v is not False and v is not None)
@@ -1,11 +1,19 @@
 # auxiliary functions for shader management
+import os
+import re
+import time
 from OpenGL.GL import *
 
-def create_shader (type, filename):
+# without GL_KHR_parallel_shader_compile, link status is only queried after
+# this delay (seconds), giving the driver's compiler threads time to finish
+deferred_wait = 0.1
+parallel = None
+
+def create_shader (type, filename, defines=None):
   id = glCreateShader(type)
   if not id:
     raise RuntimeError("could not create shader")
-  text = readfile(filename)
+  text = preprocess(filename,defines)
   glShaderSource(id,text)
   compile_shader(id,filename)
   return id
@@ -21,7 +29,7 @@ def create_program (*argv):
   if not id:
     raise RuntimeError("could not create shader")
   for arg in argv:
-     glAttachShader(id,arg) 
+     glAttachShader(id,arg)
   link_program(id)
   return id
 
@@ -31,6 +39,97 @@ def link_program (id):
       error = glGetProgramInfoLog(id).decode()
       raise RuntimeError('Linking error: ' + error)
 
+# non-blocking compilation: shaders and programs are submitted without
+# querying their status; errors are reported by check_program
+def submit_shader (type, filename, defines=None):
+  id = glCreateShader(type)
+  if not id:
+    raise RuntimeError("could not create shader")
+  glShaderSource(id,preprocess(filename,defines))
+  glCompileShader(id)
+  return id
+
+def submit_program (*argv):
+  init_parallel_compile()
+  id = glCreateProgram()
+  if not id:
+    raise RuntimeError("could not create shader")
+  for arg in argv:
+    glAttachShader(id,arg)
+  glLinkProgram(id)
+  return id
+
+# poll a submitted program: True when its status can be queried without stalling
+def program_ready (id, submitted):
+  if init_parallel_compile():
+    from OpenGL.GL.KHR.parallel_shader_compile import GL_COMPLETION_STATUS_KHR
+    from OpenGL.raw.GL.VERSION.GL_2_0 import glGetProgramiv as get_programiv
+    status = GLint(0)   # raw call: the wrapped one has no size entry for this enum
+    get_programiv(id,GL_COMPLETION_STATUS_KHR,status)
+    return bool(status.value)
+  return time.perf_counter() - submitted >= deferred_wait
+
+# check a submitted program (blocks if still compiling), reporting compile errors first
+def check_program (id, shaders, filenames):
+  if not glGetProgramiv(id,GL_LINK_STATUS):
+    for sid, filename in zip(shaders,filenames):
+      if not glGetShaderiv(sid,GL_COMPILE_STATUS):
+        error = glGetShaderInfoLog(sid).decode()
+        raise RuntimeError("Compilation error: " + filename + "\n" + error)
+    error = glGetProgramInfoLog(id).decode()
+    raise RuntimeError('Linking error: ' + error)
+  for sid in shaders:
+    glDetachShader(id,sid)
+    glDeleteShader(sid)
+
+# enable driver-side parallel compilation once (needs a current context)
+def init_parallel_compile ():
+  global parallel
+  if parallel is None:
+    try:
+      from OpenGL.GL.KHR.parallel_shader_compile import glInitParallelShaderCompileKHR, glMaxShaderCompilerThreadsKHR
+      parallel = bool(glInitParallelShaderCompileKHR())
+      if parallel:
+        glMaxShaderCompilerThreadsKHR(0xFFFFFFFF)  # let the driver choose
+    except Exception:
+      parallel = False
+  return parallel
+
+# expand includes and inject defines right after the #version line
+def preprocess (filename, defines=None):
+  text = expand_includes(filename,[])
+  header = ""
+  for name, value in sorted((defines or {}).items()):
+    if value is True:
+      header += "#define " + name + "\n"
+    elif value is not False and value is not None:
+      header += "#define " + name + " " + str(value) + "\n"
+  if not header:
+    return text
+  match = re.search(r"^[ \t]*#version[^\n]*\n",text,re.MULTILINE)
+  if match:
+    return text[:match.end()] + header + text[match.end():]
+  return header + text
+
+# replace each '#include "file"' line by the file contents (path relative to the includer)
+def expand_includes (filename, stack):
+  path = os.path.abspath(filename)
+  if path in stack:
+    raise RuntimeError("Recursive include: " + filename)
+  text = ""
+  for line in readfile(filename).splitlines(True):
+    match = re.match(r'[ \t]*#include[ \t]+"([^"]+)"',line)
+    if match:
+      incname = os.path.join(os.path.dirname(path),match.group(1))
+      if not os.path.exists(incname):
+        raise RuntimeError("Include file not found: " + match.group(1) + " (in " + filename + ")")
+      text += expand_includes(incname,stack+[path])
+      if not text.endswith("\n"):
+        text += "\n"
+    else:
+      text += line
+  return text
+
 # read file to a string
 def readfile (filename):
   with open(filename) as f:
@@ -0,0 +1,113 @@
+import weakref
+import glm
+
+from appearance import Appearance
+
+FULL = "full"
+CHEAP = "cheap"
+
+# Shading level of detail: each frame, the projected size of every node
+# with shapes (the diameter of its largest bounding sphere, in pixels) is
+# estimated, and nodes smaller than 'low' are drawn with a cheap program
+# (e.g. per-vertex Phong, without bump or fog) instead of the shader lit by
+# the subtree's one. A node goes back to the full program only once it is
+# larger than 'high', so nodes around one threshold do not pop back and
+# forth from frame to frame. Nodes with shaders of their own, depth passes
+# and G-buffer passes are left alone.
+#
+# As an appearance it applies to the nodes of its subtree:
+#   lod = ShadingLOD(vertex_phong,24,32)
+#   root.AddAppearance(lod)
+# GetCounts tells how many nodes were drawn with each tier since the last
+# ResetCounts (call it once per frame).
+class ShadingLOD (Appearance):
+  def __init__ (self, cheap, low=24.0, high=32.0):
+    self.cheap = cheap
+    self.full = None        # shader of the subtree (set on Load)
+    self.previous = None    # enclosing ShadingLOD
+    self.scale = 1.0        # pixels per unit of diameter at unit depth
+    self.ortho = False
+    self.tiers = weakref.WeakKeyDictionary()   # tier of each node seen (freed with it)
+    self.counts = {FULL: 0, CHEAP: 0}
+    self.SetThresholds(low,high)
+
+  # sizes in pixels: below low a node switches to the cheap program,
+  # above high back to the full one
+  def SetThresholds (self, low, high):
+    if high < low:
+      raise RuntimeError("ShadingLOD: high threshold below the low one")
+    self.low = low
+    self.high = high
+
+  def GetThresholds (self):
+    return self.low, self.high
+
+  def GetCheapShader (self):
+    return self.cheap
+
+  # FULL or CHEAP (None if never drawn)
+  def GetTier (self, node):
+    return self.tiers.get(node)
+
+  def GetCounts (self):
+    return dict(self.counts)
+
+  def ResetCounts (self):
+    self.counts[FULL] = 0
+    self.counts[CHEAP] = 0
+
+  # projected diameter (pixels) of the shapes' bounding spheres under the
+  # current matrix; None when some shape has no bounds
+  def ScreenSize (self, node, st):
+    model = st.GetCurrentMatrix()
+    scale = max(glm.length(glm.vec3(model[0])),glm.length(glm.vec3(model[1])),
+                glm.length(glm.vec3(model[2])))
+    view = st.GetViewMatrix()
+    size = 0.0
+    for shp in node.shps:
+      bounds = shp.GetBounds()
+      if bounds is None:
+        return None
+      diameter = 2.0 * bounds[1] * scale * self.scale
+      if not self.ortho:
+        depth = -(view * (model * bounds[0])).z
+        if depth <= bounds[1] * scale:   # camera inside or close to the bounds
+          return None
+        diameter /= depth
+      size = max(size,diameter)
+    return size
+
+  # called by Node before loading its appearances: the program of the
+  # node's tier is loaded when it is not the current one; returns whether
+  # a shader was loaded (unloaded by Node after the appearances)
+  def Select (self, node, st):
+    if st.prepass == "depth" or st.override:
+      return False
+    current = st.GetShader().GetBase()
+    if current is not self.full.GetBase() and current is not self.cheap.GetBase():
+      return False   # node with a shader of its own
+    size = self.ScreenSize(node,st)
+    tier = self.tiers.get(node,FULL)
+    if size is None:
+      tier = FULL
+    elif tier == CHEAP:
+      tier = CHEAP if size < self.high else FULL
+    else:
+      tier = CHEAP if size < self.low else FULL
+    self.tiers[node] = tier
+    self.counts[tier] += 1
+    shd = self.cheap if tier == CHEAP else self.full
+    if shd.GetBase() is current:
+      return False
+    shd.Load(st)
+    return True
+
+  def Load (self, st):
+    self.previous = st.lod
+    st.lod = self
+    self.full = st.GetShader().GetBase()
+    self.ortho = st.IsOrtho()
+    self.scale = st.GetPixelScale()
+
+  def Unload (self, st):
+    st.lod = self.previous
@@ -0,0 +1,230 @@
+import glm
+from OpenGL.GL import *
+
+from appearance import Appearance
+from framebuffer import Framebuffer
+from texdepth import TexDepth
+from texdepthcube import TexDepthCube
+import changes
+
+UNIT = 15   # texture unit of the shadow maps (kept out of the per-shader counters)
+
+# cube faces: direction and up vector of the light camera
+FACES = [
+  (glm.vec3( 1, 0, 0),glm.vec3(0,-1, 0)),
+  (glm.vec3(-1, 0, 0),glm.vec3(0,-1, 0)),
+  (glm.vec3( 0, 1, 0),glm.vec3(0, 0, 1)),
+  (glm.vec3( 0,-1, 0),glm.vec3(0, 0,-1)),
+  (glm.vec3( 0, 0, 1),glm.vec3(0,-1, 0)),
+  (glm.vec3( 0, 0,-1),glm.vec3(0,-1, 0)),
+]
+
+# light-space clip coordinates to texture coordinates and depth
+BIAS = glm.translate(glm.mat4(1.0),glm.vec3(0.5)) * glm.scale(glm.mat4(1.0),glm.vec3(0.5))
+
+class LightCamera:
+  def __init__ (self, proj, view):
+    self.proj = proj
+    self.view = view
+
+  def GetProjMatrix (self):
+    return self.proj
+
+  def GetViewMatrix (self):
+    return self.view
+
+  def Load (self, st):
+    pass
+
+# Shadow map of a light: a depth cube map (one camera per face) for point
+# lights, a 2D map of an orthographic box (extent around center, far deep)
+# for directional ones, sampled with hardware comparison by shaders
+# compiled with USE_SHADOW (see shaders/shadow.glsl).
+#
+# Static casters are rendered into a cached map, again only when the light
+# or a static node moves (or after Invalidate); when the scene has dynamic
+# nodes (Node.SetDynamic), each frame in which something moved copies the
+# cache to a second map and renders only the dynamic casters on top of it.
+# Shapes whose bounding spheres lie outside the light frustum (of each face)
+# are culled. As an appearance it applies to the shaders of its node:
+#   shadow = ShadowMap(scene,light,2048)
+#   root.AddAppearance(shadow)
+class ShadowMap (Appearance):
+  def __init__ (self, scene, light, size=1024, near=0.05, far=20.0, extent=10.0, center=(0,0,0)):
+    self.scene = scene
+    self.light = light
+    self.near = near
+    self.far = far
+    self.extent = extent
+    self.center = glm.vec3(*center)
+    self.bias = 0.0005
+    self.cameras = []       # light cameras (one per face of a cube map)
+    self.pos = glm.vec4(0.0)      # world space light position of the cameras
+    self.world = glm.mat4(1.0)    # world and camera space to shadow coordinates
+    self.camera = glm.mat4(1.0)
+    self.version = None     # change version of the last check
+    self.key = None         # light of the cached static map
+    self.static = None      # static caster poses of the cached map
+    self.dynamic = None     # dynamic caster poses (and alpha) of the composited map
+    light.SetShadow(self)
+    self.SetSize(size)
+
+  def SetSize (self, size):
+    self.size = size
+    self.cube = self.light.pos.w != 0.0
+    faces = range(6) if self.cube else [None]
+    self.cache = self.CreateTexture()
+    self.cachefbs = [Framebuffer(self.cache,face=face) for face in faces]
+    self.tex = None        # composited map, created on first dynamic caster
+    self.fbs = None
+    self.faces = faces
+    self.Invalidate()
+
+  def GetSize (self):
+    return self.size
+
+  def SetBias (self, bias):
+    self.bias = bias
+    changes.Touch()
+
+  def IsCube (self):
+    return self.cube
+
+  def CreateTexture (self):
+    if self.cube:
+      tex = TexDepthCube("shadowCube",self.size)
+    else:
+      tex = TexDepth("shadowMap",self.size,self.size)
+    tex.SetCompareMode()
+    return tex
+
+  # render the static casters again (e.g. after editing their shapes)
+  def Invalidate (self):
+    self.version = None
+    self.key = None
+    changes.Touch()
+
+  def UpdateCameras (self, pos):
+    self.pos = glm.vec4(pos)
+    if self.cube:
+      eye = glm.vec3(pos)
+      proj = glm.perspective(glm.radians(90.0),1.0,self.near,self.far)
+      self.cameras = [LightCamera(proj,glm.lookAt(eye,eye+d,up)) for d, up in FACES]
+    else:
+      d = glm.normalize(glm.vec3(pos))
+      up = glm.vec3(0,0,1) if abs(d.y) > 0.99 else glm.vec3(0,1,0)
+      view = glm.lookAt(self.center+d*self.far*0.5,self.center,up)
+      e = self.extent
+      self.cameras = [LightCamera(glm.ortho(-e,e,-e,e,0.0,self.far),view)]
+
+  # world matrices of the nodes with shapes, static and dynamic ones
+  def CollectPoses (self, node, mat, moving, static, dynamic):
+    if node.trf:
+      mat = mat * node.trf.GetMatrix()
+    if node.shps:
+      (dynamic if moving else static).append(mat)
+    for child in node.nodes:
+      self.CollectPoses(child,mat,moving or child.IsDynamic(),static,dynamic)
+
+  def Update (self, st):
+    version = changes.GetVersion()
+    if version == self.version:
+      return
+    self.version = version
+    root = self.scene.GetRoot()
+    pos = self.light.GetWorldPosition(st)
+    key = (glm.vec4(pos),self.near,self.far,self.extent,glm.vec3(self.center))
+    static, dynamic = [], []
+    self.CollectPoses(root,glm.mat4(1.0),root.IsDynamic(),static,dynamic)
+    redraw = key != self.key or static != self.static
+    if redraw:
+      self.UpdateCameras(pos)
+    if not dynamic:
+      self.dynamic = None
+      if not redraw:
+        return
+    elif not redraw and (dynamic,st.alpha) == self.dynamic:
+      return
+    for ins in st.instruments:
+      ins.Begin("ShadowMap")
+    fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+    vp = glGetIntegerv(GL_VIEWPORT)
+    test = glIsEnabled(GL_DEPTH_TEST)
+    glViewport(0,0,self.size,self.size)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_POLYGON_OFFSET_FILL)
+    glPolygonOffset(2.0,4.0)
+    if redraw:
+      self.Render(self.cachefbs,"static" if dynamic else None,st.alpha)
+      self.key = key
+      self.static = static
+    if dynamic:
+      if self.tex is None:
+        self.tex = self.CreateTexture()
+        self.fbs = [Framebuffer(self.tex,face=face) for face in self.faces]
+      for src, dst in zip(self.cachefbs,self.fbs):
+        glBindFramebuffer(GL_READ_FRAMEBUFFER,src.GetId())
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER,dst.GetId())
+        glBlitFramebuffer(0,0,self.size,self.size,0,0,self.size,self.size,GL_DEPTH_BUFFER_BIT,GL_NEAREST)
+      self.Render(self.fbs,"dynamic",st.alpha,False)
+      self.dynamic = (dynamic,st.alpha)
+    glDisable(GL_POLYGON_OFFSET_FILL)
+    if not test:
+      glDisable(GL_DEPTH_TEST)
+    glBindFramebuffer(GL_FRAMEBUFFER,int(fbo))
+    glViewport(int(vp[0]),int(vp[1]),int(vp[2]),int(vp[3]))
+    for ins in reversed(st.instruments):
+      ins.End()
+
+  def Render (self, fbs, layer, alpha, clear=True):
+    for fb, camera in zip(fbs,self.cameras):
+      fb.Bind()
+      if clear:
+        glClear(GL_DEPTH_BUFFER_BIT)
+      self.scene.RenderDepth(camera,alpha,layer,Planes(camera))
+
+  # the map being sampled: the composited one when there are dynamic casters
+  def GetTexture (self):
+    return self.tex if self.dynamic else self.cache
+
+  # lighting space (world or camera) to shadow coordinates: light clip
+  # space mapped to [0,1] (2D map), or relative to the light (cube map)
+  def GetMatrix (self, space):
+    return self.camera if space == "camera" else self.world
+
+  def Load (self, st):
+    if st.prepass == "depth" or st.override:   # depth render or G-buffer
+      st.PushFeatures({})
+      return
+    self.Update(st)
+    if self.cube:
+      self.world = glm.translate(glm.mat4(1.0),-glm.vec3(self.pos))
+    else:
+      camera = self.cameras[0]
+      self.world = BIAS * camera.GetProjMatrix() * camera.GetViewMatrix()
+    self.camera = self.world * st.GetViewInverse()
+    glActiveTexture(GL_TEXTURE0+UNIT)
+    glBindTexture(GL_TEXTURE_CUBE_MAP if self.cube else GL_TEXTURE_2D,self.GetTexture().GetTexId())
+    glActiveTexture(GL_TEXTURE0)
+    st.PushFeatures({"USE_SHADOW": True, "SHADOW_CUBE": self.cube})
+
+  # uniforms of the shader being loaded (called by the light)
+  def LoadUniforms (self, shd):
+    shd.SetUniform(self.GetTexture().varname,UNIT)
+    shd.SetUniform("shadowMatrix",self.GetMatrix(shd.GetLightingSpace()))
+    shd.SetUniform("shadowParams",glm.vec4(self.near,self.far,self.bias,0.0))
+    shd.SetUniform("shadowOffset",0.0)
+
+  def Unload (self, st):
+    st.PopFeatures()
+
+# world space planes of a camera's view frustum (inside where positive)
+def Planes (camera):
+  m = camera.GetProjMatrix() * camera.GetViewMatrix()
+  rows = [glm.row(m,i) for i in range(4)]
+  planes = []
+  for i in range(3):
+    for s in (1.0,-1.0):
+      plane = rows[3] + rows[i]*s
+      planes.append(plane / glm.length(glm.vec3(plane)))
+  return planes
@@ -1,2 +1,106 @@
+import math
+import glm
+import numpy as np
+
+cache = {}   # coarser levels of procedural shapes, by class and parameters
+
+# shared instance of a shape class built with the given parameters
+def Cached (cls, *params):
+  key = (cls,) + params
+  shp = cache.get(key)
+  if shp is None:
+    shp = cache[key] = cls(*params)
+  return shp
+
 class Shape:
-  pass
\ No newline at end of file
+  bounds = None   # (center, radius) in model space; None: never culled
+  levels = None   # tessellation levels (see SetLevels); None: a single one
+  nind = 0        # indices drawn
+
+  # bounding sphere of the vertex coordinates (x, y, z triples)
+  def SetBounds (self, coords):
+    coords = np.asarray(coords,dtype=np.float32).reshape(-1,3)
+    lo, hi = coords.min(0), coords.max(0)
+    center = (lo + hi) * 0.5
+    radius = float(np.sqrt(((coords - center)**2).sum(1).max()))
+    self.bounds = (glm.vec4(*[float(c) for c in center],1.0),radius)
+
+  def GetBounds (self):
+    return self.bounds
+
+  def GetTriangleCount (self):
+    return self.nind // 3
+
+  # Chain of tessellations of a procedural shape, finest (this one) first:
+  # (error, parameters) pairs, where error is the largest distance (model
+  # units) from the tessellated surface to the exact one and parameters are
+  # those of the constructor building the level. Coarser levels are built on
+  # first use and shared by every shape of the class (see GeometricLOD).
+  def SetLevels (self, levels):
+    self.levels = levels
+
+  def GetLevelCount (self):
+    return len(self.levels) if self.levels else 1
+
+  def GetLevelError (self, k):
+    return self.levels[k][0] if self.levels else 0.0
+
+  # shape of level k; with build False, None when not built yet
+  def GetLevel (self, k, build=True):
+    if k == 0:
+      return self
+    params = self.levels[k][1]
+    if not build:
+      return cache.get((type(self),) + params)
+    return Cached(type(self),*params)
+
+# distance between a circle and the chords of its regular polygon of n sides
+def Sagitta (n, radius=1.0):
+  return radius * (1.0 - math.cos(math.pi / n))
+
+# n halved down to minimum (included when reached)
+def Halvings (n, minimum=4):
+  counts = [n]
+  while counts[-1] // 2 >= minimum:
+    counts.append(counts[-1] // 2)
+  return counts
+
+# Per-vertex tangents (x, y, z and handedness w, flat float32) of an indexed
+# triangle list: the texture u direction of the incident triangles, area
+# weighted and made orthogonal to the normal; w is the sign of the bitangent
+# (cross(normal,tangent) follows v when w is 1, e.g. not on mirrored
+# mappings). Vertices without texture variation (or without texcoords at
+# all) get an arbitrary direction perpendicular to the normal.
+def Tangents (coords, normals, texcoords, indices):
+  p = np.asarray(coords,dtype=np.float32).reshape(-1,3)
+  n = np.asarray(normals,dtype=np.float32).reshape(-1,3)
+  tan = np.zeros_like(p)
+  bit = np.zeros_like(p)
+  if texcoords is not None:
+    uv = np.asarray(texcoords,dtype=np.float32).reshape(-1,2)
+    tri = np.asarray(indices,dtype=np.int64).reshape(-1,3)
+    e1 = p[tri[:,1]] - p[tri[:,0]]
+    e2 = p[tri[:,2]] - p[tri[:,0]]
+    d1 = uv[tri[:,1]] - uv[tri[:,0]]
+    d2 = uv[tri[:,2]] - uv[tri[:,0]]
+    # dP/du and dP/dv scaled by the uv area's sign: keeps the area weight
+    det = d1[:,0]*d2[:,1] - d2[:,0]*d1[:,1]
+    sign = np.where(det < 0,-1.0,1.0).astype(np.float32)[:,None]
+    t = (e1*d2[:,1:2] - e2*d1[:,1:2]) * sign
+    b = (e2*d1[:,0:1] - e1*d2[:,0:1]) * sign
+    for k in range(3):
+      np.add.at(tan,tri[:,k],t)
+      np.add.at(bit,tri[:,k],b)
+  # Gram-Schmidt against the normal
+  tan -= n * np.einsum("ij,ij->i",n,tan)[:,None]
+  length = np.linalg.norm(tan,axis=1)
+  flat = length < 1e-6
+  if flat.any():
+    nf = n[flat]
+    axis = np.where((np.abs(nf[:,0]) < 0.9)[:,None],[1.0,0.0,0.0],[0.0,1.0,0.0]).astype(np.float32)
+    tan[flat] = np.cross(axis,nf)
+    length[flat] = np.linalg.norm(tan[flat],axis=1)
+  out = np.empty((len(p),4),dtype=np.float32)
+  out[:,:3] = tan / np.maximum(length,1e-12)[:,None]
+  out[:,3] = np.where(np.einsum("ij,ij->i",np.cross(n,tan),bit) < 0,-1.0,1.0)
+  return out.reshape(-1)
@@ -0,0 +1,192 @@
+import numpy as np
+
+RATIOS = (0.5,0.25,0.125)   # triangles kept by each level, relative to the source
+BOUNDARY = 100.0   # weight of the planes holding open boundaries in place
+MINCOS = 0.2       # a collapse turning a face further than this (cosine) is rejected
+SHARE = 0.5        # share of the independent collapses applied per pass
+STEPS = 5          # placements tried along each edge (besides the optimal one)
+
+def Unit (v):
+  length = np.linalg.norm(v,axis=-1)
+  return v / np.maximum(length,1e-30)[...,None], length
+
+def Planes (normals, points):
+  return np.concatenate([normals,-np.einsum("ij,ij->i",normals,points)[:,None]],1)
+
+def Quadrics (planes):
+  return planes[:,:,None] * planes[:,None,:]
+
+def FaceNormals (p, tri):
+  return np.cross(p[tri[:,1]]-p[tri[:,0]],p[tri[:,2]]-p[tri[:,0]])
+
+# squared distances of points (m, k, 3) to the planes summed in quadrics (m, 4, 4)
+def Cost (q, v):
+  vh = np.concatenate([v,np.ones(v.shape[:-1]+(1,))],-1)
+  return np.einsum("mki,mij,mkj->mk",vh,q,vh)
+
+# Quadric error metric simplification of an indexed triangle mesh (x, y, z
+# coordinates and normals, flat) into a chain of levels with the given
+# ratios of its triangles. Each pass collapses, at once, a set of the
+# cheapest edges no two of which touch a common face, at the point of each
+# edge closest to the planes of the faces merged into its vertices; collapses
+# that would pinch the surface (link condition) or flip a face are skipped.
+# Normals are interpolated along the edges; copies of a vertex (seams of the
+# normals) are kept in place, and open boundaries only move along
+# themselves. Returns a list of (error, coords, normals, indices) per ratio,
+# error being the largest distance of a vertex to the planes it merged.
+def Simplify (coords, normals, indices, ratios=RATIOS):
+  p = np.asarray(coords,dtype=np.float64).reshape(-1,3).copy()
+  n = np.asarray(normals,dtype=np.float64).reshape(-1,3).copy()
+  tri = np.asarray(indices,dtype=np.int64).reshape(-1,3)
+  nv = len(p)
+  # copies of a position stay put (and keep the seam closed)
+  _, weld, count = np.unique(p,axis=0,return_inverse=True,return_counts=True)
+  weld = weld.reshape(-1)
+  locked = count[weld] > 1
+  # face planes
+  fn, area = Unit(FaceNormals(p,tri))
+  planes = Planes(fn,p[tri[:,0]])
+  planes[area < 1e-20] = 0.0
+  qf = np.zeros((nv,4,4))
+  for k in range(3):
+    np.add.at(qf,tri[:,k],Quadrics(planes))
+  # open boundaries (edges of a single face, copies welded): planes through
+  # them, perpendicular to their face
+  e = np.concatenate([tri[:,[0,1]],tri[:,[1,2]],tri[:,[2,0]]])
+  face = np.tile(np.arange(len(tri)),3)
+  w = np.sort(weld[e],axis=1)
+  _, inverse, count = np.unique(w[:,0]*nv + w[:,1],return_inverse=True,return_counts=True)
+  count = count[inverse.reshape(-1)]
+  locked[e[count > 2].reshape(-1)] = True   # non-manifold
+  e, face = e[count == 1], face[count == 1]
+  boundary = np.zeros(nv,dtype=bool)
+  boundary[e.reshape(-1)] = True
+  bn, _ = Unit(np.cross(p[e[:,1]]-p[e[:,0]],fn[face]))
+  qb = Quadrics(Planes(bn,p[e[:,0]])) * BOUNDARY
+  q = qf.copy()
+  np.add.at(q,e[:,0],qb)
+  np.add.at(q,e[:,1],qb)
+  blocked = np.zeros(0,dtype=np.int64)   # rejected edges (a*nv+b) of unchanged neighbourhoods
+  levels = []
+  error = 0.0
+  for ratio in sorted(ratios,reverse=True):
+    target = max(1,int(len(indices)//3 * ratio))
+    while len(tri) > target:
+      reduced = Collapse(p,n,q,qf,tri,locked,boundary,blocked,len(tri)-target)
+      if reduced is None:
+        break   # nothing left to collapse
+      tri, blocked = reduced
+    used, inverse = np.unique(tri,return_inverse=True)
+    error = max(error,float(np.sqrt(max(0.0,Cost(qf[used],p[used][:,None,:]).max()))))
+    levels.append((error,p[used].astype(np.float32).reshape(-1),
+                   Unit(n[used])[0].astype(np.float32).reshape(-1),inverse.reshape(-1).astype(np.uint32)))
+  return levels
+
+# one pass of collapses, removing at most excess faces; updates the vertex
+# arrays and returns the remaining faces and the edges still rejected (None
+# when no edge can collapse)
+def Collapse (p, n, q, qf, tri, locked, boundary, blocked, excess):
+  nv = len(p)
+  big = np.iinfo(np.int64).max
+  e = np.sort(np.concatenate([tri[:,[0,1]],tri[:,[1,2]],tri[:,[2,0]]]),axis=1)
+  key, faces = np.unique(e[:,0]*nv + e[:,1],return_counts=True)
+  a, b = key // nv, key % nv
+  e = np.stack([a,b],1)
+  # edges across the surface between two boundary vertices would pinch it
+  ok = ~(locked[a] & locked[b]) & ~(boundary[a] & boundary[b] & (faces != 1)) & ~np.isin(key,blocked)
+  # kept vertex: a locked or boundary one stays put
+  swap = locked[b] | (boundary[b] & ~boundary[a] & (faces != 1))
+  fixed = swap | locked[a] | (boundary[a] & ~boundary[b] & (faces != 1))
+  keep = np.where(swap,b,a)
+  drop = np.where(swap,a,b)
+  # placement: along the edge, closest to the merged planes
+  Q = q[keep] + q[drop]
+  pk, pd = p[keep], p[drop]
+  d = pd - pk
+  A = Q[:,:3,:3]
+  solvable = np.abs(np.linalg.det(A)) > 1e-12
+  x = np.zeros_like(pk)
+  if solvable.any():
+    x[solvable] = np.linalg.solve(A[solvable],-Q[solvable,:3,3:4])[:,:,0]
+  t = np.clip(np.einsum("ij,ij->i",x-pk,d) / np.maximum(np.einsum("ij,ij->i",d,d),1e-30),0.0,1.0)
+  t = np.where(solvable,t,0.5)
+  t = np.concatenate([np.tile(np.linspace(0.0,1.0,STEPS),(len(e),1)),t[:,None]],1)
+  t[fixed] = 0.0
+  v = pk[:,None,:] + t[:,:,None] * d[:,None,:]
+  cost = Cost(Q,v)
+  best = np.argmin(cost,1)
+  rows = np.arange(len(e))
+  t, cost, v = t[rows,best], cost[rows,best], v[rows,best]
+  while ok.any():
+    # cheapest edge at every face around both endpoints: taken edges change
+    # disjoint sets of faces
+    order = np.nonzero(ok)[0]
+    order = order[np.argsort(cost[order],kind="stable")]
+    rank = np.full(len(e),big)
+    rank[order] = np.arange(len(order))
+    vr = np.full(nv,big)
+    np.minimum.at(vr,a[order],rank[order])
+    np.minimum.at(vr,b[order],rank[order])
+    fr = vr[tri].min(1)
+    vm = np.full(nv,big)
+    for k in range(3):
+      np.minimum.at(vm,tri[:,k],fr)
+    take = order[(vm[a[order]] == rank[order]) & (vm[b[order]] == rank[order])]
+    take = take[:max(1,int(np.ceil(len(take)*SHARE)))]
+    take = take[:np.searchsorted(np.cumsum(faces[take]),excess)+1]
+    valid = Valid(p,tri,e,faces,take,keep,drop,v)
+    blocked = np.concatenate([blocked,key[take[~valid]]])
+    if valid.any():
+      take = take[valid]
+      break
+    ok[take] = False
+  else:
+    return None
+  ka, kb = keep[take], drop[take]
+  tt = t[take][:,None]
+  n[ka] = Unit(n[ka]*(1.0-tt) + n[kb]*tt)[0]
+  p[ka] = v[take]
+  q[ka] += q[kb]
+  qf[ka] += qf[kb]
+  remap = np.arange(nv)
+  remap[kb] = ka
+  tri = remap[tri]
+  tri = tri[(tri[:,0] != tri[:,1]) & (tri[:,1] != tri[:,2]) & (tri[:,2] != tri[:,0])]
+  # rejections around the collapses are tried again
+  touched = np.zeros(nv,dtype=bool)
+  touched[ka] = True
+  touched[tri[touched[tri].any(1)].reshape(-1)] = True
+  blocked = blocked[~(touched[blocked//nv] | touched[blocked%nv])]
+  return tri, blocked
+
+# collapses (indices of edges) keeping the surface a manifold (the endpoints
+# share only the vertices opposite the edge) without flipping faces
+def Valid (p, tri, e, faces, take, keep, drop, v):
+  nv = len(p)
+  m = len(take)
+  cid = np.full(nv,-1)
+  cid[keep[take]] = np.arange(m)
+  cid[drop[take]] = np.arange(m)
+  # neighbours of both endpoints
+  u = np.concatenate([e[:,0],e[:,1]])
+  w = np.concatenate([e[:,1],e[:,0]])
+  near = cid[u] >= 0
+  key, count = np.unique(cid[u[near]]*nv + w[near],return_counts=True)
+  common = np.bincount(key[count == 2]//nv,minlength=m)
+  valid = common == faces[take]
+  # faces around the collapses, before and after
+  fc = cid[tri].max(1)
+  around = np.nonzero(fc >= 0)[0]
+  c = fc[around]
+  t = tri[around]
+  moved = (t == keep[take][c][:,None]) | (t == drop[take][c][:,None])
+  kept = moved.sum(1) == 1   # the others disappear
+  t, c, moved = t[kept], c[kept], moved[kept]
+  before, _ = Unit(FaceNormals(p,t))
+  q = p[t]
+  q[moved] = v[take][c][:,None,:].repeat(3,1)[moved]
+  after, length = Unit(np.cross(q[:,1]-q[:,0],q[:,2]-q[:,0]))
+  flipped = (np.einsum("ij,ij->i",before,after) < MINCOS) | (length < 1e-20)
+  bad = np.zeros(m,dtype=bool)
+  np.logical_or.at(bad,c,flipped)
+  return valid & ~bad
@@ -62,6 +62,8 @@ class SkyBox (Shape):
 
   def Draw (self, st):
   # draw at camera position
+    if st.prepass == "depth":   # writes no depth
+      return
     camera = st.GetCamera()
     origin = glm.vec4(0,0,0,1)
     peye = glm.vec3(glm.inverse(camera.GetViewMatrix()) * origin)
@@ -69,8 +71,11 @@ class SkyBox (Shape):
     st.PushMatrix()
     st.LoadMatrix(M)
     st.LoadMatrices()    # update loaded matrices
+    if st.prepass:   # at the far plane: only where nothing else was drawn
+      glDepthRange(1,1)
     glDepthMask(GL_FALSE)
     glBindVertexArray(self.vao)
     glDrawArrays(GL_TRIANGLES,0,36)
     glDepthMask(GL_TRUE)
+    glDepthRange(0,1)
     st.PopMatrix()
@@ -1,5 +1,5 @@
 from OpenGL.GL import *
-from shape import Shape
+from shape import Shape, Sagitta, Halvings
 from grid import Grid
 import numpy as np
 import math
@@ -22,7 +22,12 @@ class Sphere(Shape):
       tangent[nc+1] = 0
       tangent[nc+2] = -math.sin(theta)
       nc += 3
-    
+    self.SetBounds(coord)
+    # coarser levels: half the stacks and slices each (longitude steps span
+    # 2pi/nstack, latitude ones pi/nslice)
+    steps = min(len(Halvings(nstack)),len(Halvings(nslice)))
+    self.SetLevels([(max(Sagitta(nstack>>k),Sagitta(2*(nslice>>k))),(nstack>>k,nslice>>k)) for k in range(steps)])
+
     # create VAO
     self.vao = glGenVertexArrays(1)
     glBindVertexArray(self.vao)
@@ -1,14 +1,63 @@
 import glm
+import numpy as np
 from OpenGL.GL import *
+import uniformbuffer
 
+# Render traversal state. A scene keeps one State and resets it each frame:
+# matrix stack slots, the per-node matrices and their uniform pointers are
+# preallocated and updated in place, and camera matrices are computed once
+# per frame, so steady-state frames allocate (almost) nothing.
 class State:
   def __init__ (self, camera):
+    self.stack = [glm.mat4(1.0)]   # matrix slots; stack[depth] is the current one
+    self.rows = [-1]               # TransformArray row standing for each slot (-1: none)
+    self.mvp = glm.mat4(1.0)
+    self.mv = glm.mat4(1.0)
+    self.mn = glm.mat4(1.0)
+    self.ptrs = (glm.value_ptr(self.mvp),glm.value_ptr(self.mv),glm.value_ptr(self.mn))
+    self.instruments = []   # see Scene.AddInstrument
+    self.transforms = None
+    self.frame = None       # frame block buffer, created on first use (see LoadFrame)
+    self.framedata = np.zeros(uniformbuffer.FRAME_SIZE//4,dtype=np.float32)
+    self.fog = glm.vec4(0.0)   # fog color and density in the frame block (see Fog)
+    self.Reset(camera)
+
+  # start a new frame; interpolated frames (alpha < 1) blend poses per
+  # transform, so they do not use the TransformArray (see Scene.Render)
+  def Reset (self, camera, alpha=1.0, transforms=None):
     self.camera = camera
     self.shader = []
-    self.stack = [glm.mat4(1.0)]
+    self.features = [{}]
+    self.depth = 0
+    self.stack[0].__init__(1.0)    # in place (keeps the slot)
+    self.rows[0] = -1
+    self.alpha = alpha   # interpolation between the last two simulation steps
+    self.proj = camera.GetProjMatrix()
+    self.view = camera.GetViewMatrix()
+    self.vp = self.proj * self.view
+    self.viewinv = None
+    self.eye = None
+    self.transforms = transforms if alpha >= 1.0 else None
+    self.layer = None    # "static" or "dynamic": part of the scene rendered (see StaticLayer)
+    self.prepass = None  # "depth" or "shading": pass of a depth pre-pass render (see Scene.SetDepthPrepass)
+    self.override = None # program replacing every shader (depth pass, G-buffer)
+    self.sort = False    # children drawn front to back
+    self.blend = None    # "opaque" or "transparent": nodes rendered (see TransparencyLayer)
+    self.path = None     # "deferred" or "forward": nodes rendered (see DeferredRenderer)
+    self.planes = None   # world space planes culling the shapes (see ShadowMap)
+    self.lod = None      # shading level of detail of the subtree (see ShadingLOD)
+    self.range = None    # distance from the camera beyond which shapes are culled (see Fog)
+    self.lightcamera = False   # rendered from a light (see Scene.RenderDepth)
+    self.detail = None   # geometric level of detail of the subtree (see GeometricLOD)
+    self.pixelscale = None
     glUseProgram(0) # compatibility profile as default
 
   def PushShader (self, shd):
+    if self.override:
+      shd = self.override
+    elif self.features[-1]:
+      shd = shd.GetVariant(self.features[-1])
+    shd = shd.GetActive()
     self.shader.append(shd)
     shd.UseProgram()
 
@@ -19,6 +68,21 @@ class State:
     else:
       self.shader[-1].UseProgram()
   
+  # request shader features for the subtree: the current shader is reloaded
+  # as the variant compiled with the merged set of defines
+  def PushFeatures (self, features):
+    merged = dict(self.features[-1])
+    merged.update(features)
+    self.features.append(merged)
+    self.GetShader().Load(self)
+
+  def PopFeatures (self):
+    self.PopShader()
+    self.features.pop()
+
+  def GetFeatures (self):
+    return self.features[-1]
+
   def GetShader (self):
     if not self.shader:
       error("Shader not defined")
@@ -27,31 +91,158 @@ class State:
   def GetCamera (self):
     return self.camera
 
+  # camera matrices of this frame
+  def GetProjMatrix (self):
+    return self.proj
+
+  def GetViewMatrix (self):
+    return self.view
+
+  def GetViewProjMatrix (self):
+    return self.vp
+
+  def GetViewInverse (self):
+    if self.viewinv is None:
+      self.viewinv = glm.inverse(self.view)
+    return self.viewinv
+
+  # pixels per world unit at unit view depth (or at any depth, for
+  # orthographic projections), with the viewport of the frame
+  def GetPixelScale (self):
+    if self.pixelscale is None:
+      vp = glGetIntegerv(GL_VIEWPORT)
+      self.pixelscale = 0.5 * self.proj[1][1] * float(vp[3])
+    return self.pixelscale
+
+  def IsOrtho (self):
+    return self.proj[3][3] == 1.0
+
+  # camera position in world space
+  def GetCameraPosition (self):
+    if self.eye is None:
+      self.eye = glm.vec4(self.GetViewInverse()[3])
+    return self.eye
+
+  # upload the camera of this frame to the frame block and bind it
+  # (see shaders/blocks.glsl); returns the previously bound frame block
+  def LoadFrame (self):
+    if self.frame is None:
+      self.frame = uniformbuffer.UniformBuffer(uniformbuffer.FRAME_SIZE)
+    uniformbuffer.Pack(self.framedata,(self.view,self.proj,self.GetCameraPosition(),self.fog))
+    self.frame.SetData(self.framedata)
+    return uniformbuffer.BindFrame(self.frame)
+
+  # fog of the frame block (see Fog): uploaded again only when it changes
+  def SetFog (self, fog):
+    if fog != self.fog:
+      self.fog = glm.vec4(fog)
+      if self.frame is not None:   # else packed by the next LoadFrame
+        uniformbuffer.Pack(self.framedata,(self.view,self.proj,self.GetCameraPosition(),self.fog))
+        self.frame.SetData(self.framedata)
+
+  # the current matrix is updated in place: copy it to keep it
   def PushMatrix (self):
-    self.stack.append(self.GetCurrentMatrix())
+    current = self.GetCurrentMatrix()
+    self.Push()
+    self.stack[self.depth].__init__(current)
+
+  # push the world matrix of a TransformArray row (read only when needed)
+  def PushRow (self, row):
+    self.Push()
+    self.rows[self.depth] = row
+
+  def Push (self):
+    self.depth += 1
+    if self.depth == len(self.stack):
+      self.stack.append(glm.mat4(1.0))
+      self.rows.append(-1)
+    self.rows[self.depth] = -1
 
   def PopMatrix (self):
-    self.stack.pop()
+    self.depth -= 1
 
   def LoadMatrix (self, mat):
-    self.stack[-1] = mat
+    self.stack[self.depth].__init__(mat)
+    self.rows[self.depth] = -1
 
   def MultMatrix (self, mat):
-    self.stack[-1] = self.stack[-1] * mat
+    current = self.GetCurrentMatrix()
+    current *= mat
 
   def GetCurrentMatrix (self):
-    return self.stack[-1]
+    row = self.rows[self.depth]
+    if row >= 0:   # copy the row to the slot
+      self.stack[self.depth].__init__(self.transforms.GetWorld(row))
+      self.rows[self.depth] = -1
+    return self.stack[self.depth]
+
+  # children ordered by the view depth of their origin, nearest first, so
+  # that early depth testing discards the hidden fragments of the farther ones
+  def SortFrontToBack (self, nodes):
+    if len(nodes) < 2:
+      return nodes
+    mv = self.view * self.GetCurrentMatrix()
+    def distance (node):
+      if node.trf:
+        return -(mv * node.trf.GetMatrix()[3]).z
+      return -mv[3].z
+    return sorted(nodes,key=distance)
+
+  # the bounding sphere of a shape under the current matrix is not entirely
+  # outside any of the culling planes (a, b, c, d: inside where positive)
+  # nor beyond the culling range
+  def IsVisible (self, shp):
+    bounds = shp.GetBounds()
+    if bounds is None:
+      return True
+    model = self.GetCurrentMatrix()
+    center = model * bounds[0]
+    radius = bounds[1] * max(glm.length(glm.vec3(model[0])),glm.length(glm.vec3(model[1])),
+                             glm.length(glm.vec3(model[2])))
+    if self.range is not None:
+      if glm.distance(glm.vec3(center),glm.vec3(self.GetCameraPosition())) - radius > self.range:
+        return False
+    if self.planes is not None:
+      for plane in self.planes:
+        if glm.dot(plane,center) < -radius:
+          return False
+    return True
+
+  # what a recorded subtree depends on outside itself (see Node.SetFrozen);
+  # the last item tells the pass of the frame
+  def GetContextKey (self):
+    shd = self.shader[-1] if self.shader else None
+    return (self.proj,self.view,glm.mat4(self.GetCurrentMatrix()),shd,
+            (self.layer,self.blend,self.path,self.prepass))
 
   def LoadMatrices (self):
-    # set matrices
     shd = self.GetShader()
-    mvp = self.camera.GetProjMatrix() * self.camera.GetViewMatrix() * self.GetCurrentMatrix()
-    mv = self.GetCurrentMatrix()      # to global space
+    row = self.rows[self.depth]
+    if row >= 0:
+      # computed for every row by the TransformArray
+      mvp, mv, mn = self.transforms.GetPointers(shd.GetLightingSpace(),row)
+      shd.SetUniformMatrix("Mvp",mvp)
+      if self.prepass == "depth":   # position only
+        return
+      shd.SetUniformMatrix("Mv",mv)
+      shd.SetUniformMatrix("Mn",mn)
+      self.camera.Load(self)
+      return
+    # set matrices (computed in place)
+    model = self.stack[self.depth]
+    self.mvp.__init__(self.vp)
+    self.mvp *= model
+    if self.prepass == "depth":   # position only
+      shd.SetUniformMatrix("Mvp",self.ptrs[0])
+      return
     if shd.GetLightingSpace() == "camera":
-      mv = self.camera.GetViewMatrix() * mv  # to camera space
-    mn = glm.transpose(glm.inverse(mv))
-    shd.SetUniform("Mvp",mvp)
-    shd.SetUniform("Mv",mv)
-    shd.SetUniform("Mn",mn)
+      self.mv.__init__(self.view)    # to camera space
+      self.mv *= model
+    else:
+      self.mv.__init__(model)        # to global space
+    self.mn.__init__(glm.inverseTranspose(self.mv))
+    shd.SetUniformMatrix("Mvp",self.ptrs[0])
+    shd.SetUniformMatrix("Mv",self.ptrs[1])
+    shd.SetUniformMatrix("Mn",self.ptrs[2])
     # load camera
     self.camera.Load(self)
\ No newline at end of file
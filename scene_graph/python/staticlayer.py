@@ -0,0 +1,121 @@
+import os
+import glm
+from OpenGL.GL import *
+
+from shader import Shader
+from framebuffer import Framebuffer
+from texcolor import TexColor
+from texdepth import TexDepth
+from material import Material
+import changes
+
+SHADERS = os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders/composite")
+
+# Static-layer caching: nodes marked with SetDynamic(True) (and their
+# subtrees) are the moving part of the scene; everything else is rendered
+# into a cached color and depth framebuffer, again only when the camera, the
+# viewport, the poses or materials of static nodes or the lights of their
+# shaders (e.g. one referenced to a moving node) change, or after Invalidate
+# (call it after other edits of static nodes, such as their textures). The
+# static nodes are only walked again when the static version moves (see
+# changes.Touch); moving dynamic nodes leave it alone. Each frame copies the
+# cache to the current framebuffer, depth included, and draws only the
+# dynamic nodes on top of it:
+#   layer = StaticLayer(scene)
+#   layer.Render(camera)          # instead of scene.Render(camera)
+class StaticLayer:
+  def __init__ (self, scene):
+    self.scene = scene
+    self.fb = None
+    self.width = 0
+    self.height = 0
+    self.key = None     # camera and static content the cache was rendered with
+    self.content = None # static poses, materials and lights (see GetContent)
+    self.lights = []    # lights of the static shaders
+    self.version = None # static version of the content
+    self.shader = Shader()
+    self.shader.AttachVertexShader(os.path.join(SHADERS,"vertex.glsl"))
+    self.shader.AttachFragmentShader(os.path.join(SHADERS,"fragment.glsl"))
+    self.shader.Link()
+    self.vao = glGenVertexArrays(1)   # attributeless draw
+
+  def Invalidate (self):
+    self.key = None
+    self.version = None
+
+  # world matrices of the static nodes with shapes, their materials and the
+  # lights of their shaders
+  def Collect (self, node, mat, poses, materials, lights):
+    if node.IsDynamic():
+      return
+    if node.trf:
+      mat = mat * node.trf.GetMatrix()
+    if node.shps:
+      poses.append(mat)
+    light = node.shader.GetLight() if node.shader else None
+    if light and light not in lights:
+      lights.append(light)
+    for app in node.apps:
+      if isinstance(app,Material):
+        materials.append((glm.vec4(app.amb),glm.vec4(app.dif),glm.vec4(app.spe),app.shi,app.opacity))
+    for child in node.nodes:
+      self.Collect(child,mat,poses,materials,lights)
+
+  def GetContent (self):
+    poses, materials, lights = [], [], []
+    self.Collect(self.scene.GetRoot(),glm.mat4(1.0),poses,materials,lights)
+    self.lights = lights
+    colors = [(glm.vec4(light.amb),glm.vec4(light.dif),glm.vec4(light.spe)) for light in lights]
+    return (poses,materials,colors)
+
+  def Resize (self, width, height):
+    self.width = width
+    self.height = height
+    if self.fb:
+      self.fb.Delete()
+    self.fb = Framebuffer(TexDepth("depth",width,height),[TexColor("color",width,height)])
+    self.Invalidate()
+
+  def Render (self, camera, alpha=1.0):
+    vp = glGetIntegerv(GL_VIEWPORT)
+    if vp[2] != self.width or vp[3] != self.height:
+      self.Resize(int(vp[2]),int(vp[3]))
+    version = changes.GetStaticVersion()
+    if version != self.version:
+      self.content = self.GetContent()
+      self.version = version
+    # light positions may follow dynamic nodes: checked every frame
+    lights = [glm.vec4(light.GetWorldPosition(camera)) for light in self.lights]
+    key = (camera.GetProjMatrix(),camera.GetViewMatrix(),self.content,lights)
+    if key != self.key:
+      self.fb.Bind()
+      glViewport(0,0,self.width,self.height)
+      glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+      self.scene.Render(camera,alpha,"static")
+      self.fb.Unbind()
+      glViewport(int(vp[0]),int(vp[1]),self.width,self.height)
+      self.key = key
+    self.Composite()
+    return self.scene.Render(camera,alpha,"dynamic")
+
+  # copy the cached color and depth to the current framebuffer
+  def Composite (self):
+    func = glGetIntegerv(GL_DEPTH_FUNC)
+    test = glIsEnabled(GL_DEPTH_TEST)
+    glEnable(GL_DEPTH_TEST)   # depth is only written with the test enabled
+    glDepthFunc(GL_ALWAYS)
+    self.shader.UseProgram()
+    self.shader.SetUniform("color",0)
+    self.shader.SetUniform("depth",1)
+    glActiveTexture(GL_TEXTURE0)
+    glBindTexture(GL_TEXTURE_2D,self.fb.GetColorTextures()[0].GetTexId())
+    glActiveTexture(GL_TEXTURE1)
+    glBindTexture(GL_TEXTURE_2D,self.fb.GetDepthTexture().GetTexId())
+    glBindVertexArray(self.vao)
+    glDrawArrays(GL_TRIANGLES,0,3)
+    glBindTexture(GL_TEXTURE_2D,0)
+    glActiveTexture(GL_TEXTURE0)
+    glDepthFunc(func)
+    if not test:
+      glDisable(GL_DEPTH_TEST)
+    glUseProgram(0)
@@ -0,0 +1,42 @@
+from OpenGL.GL import *
+from appearance import *
+
+# color render target (e.g. to be attached to a Framebuffer)
+class TexColor (Appearance):
+  def __init__ (self, varname, width, height, internal=GL_RGBA8, format=GL_RGBA, type=GL_UNSIGNED_BYTE):
+    self.varname = varname
+    self.width = width
+    self.height = height
+    self.internal = internal
+    self.tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D,self.tex)
+    glTexImage2D(GL_TEXTURE_2D,0,internal,self.width,self.height,0,format,type,None)
+    glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_WRAP_S,GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_WRAP_T,GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_MIN_FILTER,GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D,GL_TEXTURE_MAG_FILTER,GL_LINEAR)
+    glBindTexture(GL_TEXTURE_2D,0)
+
+  def GetTexId (self):
+    return self.tex
+
+  # free the texture (once: it may be attached to several framebuffers)
+  def Delete (self):
+    if self.tex:
+      glDeleteTextures([self.tex])
+      self.tex = 0
+
+  def GetWidth (self):
+    return self.width
+
+  def GetHeight (self):
+    return self.height
+
+  def Load (self, st):
+    shd = st.GetShader()
+    shd.ActiveTexture(self.varname)
+    glBindTexture(GL_TEXTURE_2D,self.tex)
+
+  def Unload (self, st):
+    shd = st.GetShader()
+    shd.DeactiveTexture()
@@ -18,6 +18,12 @@ class TexDepth (Appearance):
   def GetTexId (self):
     return self.tex
 
+  # free the texture (once: it may be attached to several framebuffers)
+  def Delete (self):
+    if self.tex:
+      glDeleteTextures([self.tex])
+      self.tex = 0
+
   def SetCompareMode (self):
     glBindTexture(GL_TEXTURE_2D,self.tex)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_COMPARE_FUNC, GL_LEQUAL)
@@ -0,0 +1,37 @@
+from OpenGL.GL import *
+from appearance import *
+
+# depth cube map, e.g. the omnidirectional shadow map of a point light
+# (see ShadowMap); faces are attached one at a time (see Framebuffer)
+class TexDepthCube (Appearance):
+  def __init__ (self, varname, size):
+    self.varname = varname
+    self.size = size
+    self.tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_CUBE_MAP,self.tex)
+    for face in range(6):
+      glTexImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X+face,0,GL_DEPTH_COMPONENT,size,size,0,GL_DEPTH_COMPONENT,GL_FLOAT,None)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_WRAP_S,GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_WRAP_T,GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_WRAP_R,GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_MIN_FILTER,GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_MAG_FILTER,GL_LINEAR)
+    glBindTexture(GL_TEXTURE_CUBE_MAP,0)
+
+  def GetTexId (self):
+    return self.tex
+
+  def SetCompareMode (self):
+    glBindTexture(GL_TEXTURE_CUBE_MAP,self.tex)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_COMPARE_FUNC,GL_LEQUAL)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP,GL_TEXTURE_COMPARE_MODE,GL_COMPARE_REF_TO_TEXTURE)
+    glBindTexture(GL_TEXTURE_CUBE_MAP,0)
+
+  def Load (self, st):
+    shd = st.GetShader()
+    shd.ActiveTexture(self.varname)
+    glBindTexture(GL_TEXTURE_CUBE_MAP,self.tex)
+
+  def Unload (self, st):
+    shd = st.GetShader()
+    shd.DeactiveTexture()
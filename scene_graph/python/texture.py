@@ -27,6 +27,13 @@ class Texture(Appearance):
         raise RuntimeError("Unsupported image component type: " + data.dtype)
       glTexImage2D(GL_TEXTURE_2D,0,mode,width,height,0,mode,dtype,data)
       glGenerateMipmap(GL_TEXTURE_2D)
+    elif isinstance(texel,np.ndarray):   # image rows (height x width x 3|4, uint8), bottom up
+      height, width = texel.shape[:2]
+      mode = GL_RGBA if texel.shape[2] == 4 else GL_RGB
+      glPixelStorei(GL_UNPACK_ALIGNMENT,1)
+      glTexImage2D(GL_TEXTURE_2D,0,mode,width,height,0,mode,GL_UNSIGNED_BYTE,np.ascontiguousarray(texel))
+      glPixelStorei(GL_UNPACK_ALIGNMENT,4)
+      glGenerateMipmap(GL_TEXTURE_2D)
     elif texel == None:
       glTexImage2D(GL_TEXTURE_2D,0,GL_RGB,width,height,0,GL_RGB,GL_UNSIGNED_BYTE,None)
     elif type(texel) == glm.vec3:
@@ -1,30 +1,82 @@
 import glm
+import changes
 
 class Transform:
   def __init__ (self):
     self.mat = glm.mat4(1.0)
+    self.prev = None   # pose saved at the start of the last simulation step
+    self.array = None  # TransformArray holding the matrix (see Attach)
+    self.index = 0     # row in the array
+    self.dynamic = False   # moves dynamic nodes only (set by Node, see StaticLayer)
 
   def LoadIdentity (self):
-    self.mat = glm.mat4(1.0)
+    self.SetMatrix(glm.mat4(1.0))
   
   def MultMatrix (self, mat):
-    self.mat *= mat
+    if self.array:
+      self.SetMatrix(self.GetMatrix()*mat)
+    else:
+      self.mat *= mat
+      changes.Touch(static=not self.dynamic)
   
   def Translate (self, x, y, z):
-    self.mat = glm.translate(self.mat,glm.vec3(x,y,z))
+    self.SetMatrix(glm.translate(self.GetMatrix(),glm.vec3(x,y,z)))
   
   def Scale (self, x, y, z):
-    self.mat = glm.scale(self.mat,glm.vec3(x,y,z))
+    self.SetMatrix(glm.scale(self.GetMatrix(),glm.vec3(x,y,z)))
   
   def Rotate (self, angle, x, y, z):
-    self.mat = glm.rotate(self.mat,glm.radians(angle),glm.vec3(x,y,z))
+    self.SetMatrix(glm.rotate(self.GetMatrix(),glm.radians(angle),glm.vec3(x,y,z)))
   
   def GetMatrix (self):
+    if self.array:
+      return self.array.GetLocal(self.index)
     return self.mat
-  
+
+  def SetMatrix (self, mat):
+    if self.array:
+      self.array.SetLocal(self.index,mat)
+    else:
+      self.mat = mat
+    changes.Touch(static=not self.dynamic)
+
+  # the matrix moves to row 'index' of a TransformArray (see TransformArray.Build)
+  def Attach (self, array, index):
+    self.array = array
+    self.index = index
+    self.mat = None
+
+  def Detach (self):
+    self.mat = self.GetMatrix()
+    self.array = None
+
+  def SavePose (self):
+    self.prev = glm.mat4(self.GetMatrix())
+
+  # pose between the saved one (alpha=0) and the current one (alpha=1)
+  def GetMatrixAt (self, alpha):
+    mat = self.GetMatrix()
+    if self.prev is None or alpha >= 1.0 or self.prev == mat:
+      return mat
+    return Interpolate(self.prev,mat,alpha)
+
   def Load (self, st):
-    st.PushMatrix()
-    st.MultMatrix(self.mat)
+    if self.array is not None and self.array is st.transforms:
+      st.PushRow(self.index)   # world matrix already computed
+    else:
+      st.PushMatrix()
+      st.MultMatrix(self.GetMatrixAt(st.alpha))
 
   def Unload (self, st):
     st.PopMatrix()
+
+# interpolate affine matrices: slerp on rotation, lerp on translation and scale
+def Interpolate (m0, m1, alpha):
+  s0, r0, t0, k0, p0 = glm.vec3(), glm.quat(), glm.vec3(), glm.vec3(), glm.vec4()
+  s1, r1, t1, k1, p1 = glm.vec3(), glm.quat(), glm.vec3(), glm.vec3(), glm.vec4()
+  if (not glm.decompose(m0,s0,r0,t0,k0,p0) or not glm.decompose(m1,s1,r1,t1,k1,p1) or
+      glm.length(k0) > 1e-5 or glm.length(k1) > 1e-5):
+    return m0*(1.0-alpha) + m1*alpha   # sheared: plain blend
+  m = glm.translate(glm.mat4(1.0),glm.mix(t0,t1,alpha))
+  m = m * glm.mat4_cast(glm.slerp(r0,r1,alpha))
+  return glm.scale(m,glm.mix(s0,s1,alpha))
@@ -0,0 +1,166 @@
+import collections
+import ctypes
+import glm
+import numpy as np
+
+# matrix in the layout stored in the arrays (and expected by GL): the rows of
+# a stored matrix are the columns of the glm one, so a product A*B is
+# stored as Stored(B) @ Stored(A)
+def Stored (mat):
+  return np.array(mat,dtype=np.float32).T
+
+def Inverse (mats):
+  try:
+    return np.linalg.inv(mats)
+  except np.linalg.LinAlgError:   # some singular (zero scale)
+    return np.linalg.pinv(mats)
+
+# Structure-of-arrays backing for the transforms of a scene (see
+# Scene.SetTransformArray). Build gives each Transform a row, sorted by depth
+# in the transform hierarchy, and moves its matrix there: the Transform keeps
+# its API but reads and writes its row. Local matrices, parent rows and dirty
+# bits are contiguous arrays; world and normal matrices of changed rows (and
+# of their descendants) are recomputed level by level with batched matmuls,
+# and Mvp/Mv/Mn of every row once per frame, so rendering a node just points
+# the uniforms at its rows. Row 0 is the (identity) root.
+#
+# Build again after changing the hierarchy: transforms added later render
+# through the matrix stack, but a moved one would keep its old parent.
+# Transforms shared by several nodes (and the subtrees below them) are not
+# attached, since they have no single world matrix.
+class TransformArray:
+  def __init__ (self, root=None):
+    self.transforms = []
+    self.Allocate(1)
+    if root:
+      self.Build(root)
+
+  def Allocate (self, n):
+    identity = np.identity(4,dtype=np.float32)
+    self.local = np.tile(identity,(n,1,1))
+    self.world = np.tile(identity,(n,1,1))
+    self.normal = np.tile(identity,(n,1,1))   # inverse transpose of world
+    self.mvp = np.tile(identity,(n,1,1))
+    self.mv = np.tile(identity,(n,1,1))       # camera space
+    self.mn = np.tile(identity,(n,1,1))       # camera space
+    self.parent = np.zeros(n,dtype=np.int64)
+    self.dirty = np.zeros(n,dtype=bool)
+    self.levels = []       # (start, end) rows of each depth
+    self.changed = False   # some row is dirty
+    self.vp = None         # Stored(proj*view) of the last Update
+    self.view = None
+    self.viewit = None     # Stored(inverse transpose of view)
+    self.current = False   # mv and mn are up to date
+    self.spaces = {"world": (self.mvp,self.world,self.normal),
+                   "camera": (self.mvp,self.mv,self.mn)}
+    self.bases = {space: tuple(array.ctypes.data for array in arrays)
+                  for space, arrays in self.spaces.items()}
+    # uniform pointers, moved to the row being rendered (see GetPointers)
+    self.pointers = tuple(ctypes.POINTER(ctypes.c_float)() for i in range(3))
+    self.addresses = tuple(ctypes.c_void_p.from_buffer(ptr) for ptr in self.pointers)
+
+  def Build (self, root):
+    for trf in self.transforms:
+      trf.Detach()
+    uses = collections.Counter()
+    nodes = [root]
+    while nodes:
+      node = nodes.pop()
+      if node.trf:
+        uses[id(node.trf)] += 1
+      nodes.extend(node.nodes)
+    # transforms by depth, with their parent transform
+    levels = []
+    nodes = [(root,None,0)]
+    while nodes:
+      node, parent, depth = nodes.pop()
+      if node.trf:
+        if uses[id(node.trf)] > 1:
+          continue   # shared: this subtree stays on the matrix stack
+        if depth == len(levels):
+          levels.append([])
+        levels[depth].append((node.trf,parent))
+        parent, depth = node.trf, depth+1
+      for child in reversed(node.nodes):
+        nodes.append((child,parent,depth))
+    self.Allocate(1 + sum(len(level) for level in levels))
+    self.transforms = []
+    row = 1
+    for level in levels:
+      start = row
+      for trf, parent in level:
+        self.local[row] = Stored(trf.GetMatrix())
+        self.parent[row] = parent.index if parent else 0
+        trf.Attach(self,row)
+        self.transforms.append(trf)
+        row += 1
+      self.levels.append((start,row))
+    self.dirty[1:] = True
+    self.changed = True
+
+  def GetCount (self):
+    return len(self.transforms)
+
+  def GetLocal (self, row):
+    return glm.mat4(self.local[row].T)
+
+  def SetLocal (self, row, mat):
+    self.local[row] = Stored(mat)
+    self.dirty[row] = True
+    self.changed = True
+
+  def GetWorld (self, row):
+    self.UpdateWorld()
+    return glm.mat4(self.world[row].T)
+
+  # world and normal matrices of dirty rows and their descendants
+  def UpdateWorld (self):
+    if not self.changed:
+      return
+    dirty = self.dirty
+    for start, end in self.levels:
+      parents = self.parent[start:end]
+      rows = dirty[start:end]
+      rows |= dirty[parents]
+      if rows.all():
+        np.matmul(self.local[start:end],self.world[parents],out=self.world[start:end])
+        self.normal[start:end] = Inverse(self.world[start:end]).transpose(0,2,1)
+      elif rows.any():
+        rows = start + np.flatnonzero(rows)
+        self.world[rows] = np.matmul(self.local[rows],self.world[self.parent[rows]])
+        self.normal[rows] = Inverse(self.world[rows]).transpose(0,2,1)
+    dirty[:] = False
+    self.changed = False
+    self.vp = None
+
+  # per frame: Mvp of every row (camera space Mv and Mn on demand)
+  def Update (self, vp, view):
+    self.UpdateWorld()
+    vp = Stored(vp)
+    if self.vp is None or not np.array_equal(vp,self.vp):
+      np.matmul(self.world,vp,out=self.mvp)
+      self.vp = vp
+      self.view = Stored(view)
+      self.viewit = Stored(glm.inverseTranspose(view))
+      self.current = False
+
+  # (mvp, mv, mn) arrays for shaders lighting in the given space
+  def GetArrays (self, space):
+    if space == "camera" and not self.current:
+      np.matmul(self.world,self.view,out=self.mv)
+      np.matmul(self.normal,self.viewit,out=self.mn)
+      self.current = True
+    return self.spaces[space]
+
+  # (mvp, mv, mn) pointers to a row, valid until the next call (a pointer
+  # to a numpy row costs more to pass than the GL call itself)
+  def GetPointers (self, space, row):
+    if space == "camera" and not self.current:
+      self.GetArrays(space)
+    offset = row * 64
+    bases = self.bases[space]
+    addresses = self.addresses
+    addresses[0].value = bases[0] + offset
+    addresses[1].value = bases[1] + offset
+    addresses[2].value = bases[2] + offset
+    return self.pointers
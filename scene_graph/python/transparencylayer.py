@@ -0,0 +1,91 @@
+import os
+import numpy as np
+from OpenGL.GL import *
+
+from shader import Shader
+from framebuffer import Framebuffer
+from texcolor import TexColor
+from texdepth import TexDepth
+
+SHADERS = os.path.join(os.path.dirname(os.path.abspath(__file__)),"../shaders")
+ZERO = np.zeros(4,dtype=np.float32)
+ONE = np.ones(4,dtype=np.float32)
+
+# Weighted blended order-independent transparency: nodes with a translucent
+# appearance (Material opacity < 1) and their subtrees are drawn after the
+# opaque ones, in any order, into an accumulation target (additive) and a
+# revealage target (multiplicative) that share the opaque depth buffer; a
+# full-screen pass then blends their weighted average over the opaque image.
+# No sorting, so the cost is linear in the number of transparent objects.
+# Shaders take part through their USE_OIT variant (see shaders/oit.glsl):
+#   layer = TransparencyLayer(scene)
+#   layer.Render(camera)          # instead of scene.Render(camera)
+class TransparencyLayer:
+  def __init__ (self, scene):
+    self.scene = scene
+    self.opaque = None    # opaque color and depth
+    self.oit = None       # accumulation and revealage, same depth
+    self.width = 0
+    self.height = 0
+    self.shader = Shader()
+    self.shader.AttachVertexShader(os.path.join(SHADERS,"composite/vertex.glsl"))
+    self.shader.AttachFragmentShader(os.path.join(SHADERS,"transparency/fragment.glsl"))
+    self.shader.Link()
+    self.vao = glGenVertexArrays(1)   # attributeless draw
+
+  def Resize (self, width, height):
+    self.width = width
+    self.height = height
+    if self.opaque:
+      self.opaque.Delete()   # and the shared depth texture
+      self.oit.Delete()
+    depth = TexDepth("depth",width,height)
+    self.opaque = Framebuffer(depth,[TexColor("color",width,height)])
+    self.oit = Framebuffer(depth,[TexColor("accum",width,height,GL_RGBA16F,GL_RGBA,GL_FLOAT),
+                                  TexColor("reveal",width,height,GL_R8,GL_RED,GL_UNSIGNED_BYTE)])
+
+  def Render (self, camera, alpha=1.0):
+    vp = glGetIntegerv(GL_VIEWPORT)
+    if vp[2] != self.width or vp[3] != self.height:
+      self.Resize(int(vp[2]),int(vp[3]))
+    self.opaque.Bind()
+    glViewport(0,0,self.width,self.height)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    report = self.scene.Render(camera,alpha,None,"opaque")
+    self.oit.Bind()
+    glClearBufferfv(GL_COLOR,0,ZERO)
+    glClearBufferfv(GL_COLOR,1,ONE)
+    glDepthMask(GL_FALSE)
+    glEnable(GL_BLEND)
+    glBlendFunci(0,GL_ONE,GL_ONE)
+    glBlendFunci(1,GL_ZERO,GL_ONE_MINUS_SRC_COLOR)
+    self.scene.Render(camera,alpha,None,"transparent")
+    glDisable(GL_BLEND)
+    glBlendFunc(GL_ONE,GL_ZERO)
+    glDepthMask(GL_TRUE)
+    self.oit.Unbind()
+    glViewport(int(vp[0]),int(vp[1]),self.width,self.height)
+    self.Composite()
+    return report
+
+  # resolve the transparent pass over the opaque image, depth included
+  def Composite (self):
+    func = glGetIntegerv(GL_DEPTH_FUNC)
+    test = glIsEnabled(GL_DEPTH_TEST)
+    glEnable(GL_DEPTH_TEST)   # depth is only written with the test enabled
+    glDepthFunc(GL_ALWAYS)
+    self.shader.UseProgram()
+    textures = [self.opaque.GetColorTextures()[0],self.opaque.GetDepthTexture()] + self.oit.GetColorTextures()
+    for unit, tex in enumerate(textures):
+      self.shader.SetUniform(tex.varname,unit)
+      glActiveTexture(GL_TEXTURE0+unit)
+      glBindTexture(GL_TEXTURE_2D,tex.GetTexId())
+    glBindVertexArray(self.vao)
+    glDrawArrays(GL_TRIANGLES,0,3)
+    for unit in reversed(range(len(textures))):
+      glActiveTexture(GL_TEXTURE0+unit)
+      glBindTexture(GL_TEXTURE_2D,0)
+    glDepthFunc(func)
+    if not test:
+      glDisable(GL_DEPTH_TEST)
+    glUseProgram(0)
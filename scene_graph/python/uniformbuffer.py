@@ -0,0 +1,88 @@
+from OpenGL.GL import *
+
+# binding points of the blocks declared in shaders/blocks.glsl (see Shader.BindBlocks)
+FRAME = 0
+LIGHT = 1
+MATERIAL = 2
+BLOCKS = {"FrameBlock": FRAME, "LightBlock": LIGHT, "MaterialBlock": MATERIAL}
+
+# std140 record sizes (bytes)
+FRAME_SIZE = 160      # view, projection, camera position, fog
+LIGHT_SIZE = 64       # ambient, diffuse, specular, position
+MATERIAL_SIZE = 64    # ambient, diffuse, specular, shininess and opacity
+
+frame = None   # buffer bound to the frame block (see BindFrame)
+
+# Fixed-size std140 records in one buffer object, each starting at a
+# multiple of GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT so that any of them can be
+# bound to a block with glBindBufferRange.
+class UniformBuffer:
+  def __init__ (self, size, count=1):
+    align = int(glGetIntegerv(GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT))
+    self.size = size
+    self.stride = (size + align - 1) // align * align
+    self.count = count
+    self.ubo = glGenBuffers(1)
+    glBindBuffer(GL_UNIFORM_BUFFER,self.ubo)
+    glBufferData(GL_UNIFORM_BUFFER,self.stride*count,None,GL_DYNAMIC_DRAW)
+    glBindBuffer(GL_UNIFORM_BUFFER,0)
+
+  def GetId (self):
+    return self.ubo
+
+  def GetCount (self):
+    return self.count
+
+  # data: float32 array of the record (std140 layout)
+  def SetData (self, data, index=0):
+    glBindBuffer(GL_UNIFORM_BUFFER,self.ubo)
+    glBufferSubData(GL_UNIFORM_BUFFER,index*self.stride,data.nbytes,data)
+    glBindBuffer(GL_UNIFORM_BUFFER,0)
+
+  def Bind (self, binding, index=0):
+    glBindBufferRange(GL_UNIFORM_BUFFER,binding,self.ubo,index*self.stride,self.size)
+
+# Records handed out from pages of UniformBuffers; a record never moves, so
+# recorded binds (see Node.SetFrozen) stay valid as the pool grows.
+class UniformPool:
+  def __init__ (self, size, page=256):
+    self.size = size
+    self.page = page
+    self.buffers = []
+    self.used = page   # records taken from the last buffer
+
+  # returns (buffer, index) of a new record
+  def Allocate (self):
+    if self.used == self.page:
+      self.buffers.append(UniformBuffer(self.size,self.page))
+      self.used = 0
+    self.used += 1
+    return self.buffers[-1], self.used - 1
+
+# bind the frame block buffer shared by all programs; returns the previous
+# one (restored after a render nested in another, see Scene.Render)
+def BindFrame (buffer):
+  global frame
+  previous = frame
+  frame = buffer
+  if buffer:
+    buffer.Bind(FRAME)
+  return previous
+
+# std140 image of vec4/mat4 values (matrices column by column) and floats
+def Pack (out, values):
+  offset = 0
+  for value in values:
+    if isinstance(value,float):
+      out[offset] = value
+      offset += 1
+    else:
+      n = len(value)
+      if n == 4 and hasattr(value[0],"__len__"):   # mat4: columns
+        for column in value:
+          out[offset:offset+4] = column
+          offset += 4
+      else:
+        out[offset:offset+n] = value
+        offset += 4
+  return out
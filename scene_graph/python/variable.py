@@ -1,5 +1,6 @@
 import glm
 from appearance import Appearance
+import changes
 
 class Variable(Appearance):
   def __init__ (self, name, value):
@@ -8,6 +9,7 @@ class Variable(Appearance):
 
   def SetValue (self, value):
     self.value = value
+    changes.Touch()
 
   def GetValue (self):
     return self.value
@@ -0,0 +1,40 @@
+// Uniform blocks shared by the programs (see uniformbuffer.py): the frame's
+// camera and fog, uploaded once per frame by Scene.Render, and the light and the
+// material, each a std140 record uploaded when it changes and bound by
+// Light.Load and Material.Load. Shaders including this file must not declare
+// these uniforms themselves; cpos and lpos are given in the lighting space of
+// the shader (LIGHTING_CAMERA is defined for camera space shaders).
+#ifndef BLOCKS_GLSL
+#define BLOCKS_GLSL
+
+layout(std140) uniform FrameBlock {
+  mat4 fview;   // world to camera space
+  mat4 fproj;
+  vec4 feye;    // camera position, world space
+  vec4 ffog;    // fog color (rgb) and density (a), see Fog
+};
+
+layout(std140) uniform LightBlock {
+  vec4 lamb;
+  vec4 ldif;
+  vec4 lspe;
+  vec4 lworld;  // position (w=1) or direction (w=0), world space
+};
+
+layout(std140) uniform MaterialBlock {
+  vec4 mamb;
+  vec4 mdif;
+  vec4 mspe;
+  float mshi;
+  float mopacity;
+};
+
+#ifdef LIGHTING_CAMERA
+#define cpos vec4(0.0,0.0,0.0,1.0)
+#define lpos (fview*lworld)
+#else
+#define cpos feye
+#define lpos lworld
+#endif
+
+#endif
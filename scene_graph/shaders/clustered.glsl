@@ -0,0 +1,47 @@
+// Clustered point lights (see ClusteredLights), for the USE_CLUSTERED
+// variants: the fragment's cluster comes from its window position and view
+// depth, and only the lights assigned to that cluster are evaluated.
+
+uniform samplerBuffer clights;     // per light: position (lighting space) and radius, color
+uniform isamplerBuffer cclusters;  // per cluster: first index and count
+uniform isamplerBuffer cindices;   // light indices of all clusters
+uniform ivec3 cgrid;               // clusters in x, y and depth
+uniform vec4 czparams;             // clip z and w rows: z*(A,C) + (B,D)
+uniform vec2 cslices;              // slice = log(depth)*x + y
+uniform vec4 cviewport;
+
+ivec2 clusterRange ()
+{
+  float ndc = 2.0*gl_FragCoord.z - 1.0;
+  float depth = -(czparams.y - ndc*czparams.w) / (ndc*czparams.z - czparams.x);
+  int slice = clamp(int(log(depth)*cslices.x + cslices.y),0,cgrid.z-1);
+  ivec2 tile = ivec2((gl_FragCoord.xy - cviewport.xy) / cviewport.zw * vec2(cgrid.xy));
+  tile = clamp(tile,ivec2(0),cgrid.xy-1);
+  return texelFetch(cclusters,(slice*cgrid.y + tile.y)*cgrid.x + tile.x).xy;
+}
+
+// diffuse and specular contribution of the cluster's lights at position p
+// (lighting space), with normal N and view direction V
+vec4 clusteredLighting (vec3 p, vec3 N, vec3 V, vec4 dif, vec4 spe, float shi)
+{
+  ivec2 range = clusterRange();
+  vec4 color = vec4(0.0);
+  for (int i=range.x; i<range.x+range.y; ++i) {
+    int light = texelFetch(cindices,i).r;
+    vec4 pos = texelFetch(clights,2*light);
+    vec4 lcolor = vec4(texelFetch(clights,2*light+1).rgb,0.0);
+    vec3 L = pos.xyz - p;
+    float dist = length(L);
+    if (dist >= pos.w)
+      continue;
+    L /= dist;
+    float falloff = 1.0 - dist/pos.w;   // reaches zero at the radius
+    falloff *= falloff;
+    float ndotl = dot(N,L);
+    if (ndotl > 0.0) {
+      color += falloff * lcolor * dif * ndotl;
+      color += falloff * lcolor * spe * pow(max(dot(reflect(-L,N),V),0.0),shi);
+    }
+  }
+  return color;
+}
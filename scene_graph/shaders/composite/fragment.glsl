@@ -0,0 +1,14 @@
+#version 410
+
+// copy of a cached color and depth pair (see StaticLayer)
+uniform sampler2D color;
+uniform sampler2D depth;
+
+out vec4 outcolor;
+
+void main (void)
+{
+  ivec2 texel = ivec2(gl_FragCoord.xy);
+  outcolor = texelFetch(color,texel,0);
+  gl_FragDepth = texelFetch(depth,texel,0).r;
+}
@@ -0,0 +1,27 @@
+#version 410
+
+// first lighting pass: ambient and the scene light over the whole screen,
+// with the G-buffer depth copied to the target (see DeferredRenderer)
+uniform vec4 lpos;   // camera space
+uniform vec4 lamb;
+uniform vec4 ldif;
+uniform vec4 lspe;
+
+out vec4 fcolor;
+
+#include "gbuffer_read.glsl"
+
+void main (void)
+{
+  Surface s;
+  if (!readSurface(s))
+    discard;
+  vec3 L = lpos.w == 0.0 ? normalize(lpos.xyz) : normalize(lpos.xyz - s.pos);
+  vec3 V = normalize(-s.pos);
+  float ndotl = dot(s.normal,L);
+  vec3 color = s.albedo * lamb.rgb + s.albedo * ldif.rgb * max(0.0,ndotl);
+  if (ndotl > 0.0)
+    color += s.specular * lspe.rgb * pow(max(0.0,dot(reflect(-L,s.normal),V)),s.shininess);
+  fcolor = vec4(color,1.0);
+  gl_FragDepth = s.depth;
+}
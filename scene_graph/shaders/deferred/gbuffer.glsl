@@ -0,0 +1,20 @@
+#version 410
+
+// G-buffer of the deferred path (see DeferredRenderer), camera space
+in vec3 veye;
+in vec3 neye;
+
+#include "../blocks.glsl"   // material
+
+layout(location = 0) out vec4 albedo;     // diffuse color
+layout(location = 1) out vec2 normal;     // octahedral encoding
+layout(location = 2) out vec4 specular;   // specular color, shininess/255
+
+#include "octahedral.glsl"
+
+void main (void)
+{
+  albedo = vec4(mdif.rgb,1.0);
+  normal = octEncode(normalize(neye));
+  specular = vec4(mspe.rgb,mshi/255.0);
+}
@@ -0,0 +1,38 @@
+// G-buffer access for the lighting passes (see DeferredRenderer)
+
+uniform sampler2D albedo;
+uniform sampler2D normal;
+uniform sampler2D specular;
+uniform sampler2D depth;
+uniform mat4 Pinv;        // inverse projection
+uniform vec4 viewport;    // of the target, the G-buffer covers it
+
+#include "octahedral.glsl"
+
+struct Surface {
+  float depth;  // window depth
+  vec3 pos;     // camera space
+  vec3 normal;
+  vec3 albedo;
+  vec3 specular;
+  float shininess;
+};
+
+// false for the background
+bool readSurface (out Surface s)
+{
+  ivec2 texel = ivec2(gl_FragCoord.xy - viewport.xy);
+  float d = texelFetch(depth,texel,0).r;
+  if (d == 1.0)
+    return false;
+  vec2 ndc = (gl_FragCoord.xy - viewport.xy) / viewport.zw * 2.0 - 1.0;
+  vec4 p = Pinv * vec4(ndc,2.0*d-1.0,1.0);
+  s.pos = p.xyz / p.w;
+  s.normal = octDecode(texelFetch(normal,texel,0).xy);
+  s.albedo = texelFetch(albedo,texel,0).rgb;
+  vec4 spe = texelFetch(specular,texel,0);
+  s.specular = spe.rgb;
+  s.shininess = spe.a * 255.0;
+  s.depth = d;
+  return true;
+}
@@ -0,0 +1,20 @@
+// unit vectors folded on an octahedron and unfolded to [-1,1]^2
+
+vec2 octSign (vec2 v)
+{
+  return vec2(v.x >= 0.0 ? 1.0 : -1.0,v.y >= 0.0 ? 1.0 : -1.0);
+}
+
+vec2 octEncode (vec3 n)
+{
+  n /= abs(n.x) + abs(n.y) + abs(n.z);
+  return n.z >= 0.0 ? n.xy : (1.0 - abs(n.yx)) * octSign(n.xy);
+}
+
+vec3 octDecode (vec2 e)
+{
+  vec3 n = vec3(e,1.0 - abs(e.x) - abs(e.y));
+  if (n.z < 0.0)
+    n.xy = (1.0 - abs(n.yx)) * octSign(n.xy);
+  return normalize(n);
+}
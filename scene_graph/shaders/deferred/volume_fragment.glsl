@@ -0,0 +1,30 @@
+#version 410
+
+// point light added to the pixels its volume covers, with the falloff of
+// shaders/clustered.glsl
+flat in vec4 lpos;
+flat in vec3 lcolor;
+
+out vec4 fcolor;
+
+#include "gbuffer_read.glsl"
+
+void main (void)
+{
+  Surface s;
+  if (!readSurface(s))
+    discard;
+  vec3 L = lpos.xyz - s.pos;
+  float dist = length(L);
+  if (dist >= lpos.w)
+    discard;
+  L /= dist;
+  float ndotl = dot(s.normal,L);
+  if (ndotl <= 0.0)
+    discard;
+  float falloff = 1.0 - dist/lpos.w;
+  falloff *= falloff;
+  vec3 V = normalize(-s.pos);
+  vec3 color = s.albedo * ndotl + s.specular * pow(max(dot(reflect(-L,s.normal),V),0.0),s.shininess);
+  fcolor = vec4(falloff * lcolor * color,0.0);
+}
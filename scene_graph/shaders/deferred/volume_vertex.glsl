@@ -0,0 +1,18 @@
+#version 410
+
+// light volume: a sphere around each point light, instanced
+layout(location = 0) in vec3 coord;   // unit sphere
+layout(location = 1) in vec4 light;   // camera space position, radius
+layout(location = 2) in vec4 color;
+
+uniform mat4 P;
+
+flat out vec4 lpos;
+flat out vec3 lcolor;
+
+void main (void)
+{
+  lpos = light;
+  lcolor = color.rgb;
+  gl_Position = P * vec4(light.xyz + coord*light.w,1.0);
+}
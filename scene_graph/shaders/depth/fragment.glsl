@@ -0,0 +1,5 @@
+#version 410
+
+void main (void)
+{
+}
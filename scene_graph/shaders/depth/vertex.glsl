@@ -0,0 +1,14 @@
+#version 410
+
+// position only: depth pre-pass (see Scene.SetDepthPrepass); shading
+// programs computing gl_Position the same way give the same depths
+invariant gl_Position;
+
+layout(location = 0) in vec4 coord;
+
+uniform mat4 Mvp;
+
+void main (void)
+{
+  gl_Position = Mvp*coord;
+}
@@ -0,0 +1,20 @@
+// Exponential fog (see Fog), for the USE_FOG variants: color and density
+// come with the frame's camera.
+
+#include "blocks.glsl"   // ffog, cpos
+
+// fraction of the color of position p (lighting space) seen through the fog
+float fogVisibility (vec3 p)
+{
+  return exp(-ffog.a*length(p-vec3(cpos)));
+}
+
+vec4 applyFog (vec4 color, float visibility)
+{
+  return mix(vec4(ffog.rgb,color.a),color,visibility);
+}
+
+vec4 applyFog (vec4 color, vec3 p)
+{
+  return applyFog(color,fogVisibility(p));
+}
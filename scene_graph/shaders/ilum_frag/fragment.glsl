@@ -0,0 +1,54 @@
+#version 410
+
+in vec3 veye;
+in vec3 neye;
+
+#include "../blocks.glsl"   // camera, light and material
+
+layout(location = 0) out vec4 fcolor;
+
+#ifdef USE_CLUSTERED
+#include "../clustered.glsl"
+#endif
+
+#ifdef USE_OIT
+#include "../oit.glsl"
+#endif
+
+#ifdef USE_SHADOW
+#include "../shadow.glsl"
+#endif
+
+#ifdef USE_FOG
+#include "../fog.glsl"
+#endif
+
+void main (void)
+{
+  vec3 N = normalize(neye);
+  vec3 V = normalize(vec3(cpos)-veye);
+  vec3 L;
+  if (lpos.w == 0)
+    L = normalize(vec3(lpos));
+  else
+    L = normalize(vec3(lpos)-veye);
+  float ndotl = dot(N,L);
+  float lit = 1.0;
+#ifdef USE_SHADOW
+  if (ndotl > 0)
+    lit = shadowFactor(veye,N);
+#endif
+  vec4 color = mamb*lamb + lit*mdif*ldif*max(0,ndotl);
+  if (ndotl > 0)
+    color += lit*mspe*lspe*pow(max(0,dot(reflect(-L,N),V)),mshi);
+#ifdef USE_CLUSTERED
+  color += clusteredLighting(veye,N,V,mdif,mspe,mshi);
+#endif
+  fcolor = color;
+#ifdef USE_FOG
+  fcolor = applyFog(fcolor,veye);
+#endif
+#ifdef USE_OIT
+  fcolor = oitAccumulate(fcolor);
+#endif
+}
@@ -1,10 +1,23 @@
 #version 410
 
 in vec4 color;
-out vec4 fcolor;
+#ifdef USE_FOG
+in float visibility;
+#include "../fog.glsl"
+#endif
+layout(location = 0) out vec4 fcolor;
+
+#ifdef USE_OIT
+#include "../oit.glsl"
+#endif
 
 void main (void)
 {
   fcolor = color;
+#ifdef USE_FOG
+  fcolor = applyFog(fcolor,visibility);
+#endif
+#ifdef USE_OIT
+  fcolor = oitAccumulate(fcolor);
+#endif
 }
-
@@ -3,14 +3,30 @@
 in data {
   vec4 color;
   vec2 texcoord;
+#ifdef USE_FOG
+  float visibility;
+#endif
 } f;
 
-out vec4 color;
+layout(location = 0) out vec4 color;
 
 uniform sampler2D decal;
 
+#ifdef USE_FOG
+#include "../fog.glsl"
+#endif
+
+#ifdef USE_OIT
+#include "../oit.glsl"
+#endif
+
 void main (void)
 {
   color = f.color * texture(decal,f.texcoord);
+#ifdef USE_FOG
+  color = applyFog(color,f.visibility);
+#endif
+#ifdef USE_OIT
+  color = oitAccumulate(color);
+#endif
 }
-
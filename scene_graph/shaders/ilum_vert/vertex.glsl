@@ -1,5 +1,7 @@
 #version 410
 
+invariant gl_Position;
+
 layout(location = 0) in vec4 coord;
 layout(location = 1) in vec3 normal;
 
@@ -7,18 +9,15 @@ uniform mat4 Mv;
 uniform mat4 Mn; 
 uniform mat4 Mvp;
 
-uniform vec4 lpos;  // light pos in eye space
-uniform vec4 lamb;
-uniform vec4 ldif;
-uniform vec4 lspe;
-
-uniform vec4 mamb;
-uniform vec4 mdif;
-uniform vec4 mspe;
-uniform float mshi;
+#include "../blocks.glsl"   // light and material
 
 out vec4 color;
 
+#ifdef USE_FOG
+#include "../fog.glsl"
+out float visibility;   // through the fog
+#endif
+
 void main (void) 
 {
   vec3 veye = vec3(Mv*coord);
@@ -34,6 +33,9 @@ void main (void)
     vec3 refl = normalize(reflect(-light,neye));
     color += mspe * lspe * pow(max(0,dot(refl,normalize(-veye))),mshi); 
   }
+#ifdef USE_FOG
+  visibility = fogVisibility(veye);
+#endif
   gl_Position = Mvp*coord; 
 }
 
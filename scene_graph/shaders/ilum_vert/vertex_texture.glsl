@@ -1,5 +1,7 @@
 #version 410
 
+invariant gl_Position;
+
 layout(location = 0) in vec4 coord;
 layout(location = 1) in vec3 normal;
 layout(location = 3) in vec2 texcoord;
@@ -8,19 +10,18 @@ uniform mat4 Mv;
 uniform mat4 Mn; 
 uniform mat4 Mvp;
 
-uniform vec4 lpos;  // light pos in eye space
-uniform vec4 lamb;
-uniform vec4 ldif;
-uniform vec4 lspe;
+#include "../blocks.glsl"   // light and material
 
-uniform vec4 mamb;
-uniform vec4 mdif;
-uniform vec4 mspe;
-uniform float mshi;
+#ifdef USE_FOG
+#include "../fog.glsl"
+#endif
 
 out data {
   vec4 color;
   vec2 texcoord;
+#ifdef USE_FOG
+  float visibility;   // through the fog
+#endif
 } v;
 
 void main (void) 
@@ -39,6 +40,9 @@ void main (void)
     v.color += mspe * lspe * pow(max(0,dot(refl,normalize(-veye))),mshi); 
   }
   v.texcoord = texcoord;
+#ifdef USE_FOG
+  v.visibility = fogVisibility(veye);
+#endif
   gl_Position = Mvp*coord; 
 }
 
@@ -0,0 +1,16 @@
+// Weighted blended order-independent transparency (McGuire and Bavoil),
+// for the USE_OIT variants drawn by TransparencyLayer: the color output
+// (location 0) accumulates premultiplied colors weighted by opacity and
+// depth, and reveal (location 1) multiplies the transmittance.
+
+#include "blocks.glsl"   // mopacity
+
+layout(location = 1) out float reveal;
+
+vec4 oitAccumulate (vec4 color)
+{
+  float a = clamp(color.a,0.0,1.0) * mopacity;
+  float w = clamp(a*max(1e-2,3e3*pow(1.0-gl_FragCoord.z,3.0)),1e-2,3e3);
+  reveal = a;
+  return vec4(color.rgb*a,a) * w;
+}
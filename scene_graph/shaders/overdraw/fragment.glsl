@@ -0,0 +1,22 @@
+#version 410
+
+// deliberately expensive per-fragment work (see benchmark.py overdraw)
+#ifndef ITERATIONS
+#define ITERATIONS 64
+#endif
+
+#include "../blocks.glsl"   // material
+
+in vec2 uv;
+out vec4 fcolor;
+
+void main (void)
+{
+  vec2 p = uv;
+  float s = 0.0;
+  for (int i=0; i<ITERATIONS; ++i) {
+    p = vec2(sin(3.1*p.x+p.y),cos(2.7*p.y-p.x));
+    s += p.x*p.y;
+  }
+  fcolor = mdif * (0.75+0.25*sin(s));
+}
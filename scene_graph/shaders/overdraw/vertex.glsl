@@ -0,0 +1,16 @@
+#version 410
+
+invariant gl_Position;
+
+layout(location = 0) in vec4 coord;
+layout(location = 3) in vec2 texcoord;
+
+uniform mat4 Mvp;
+
+out vec2 uv;
+
+void main (void)
+{
+  uv = texcoord;
+  gl_Position = Mvp*coord;
+}
@@ -0,0 +1,34 @@
+// Shadow maps (see ShadowMap), for the USE_SHADOW variants: the light's
+// depth, compared in hardware (2x2 percentage closer filtering with linear
+// filtering). SHADOW_CUBE selects the cube map of a point light.
+
+#ifdef SHADOW_CUBE
+uniform samplerCubeShadow shadowCube;
+#else
+uniform sampler2DShadow shadowMap;
+#endif
+uniform mat4 shadowMatrix;   // lighting space to shadow coordinates
+uniform vec4 shadowParams;   // near, far (cube map), bias
+uniform float shadowOffset;  // error of the drawn tessellation level (see GeometricLOD)
+
+// light reaching position p (lighting space) of a surface with the given normal:
+// 0 in shadow, 1 lit; the lookup is pushed out of coarse tessellations,
+// which lie inside the finer ones that may have cast the shadow map
+float shadowFactor (vec3 p, vec3 normal)
+{
+  vec4 s = shadowMatrix * vec4(p+normal*shadowOffset,1.0);
+#ifdef SHADOW_CUBE
+  // window depth of the face's perspective at the major axis distance
+  float n = shadowParams.x;
+  float f = shadowParams.y;
+  float z = max(abs(s.x),max(abs(s.y),abs(s.z)));
+  if (z >= f)
+    return 1.0;
+  float depth = 0.5*((f+n)/(f-n) - 2.0*f*n/((f-n)*z)) + 0.5;
+  return texture(shadowCube,vec4(s.xyz,depth-shadowParams.z));
+#else
+  if (any(lessThan(s.xyz,vec3(0.0))) || any(greaterThan(s.xyz,vec3(1.0))))
+    return 1.0;   // outside the shadowed box
+  return texture(shadowMap,vec3(s.xy,s.z-shadowParams.z));
+#endif
+}
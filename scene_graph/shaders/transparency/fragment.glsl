@@ -0,0 +1,20 @@
+#version 410
+
+// transparent pass resolved over the opaque image (see TransparencyLayer)
+uniform sampler2D color;    // opaque pass
+uniform sampler2D depth;
+uniform sampler2D accum;    // weighted premultiplied colors, weighted opacity
+uniform sampler2D reveal;   // product of (1 - opacity)
+
+out vec4 outcolor;
+
+void main (void)
+{
+  ivec2 texel = ivec2(gl_FragCoord.xy);
+  vec4 opaque = texelFetch(color,texel,0);
+  vec4 sum = texelFetch(accum,texel,0);
+  float r = texelFetch(reveal,texel,0).r;
+  vec3 average = sum.rgb / clamp(sum.a,1e-4,5e4);
+  outcolor = vec4(mix(average,opaque.rgb,r),opaque.a);
+  gl_FragDepth = texelFetch(depth,texel,0).r;
+}
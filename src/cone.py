@@ -9,7 +9,7 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../scene_graph/python"))
 
-from shape import Shape
+from shape import Shape, Tangents, Sagitta, Halvings
 import numpy as np
 import math
 
@@ -146,11 +146,21 @@ class Cone(Shape):
 
         self.nind = len(indices)
 
+        self.SetBounds(coords)  # esfera envolvente (culling de sombras)
+
+        # Níveis de detalhe: metade das fatias a cada nível (ver GeometricLOD)
+        self.SetLevels(
+            [(Sagitta(n), (n, with_base, disable_culling)) for n in Halvings(nslices)]
+        )
+
+        # Tangentes (direção de u) para o normal mapping no espaço tangente
+        tangents = Tangents(coords, normals, texcoords, indices)
+
         # ===== CRIAR VAO E VBOs =====
         self.vao = glGenVertexArrays(1)
         glBindVertexArray(self.vao)
 
-        buffers = glGenBuffers(4)
+        buffers = glGenBuffers(5)
 
         # Buffer de coordenadas (location 0)
         glBindBuffer(GL_ARRAY_BUFFER, buffers[0])
@@ -170,8 +180,14 @@ class Cone(Shape):
         glVertexAttribPointer(3, 2, GL_FLOAT, GL_FALSE, 0, None)
         glEnableVertexAttribArray(3)
 
+        # Buffer de tangentes (location 2)
+        glBindBuffer(GL_ARRAY_BUFFER, buffers[3])
+        glBufferData(GL_ARRAY_BUFFER, tangents.nbytes, tangents, GL_STATIC_DRAW)
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, 0, None)
+        glEnableVertexAttribArray(2)
+
         # Buffer de índices
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, buffers[3])
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, buffers[4])
         glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
 
         glBindVertexArray(0)
@@ -12,16 +12,21 @@ Aluno: Felipe
 Professor: Waldemar Celes (PUC-Rio)
 """
 
-import glfw
-from OpenGL.GL import *
 import sys
 import os
 
-# Adiciona o diretório atual PRIMEIRO para usar nossos arquivos corrigidos
+# Adiciona o diretório atual PRIMEIRO para usar nossas geometrias
 sys.path.insert(0, os.path.dirname(__file__))
 # Adiciona o caminho do scene_graph como fallback
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), "../scene_graph/python"))
 
+# Modo headless: escolhe a plataforma do PyOpenGL (EGL/OSMesa) antes de
+# qualquer import de OpenGL.GL
+if "--headless" in sys.argv:
+    import headless
+
+import glfw
+from OpenGL.GL import *
 import glm
 from camera3d import Camera3D
 from light import Light
@@ -33,6 +38,13 @@ from scene import Scene
 from cube import Cube
 from sphere import Sphere
 from texture import Texture
+from normalmap import NormalMap
+from capture import FrameCapture
+from profiler import Profiler
+from apploop import AppLoop
+from shadowmap import ShadowMap
+from fog import Fog
+from geometriclod import GeometricLOD
 
 # Importa geometrias customizadas
 from cylinder import Cylinder
@@ -44,6 +56,9 @@ viewer_pos = glm.vec3(4.0, 3.5, 5.0)
 # globais
 scene = None
 camera = None
+capture = None  # gravação de sequência de frames (tecla R)
+capture_frame = 0
+profiler = None  # perfil de CPU/GPU por nó (tecla P)
 
 
 def initialize(win):
@@ -57,8 +72,9 @@ def initialize(win):
 
     # ===== CÂMERA COM ARCBALL =====
     camera = Camera3D(viewer_pos[0], viewer_pos[1], viewer_pos[2])
-    arcball = camera.CreateArcball()
-    arcball.Attach(win)
+    if win:  # sem janela no modo headless
+        arcball = camera.CreateArcball()
+        arcball.Attach(win)
 
     # ===== LUZ POSICIONAL PERTO DA LÂMPADA =====
     # Cabeça da lâmpada está em: (0.65, 1.9, 0.3)
@@ -69,19 +85,29 @@ def initialize(win):
     light.SetSpecular(1.0, 1.0, 1.0)
 
     # ===== SHADER PHONG COM FOG E BUMP =====
+    # Fog e bump são variantes de compilação (#define), não uniforms:
+    # objetos sem bump usam o caminho Phong simples; o fog é ligado pela
+    # aparência Fog na raiz
     shader = Shader(light, "world")
     shader.AttachVertexShader("shaders/phong.vert")
     shader.AttachFragmentShader("shaders/phong.frag")
-    shader.Link()
 
-    # Configura fog (ativado globalmente)
-    shader.UseProgram()
-    fogColorLoc = glGetUniformLocation(shader.pid, "fogColor")
-    useFogLoc = glGetUniformLocation(shader.pid, "useFog")
-    useBumpLoc = glGetUniformLocation(shader.pid, "useBump")
-    glUniform3f(fogColorLoc, 0.2, 0.2, 0.2)  # fog PRETO (ambiente escuro)
-    glUniform1i(useFogLoc, 1)  # Ativa fog
-    glUniform1i(useBumpLoc, 1)  # Ativa bump mapping
+    # Phong por vértice (barato de compilar) desenhado enquanto o Phong por
+    # fragmento e suas variantes compilam em segundo plano
+    shader_fallback = Shader(light, "world")
+    shader_fallback.AttachVertexShader(
+        "../scene_graph/shaders/ilum_vert/vertex_texture.glsl"
+    )
+    shader_fallback.AttachFragmentShader(
+        "../scene_graph/shaders/ilum_vert/fragment_texture.glsl"
+    )
+    shader_fallback.Link()
+    shader.SetFallback(shader_fallback)
+    shader.Link(wait=False)  # não bloqueia o primeiro frame
+    # já submete as variantes com fog e sombra (mapa cúbico), com e sem bump
+    shadow_features = {"USE_FOG": True, "USE_SHADOW": True, "SHADOW_CUBE": True}
+    shader.GetVariant(shadow_features)
+    shader.GetVariant(dict(shadow_features, USE_BUMP=True))
 
     # ===== MATERIAIS =====
 
@@ -115,7 +141,8 @@ def initialize(win):
     tex_white = Texture("decal", None, glm.vec3(1.0, 1.0, 1.0))
     tex_wood = Texture("decal", "texturas/wood.jpg")
     tex_paper = Texture("decal", "texturas/paper.jpg")
-    tex_noise = Texture("bumpTex", "texturas/noise.png")  # Para bump mapping
+    # Normal map calculado uma vez a partir da altura em noise.png (bump mapping)
+    tex_noise = NormalMap("normalTex", "texturas/noise.png", 20.0)
 
     # ===== GEOMETRIAS =====
     cube = Cube()
@@ -132,7 +159,7 @@ def initialize(win):
     trf_floor = Transform()
     trf_floor.Translate(0.0, 0.0, 0.0)
     trf_floor.Scale(8.0, 0.1, 8.0)
-    node_floor = Node(None, trf_floor, [mat_floor, tex_white], [cube])
+    node_floor = Node(None, trf_floor, [mat_floor, tex_white], [cube], name="floor")
 
     # ===== MESA (tampo + 4 pernas) =====
 
@@ -140,7 +167,7 @@ def initialize(win):
     trf_tampo = Transform()
     trf_tampo.Translate(0.0, 1.05, 0.0)  # Y = 1.05 (acima das pernas)
     trf_tampo.Scale(3.0, 0.1, 2.0)  # 3m largura, 0.1m espessura, 2m profundidade
-    node_tampo = Node(None, trf_tampo, [mat_white, tex_wood], [cube])
+    node_tampo = Node(None, trf_tampo, [mat_white, tex_wood], [cube], name="tampo")
 
     # Pernas da mesa (4 cilindros nos cantos)
     # Pernas: altura 0.7, centro em Y=0.35, Y ∈ [0.0, 0.7]
@@ -151,25 +178,33 @@ def initialize(win):
     trf_perna1 = Transform()
     trf_perna1.Translate(1.2, 0.3, 0.8)
     trf_perna1.Scale(0.1, 0.8, 0.1)
-    node_perna1 = Node(None, trf_perna1, [mat_white, tex_wood], [cylinder])
+    node_perna1 = Node(
+        None, trf_perna1, [mat_white, tex_wood], [cylinder], name="perna1"
+    )
 
     # Perna 2: (-X, +Z)
     trf_perna2 = Transform()
     trf_perna2.Translate(-1.2, 0.3, 0.8)
     trf_perna2.Scale(0.1, 0.8, 0.1)
-    node_perna2 = Node(None, trf_perna2, [mat_white, tex_wood], [cylinder])
+    node_perna2 = Node(
+        None, trf_perna2, [mat_white, tex_wood], [cylinder], name="perna2"
+    )
 
     # Perna 3: (+X, -Z)
     trf_perna3 = Transform()
     trf_perna3.Translate(1.2, 0.3, -0.8)
     trf_perna3.Scale(0.1, 0.8, 0.1)
-    node_perna3 = Node(None, trf_perna3, [mat_white, tex_wood], [cylinder])
+    node_perna3 = Node(
+        None, trf_perna3, [mat_white, tex_wood], [cylinder], name="perna3"
+    )
 
     # Perna 4: (-X, -Z)
     trf_perna4 = Transform()
     trf_perna4.Translate(-1.2, 0.3, -0.8)
     trf_perna4.Scale(0.1, 0.8, 0.1)
-    node_perna4 = Node(None, trf_perna4, [mat_white, tex_wood], [cylinder])
+    node_perna4 = Node(
+        None, trf_perna4, [mat_white, tex_wood], [cylinder], name="perna4"
+    )
 
     # ===== OBJETOS SOBRE A MESA =====
     # Superfície da mesa: Y = 1.1
@@ -178,19 +213,26 @@ def initialize(win):
     trf_paper = Transform()
     trf_paper.Translate(-0.8, 1.11, 0.3)  # Y = 1.1 + 0.01 (metade da espessura)
     trf_paper.Scale(0.4, 0.02, 0.3)  # papel fino
-    node_paper = Node(None, trf_paper, [mat_white, tex_paper], [cube])
+    node_paper = Node(None, trf_paper, [mat_white, tex_paper], [cube], name="paper")
 
     # XÍCARA (cilindro sem tampas)
     trf_cup = Transform()
     trf_cup.Translate(0.8, 1.2, -0.3)  # Y = 1.1 + 0.1 (metade da altura)
     trf_cup.Scale(0.15, 0.2, 0.15)  # xícara pequena
-    node_cup = Node(None, trf_cup, [mat_cup, tex_white], [cylinder_no_cap])
+    node_cup = Node(None, trf_cup, [mat_cup, tex_white], [cylinder_no_cap], name="cup")
 
     # ESFERA VERDE COM BUMP MAPPING (rugosidade com noise.png)
     trf_sphere_bump = Transform()
     trf_sphere_bump.Translate(-0.3, 1.4, -0.2)  # Y = 1.1 + 0.3 (raio)
     trf_sphere_bump.Scale(0.3, 0.3, 0.3)
-    node_sphere_bump = Node(None, trf_sphere_bump, [mat_green, tex_noise], [sphere])
+    node_sphere_bump = Node(
+        None,
+        trf_sphere_bump,
+        [mat_green, tex_noise],
+        [sphere],
+        features={"USE_BUMP": True},  # variante com bump mapping
+        name="sphere_bump",
+    )
 
     # ===== LÂMPADA (base + haste vertical + haste inclinada + cabeça) =====
     # Posição base: (1.5, Y, 0.5) sobre a mesa
@@ -199,13 +241,17 @@ def initialize(win):
     trf_lamp_base = Transform()
     trf_lamp_base.Translate(1.15, 1.15, 0.5)  # Y = 1.1 + 0.01
     trf_lamp_base.Scale(0.2, 0.02, 0.2)
-    node_lamp_base = Node(None, trf_lamp_base, [mat_blue, tex_white], [cylinder])
+    node_lamp_base = Node(
+        None, trf_lamp_base, [mat_blue, tex_white], [cylinder], name="lamp_base"
+    )
 
     # Haste 1 (vertical) - de Y=1.12 até Y=1.72
     trf_lamp_stem1 = Transform()
     trf_lamp_stem1.Translate(1.15, 1.15, 0.5)  # centro em Y=1.42
     trf_lamp_stem1.Scale(0.05, 0.6, 0.05)  # altura 0.6
-    node_lamp_stem1 = Node(None, trf_lamp_stem1, [mat_blue, tex_white], [cylinder])
+    node_lamp_stem1 = Node(
+        None, trf_lamp_stem1, [mat_blue, tex_white], [cylinder], name="lamp_stem1"
+    )
 
     # Haste 2 (inclinada 45°) - começa em (1.5, 1.72, 0.5)
     # Comprimento 0.5, inclinada 45° em Z
@@ -215,7 +261,9 @@ def initialize(win):
     trf_lamp_stem2.Translate(1.15, 1.75, 0.5)
     trf_lamp_stem2.Rotate(45.0, 0.0, 0.0, 1.0)  # inclina 45° em Z
     trf_lamp_stem2.Scale(0.05, 0.5, 0.05)
-    node_lamp_stem2 = Node(None, trf_lamp_stem2, [mat_blue, tex_white], [cylinder])
+    node_lamp_stem2 = Node(
+        None, trf_lamp_stem2, [mat_blue, tex_white], [cylinder], name="lamp_stem2"
+    )
 
     # Cabeça (cone invertido) - topo da haste 2: (1.85, 2.07, 0.5)
     trf_lamp_head = Transform()
@@ -223,7 +271,9 @@ def initialize(win):
     trf_lamp_head.Rotate(45.0, 1.0, 0.0, 0.0)
     trf_lamp_head.Rotate(-35.0, 0.0, 0.0, 1.0)
     trf_lamp_head.Scale(0.25, 0.3, 0.25)
-    node_lamp_head = Node(None, trf_lamp_head, [mat_blue, tex_white], [cone])
+    node_lamp_head = Node(
+        None, trf_lamp_head, [mat_blue, tex_white], [cone], name="lamp_head"
+    )
 
     # ===== MONTAGEM DO GRAFO DE CENA =====
     root = Node(
@@ -246,26 +296,89 @@ def initialize(win):
     )
     scene = Scene(root)
 
+    # ===== FOG (NEBLINA) =====
+    # Fog exponencial cinza escuro. Formas além da distância em que o fog
+    # satura não são desenhadas, e o plano far da câmera é trazido até ela
+    fog = Fog(0.06, 0.2, 0.2, 0.2)
+    root.AddAppearance(fog)
+    camera.SetFog(fog)
 
-def display(win):
-    """Renderiza a cena"""
-    global scene, camera
+    # ===== NÍVEIS DE DETALHE GEOMÉTRICO =====
+    # Esferas, cilindros e cones usam a tesselação mais grossa cujo erro
+    # projetado fica abaixo de meio pixel
+    root.AddAppearance(GeometricLOD(0.5))
+
+    # ===== SOMBRAS DA LÂMPADA =====
+    # Luz pontual: mapa de sombra cúbico. Nada na cena se move, então o
+    # mapa é renderizado uma vez e reaproveitado enquanto a luz e os
+    # objetos ficarem parados
+    shadow = ShadowMap(scene, light, 1024, near=0.05, far=10.0)
+    root.AddAppearance(shadow)
 
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
-    if scene and camera:
-        scene.Render(camera)
+def record():
+    """Grava o frame recém-renderizado (se a gravação estiver ativa)"""
+    global capture_frame
+    if capture:
+        # leitura assíncrona (PBO + fence); PNG codificado em outras threads
+        capture.Capture("prints/captura/frame_%05d.png" % capture_frame)
+        capture_frame += 1
 
 
 def keyboard(win, key, scancode, action, mods):
     """Callback de teclado para controles adicionais"""
+    global capture, profiler
     if action == glfw.PRESS and key == glfw.KEY_ESCAPE:
         glfw.set_window_should_close(win, True)
+    elif action == glfw.PRESS and key == glfw.KEY_R:
+        if capture:
+            capture.Close()  # espera os frames pendentes serem gravados
+            print("Gravação encerrada:", capture.GetCapturedCount(), "frames")
+            capture = None
+        else:
+            width, height = glfw.get_framebuffer_size(win)
+            capture = FrameCapture(width, height)
+            print("Gravando frames em prints/captura/ ...")
+    elif action == glfw.PRESS and key == glfw.KEY_P:
+        if profiler:
+            # trace para chrome://tracing ou ui.perfetto.dev
+            profiler.ExportChromeTrace("prints/profile.json")
+            scene.RemoveInstrument(profiler)
+            print("Perfil salvo em prints/profile.json")
+            profiler = None
+        else:
+            profiler = Profiler()
+            scene.AddInstrument(profiler)
+            print("Medindo tempos de CPU/GPU por nó ...")
+
+
+def main_headless(filename, width, height):
+    """Renderiza um frame fora da tela (sem janela nem GPU) e salva em arquivo"""
+    ctx = headless.Headless(width, height)
+    print("OpenGL version:", glGetString(GL_VERSION).decode("utf-8"))
+    print("Renderer:", glGetString(GL_RENDERER).decode("utf-8"))
+
+    initialize(None)
+    for shd in scene.GetRoot().GetShader().variants.values():
+        shd.Finish()  # sem fallback na imagem final
+
+    ctx.Render(scene, camera)
+    ctx.Save(filename)
+    print("Imagem salva em", filename, "(%dx%d)" % (width, height))
+    ctx.Terminate()
 
 
 def main():
     """Função principal do programa"""
 
+    # python main.py --headless [saida.png] [largura altura]
+    if "--headless" in sys.argv:
+        args = sys.argv[sys.argv.index("--headless") + 1 :]
+        filename = args[0] if args else "prints/headless.png"
+        width, height = (int(args[1]), int(args[2])) if len(args) >= 3 else (1024, 768)
+        main_headless(filename, width, height)
+        return
+
     # GLFW
     if not glfw.init():
         print("Erro ao inicializar GLFW")
@@ -304,6 +417,7 @@ def main():
     print("")
     print("CONTROLES:")
     print("  • Arraste com o mouse para rotacionar a cena (arcball)")
+    print("  • R para iniciar/parar a gravação de frames (prints/captura/)")
     print("  • ESC para sair")
     print("=" * 50)
     print("")
@@ -311,11 +425,16 @@ def main():
     # inicializa a cena
     initialize(win)
 
-    # loop principal
-    while not glfw.window_should_close(win):
-        display(win)
-        glfw.swap_buffers(win)
-        glfw.poll_events()
+    # loop principal: Scene.Update em passo fixo, render interpolado,
+    # limitado a 60 fps com sleep; sob demanda: parada, a cena só é
+    # redesenhada quando algo muda (arcball, transformações, janela)
+    loop = AppLoop(win, scene, camera, fps=60, on_demand=True)
+    loop.AddFrameCallback(record)
+    stats = loop.Run()
+    print("Tempos de frame (ms):", stats.GetSummary())
+
+    if capture:
+        capture.Close()
 
     # finaliza GLFW
     glfw.terminate()
@@ -0,0 +1,11 @@
+// Normal mapping no espaço tangente (incluído quando USE_BUMP está definido)
+// normalTex é um NormalMap: normais calculadas uma vez a partir da altura
+uniform sampler2D normalTex;
+
+// N e T interpolados; T.w é o sinal da bitangente (Tangents em shape.py)
+vec3 bumpNormal(vec3 N, vec4 T, vec2 texcoord) {
+    vec3 t = normalize(T.xyz - N * dot(N, T.xyz));
+    vec3 b = cross(N, t) * T.w;
+    vec3 n = texture(normalTex, texcoord).xyz * 2.0 - 1.0;
+    return normalize(mat3(t, b, N) * n);
+}
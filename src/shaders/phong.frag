@@ -2,25 +2,42 @@
 
 in vec3 veye;
 in vec3 neye;
+in vec4 teye;
 in vec3 light;
 in vec2 ftexcoord;
 
-out vec4 fcolor;
+layout(location = 0) out vec4 fcolor;
 
-uniform vec4 mamb, mdif, mspe;
-uniform vec4 lamb, ldif, lspe;
-uniform float mshi;
+// Câmera, luz e material em uniform blocks compartilhados
+#include "../../scene_graph/shaders/blocks.glsl"
 
 // Texturas
 uniform sampler2D decal;
-uniform sampler2D bumpTex;
 
-// Flags de efeitos
-uniform bool useFog;
-uniform bool useBump;
+// Variantes de compilação: USE_BUMP, USE_FOG, USE_OIT, USE_CLUSTERED e USE_SHADOW (definidas pelo Shader)
+#ifdef USE_BUMP
+#include "bump.glsl"
+#endif
 
-// Parâmetros de fog
-uniform vec3 fogColor;
+// Neblina da cena (Fog): cor e densidade vêm no FrameBlock
+#ifdef USE_FOG
+#include "../../scene_graph/shaders/fog.glsl"
+#endif
+
+// Luzes pontuais agrupadas por cluster (ClusteredLights)
+#ifdef USE_CLUSTERED
+#include "../../scene_graph/shaders/clustered.glsl"
+#endif
+
+// Sombras da luz principal (ShadowMap)
+#ifdef USE_SHADOW
+#include "../../scene_graph/shaders/shadow.glsl"
+#endif
+
+// Transparência independente de ordem (passada transparente da TransparencyLayer)
+#ifdef USE_OIT
+#include "../../scene_graph/shaders/oit.glsl"
+#endif
 
 void main(void) {
     vec3 N = normalize(neye);
@@ -28,41 +45,41 @@ void main(void) {
     vec3 V = normalize(-veye);
 
     // === BUMP MAPPING (rugosidade) ===
-    if (useBump) {
-        // Pega altura do bump map
-        float h = texture(bumpTex, ftexcoord).r;
-        float scale = 0.05;
-
-        // Calcula derivadas para perturbar a normal
-        vec3 dpdx = dFdx(vec3(ftexcoord, h * scale));
-        vec3 dpdy = dFdy(vec3(ftexcoord, h * scale));
-        vec3 normalBump = normalize(cross(dpdx, dpdy));
-
-        // Mistura a normal perturbada com a original
-        N = normalize(mix(N, normalBump, 0.5));
-    }
+#ifdef USE_BUMP
+    N = bumpNormal(N, teye, ftexcoord);
+#endif
 
     vec3 R = reflect(-L, N);
 
+    // === SOMBRA (fração da luz que chega ao fragmento) ===
+    float lit = 1.0;
+#ifdef USE_SHADOW
+    lit = shadowFactor(veye, normalize(neye));
+#endif
+
     // === ILUMINAÇÃO PHONG ===
     // ambiente + difusa
-    vec4 color = mamb * lamb + mdif * ldif * max(dot(N, L), 0.0);
+    vec4 color = mamb * lamb + lit * mdif * ldif * max(dot(N, L), 0.0);
 
     // especular (se a superfície está voltada para a luz)
     if (dot(N, L) > 0.0)
-        color += mspe * lspe * pow(max(dot(R, V), 0.0), mshi);
+        color += lit * mspe * lspe * pow(max(dot(R, V), 0.0), mshi);
+
+#ifdef USE_CLUSTERED
+    color += clusteredLighting(veye, N, V, mdif, mspe, mshi);
+#endif
 
     // Multiplica pela textura
     vec4 texColor = texture(decal, ftexcoord);
     color = color * texColor;
 
     // === FOG (neblina) ===
-    if (useFog) {
-        float dist = length(veye);
-        float fogFactor = exp(-0.3 * dist);  // Aumentado para 0.3 (fog bem mais intenso)
-        fogFactor = clamp(fogFactor, 0.0, 1.0);
-        color = mix(vec4(fogColor, 1.0), color, fogFactor);
-    }
+#ifdef USE_FOG
+    color = applyFog(color, veye);
+#endif
 
     fcolor = color;
+#ifdef USE_OIT
+    fcolor = oitAccumulate(color);
+#endif
 }
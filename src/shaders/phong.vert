@@ -1,20 +1,28 @@
 #version 410
 
+invariant gl_Position;
+
 layout(location = 0) in vec4 coord;
 layout(location = 1) in vec3 normal;
+layout(location = 2) in vec4 tangent;  // w: sinal da bitangente
 layout(location = 3) in vec2 texcoord;
 
 uniform mat4 Mv, Mn, Mvp;
-uniform vec4 lpos;
+
+// Câmera, luz e material em uniform blocks compartilhados (lpos no espaço de iluminação)
+#include "../../scene_graph/shaders/blocks.glsl"
 
 out vec3 veye;
 out vec3 neye;
+out vec4 teye;
 out vec3 light;
 out vec2 ftexcoord;
 
 void main(void) {
     veye = vec3(Mv * coord);
     neye = normalize(vec3(Mn * vec4(normal, 0.0)));
+    // tangente acompanha a superfície: transformada pela matriz de modelo
+    teye = vec4(vec3(Mv * vec4(tangent.xyz, 0.0)), tangent.w);
 
     if (lpos.w == 0.0)
         light = normalize(vec3(lpos));